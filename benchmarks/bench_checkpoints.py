@@ -0,0 +1,101 @@
+import sys
+import os
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+
+# Add the parent directory to sys.path to allow imports from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import src.graph as graph_module
+from src.checkpoints import open_checkpointer
+
+# Typical length of one analyst report in characters
+REPORT_CHARS = 4000
+
+def snapshot(tickers):
+    """Prefetch-sized market data: 6 months of daily bars, 5 years of monthly bars and two statements per ticker."""
+    def bars(rows):
+        return {"tz": "America/New_York", "index": [f"2025-01-01T00:00:{i:05d}" for i in range(rows)],
+                **{col: [random.random() * 100 for _ in range(rows)] for col in ("open", "high", "low", "close", "volume")}}
+
+    def statement():
+        return {"index": [f"Line item {i}" for i in range(40)], "columns": ["2022", "2023", "2024", "2025"],
+                "data": [[random.random() * 1e9 for _ in range(4)] for _ in range(40)]}
+
+    return {
+        ticker: {"history": {"6mo|1d": bars(126), "5y|1mo": bars(60)}, "info": {"marketCap": 1e12, "trailingPE": 30.0},
+                 "financials": statement(), "balance_sheet": statement()}
+        for ticker in tickers
+    }
+
+def stub_nodes(tickers):
+    """Replaces every node with a stub returning a realistic state update without calling an LLM."""
+    report = "x" * REPORT_CHARS
+    updates = {
+        "router": {"tickers": tickers},
+        "prefetch": {"market_data": snapshot(tickers)},
+        "data_analyst": {"data_analysis": report},
+        "news_analyst": {"news_analysis": report},
+        "trend_analyst": {"trend_analysis": report},
+        "pattern_analyst": {"pattern_analysis": report},
+        "indicator_analyst": {"indicator_analysis": report},
+        "technical_strategist": {"technical_strategy": report},
+        "risk_manager": {"risk_assessment": report},
+        "editor": {"final_report": report},
+    }
+    for name, update in updates.items():
+        setattr(graph_module, f"{name}_node", lambda state, update=update: update)
+        setattr(graph_module, f"a{name}_node", None)
+
+async def run(graph, runs, checkpointed):
+    """Mean wall time of one graph run in milliseconds."""
+    start = time.perf_counter()
+    for i in range(runs):
+        config = {"configurable": {"thread_id": f"bench-{i}"}} if checkpointed else None
+        await graph.ainvoke({"query": "bench"}, config)
+    return (time.perf_counter() - start) * 1000 / runs
+
+async def bench(args):
+    graph = graph_module.create_graph()
+    plain_ms = await run(graph, args.runs, checkpointed=False)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "checkpoints.sqlite")
+        async with open_checkpointer(path) as checkpointer:
+            durable = graph.copy(update={"checkpointer": checkpointer})
+            durable_ms = await run(durable, args.runs, checkpointed=True)
+            stats = checkpointer.stats()
+        size_kb = os.path.getsize(path) / 1024 / args.runs
+
+    print(f"run without checkpoints: {plain_ms:8.2f} ms")
+    print(f"run with checkpoints:    {durable_ms:8.2f} ms  (+{durable_ms - plain_ms:.2f} ms, {size_kb:.0f} KB per run)")
+    print(f"\n{'node':<22} {'writes/run':>10} {'mean ms':>8} {'max ms':>8} {'% of LLM call':>14}")
+    for node, s in sorted(stats["by_node"].items()):
+        share = s["mean_ms"] * s["writes"] / args.runs / (args.llm_seconds * 1000)
+        print(f"{node:<22} {s['writes'] / args.runs:>10.1f} {s['mean_ms']:>8.3f} {s['max_ms']:>8.3f} {share:>14.3%}")
+
+def main():
+    """
+    Checkpoint write overhead of a research run. Runs the real graph topology
+    with stub nodes that return prefetch-sized market data and report-sized
+    text, once without and once with the SQLite checkpointer, and prints the
+    added time per run and the checkpoint write time per node ('superstep' is
+    the state saved after each step, 'send' the per-ticker analyst outputs),
+    relative to one LLM call of --llm-seconds. No API keys or network needed.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--tickers", nargs="+", default=["NVDA", "TSM", "AMD"])
+    parser.add_argument("--llm-seconds", type=float, default=5.0, help="Typical latency of one LLM call")
+    args = parser.parse_args()
+
+    os.environ.setdefault("CHECKPOINT_TTL", str(24 * 3600))
+    # Every run must go through the whole evidence stage
+    os.environ["RESEARCH_CACHE"] = "0"
+    stub_nodes(args.tickers)
+    asyncio.run(bench(args))
+
+if __name__ == "__main__":
+    main()
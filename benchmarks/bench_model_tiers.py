@@ -0,0 +1,151 @@
+import sys
+import os
+import argparse
+import time
+from collections import defaultdict
+
+# Add the parent directory to sys.path to allow imports from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+from langchain_core.callbacks import BaseCallbackHandler
+from src.utils import ROLE_SETTINGS, resolve_role
+
+# USD per 1M (input, output) tokens; list prices, adjust for your account
+PRICES = {
+    "gpt-5": (1.25, 10.0),
+    "gpt-5-mini": (0.25, 2.0),
+    "gpt-5-nano": (0.05, 0.40),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gemini-2.5-pro": (1.25, 10.0),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "openai/gpt-oss-120b": (0.15, 0.60),
+    "openai/gpt-oss-20b": (0.075, 0.30),
+}
+
+def apply_profile(profile):
+    """Sets the environment for a tier configuration: 'single', 'tiered' or a LLM_ROLES_FILE path."""
+    os.environ.pop("LLM_ROLES_FILE", None)
+    os.environ["LLM_TIERS"] = "0" if profile == "single" else "1"
+    if profile not in ("single", "tiered"):
+        os.environ["LLM_ROLES_FILE"] = profile
+
+def graph_node(metadata):
+    """Outer graph node of a callback event ('data_analyst:<id>|model:<id>' -> 'data_analyst')."""
+    namespace = (metadata or {}).get("langgraph_checkpoint_ns") or ""
+    return namespace.split("|", 1)[0].split(":", 1)[0] or (metadata or {}).get("langgraph_node")
+
+class UsageRecorder(BaseCallbackHandler):
+    """Collects per-node wall time, LLM call latency and token usage from graph callbacks."""
+
+    def __init__(self):
+        self.nodes = defaultdict(lambda: {"node_s": 0.0, "llm_s": 0.0, "calls": 0, "in": 0, "out": 0, "models": set()})
+        self._starts = {}
+
+    def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs):
+        metadata = metadata or {}
+        # Top-level node runs only (not the steps of an agent subgraph)
+        if kwargs.get("name") == metadata.get("langgraph_node") and "|" not in metadata.get("langgraph_checkpoint_ns", "|"):
+            self._starts[run_id] = (metadata["langgraph_node"], time.perf_counter())
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        if run_id in self._starts:
+            node, start = self._starts.pop(run_id)
+            self.nodes[node]["node_s"] += time.perf_counter() - start
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._starts[run_id] = (graph_node(metadata), time.perf_counter())
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        if run_id not in self._starts:
+            return
+        node, start = self._starts.pop(run_id)
+        stats = self.nodes[node]
+        stats["llm_s"] += time.perf_counter() - start
+        stats["calls"] += 1
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None) or {}
+                stats["in"] += usage.get("input_tokens", 0)
+                stats["out"] += usage.get("output_tokens", 0)
+                model = (getattr(message, "response_metadata", None) or {}).get("model_name")
+                if model:
+                    stats["models"].add(model)
+
+def cost(model, tokens_in, tokens_out):
+    """USD cost of a call volume, or None for models without a listed price."""
+    for name, (price_in, price_out) in PRICES.items():
+        if model == name or model.startswith(name + "-20"):
+            return (tokens_in * price_in + tokens_out * price_out) / 1e6
+    return None
+
+def print_plan(profile):
+    """Prints the model settings each role resolves to under a profile."""
+    apply_profile(profile)
+    print(f"\n[{profile}] provider={resolve_role()['provider']}")
+    print(f"{'node':<22} {'tier':<8} {'model':<24} {'max_tokens':>10} {'timeout':>8}")
+    for role in ROLE_SETTINGS:
+        spec = resolve_role(role)
+        print(f"{role:<22} {spec['tier']:<8} {spec['model']:<24} {spec['max_tokens'] or '-':>10} {spec['timeout'] or '-':>8}")
+
+def run_profile(profile, query, style, analyst_mode=None):
+    """Runs the whole graph once under a profile and prints per-node latency, tokens and cost."""
+    from src.graph import create_graph
+
+    apply_profile(profile)
+    recorder = UsageRecorder()
+    state = {"query": query, "investment_style": style, "tickers": [], "analyst_mode": analyst_mode}
+    start = time.perf_counter()
+    create_graph().invoke(state, config={"callbacks": [recorder]})
+    wall = time.perf_counter() - start
+
+    print(f"\n[{profile}{' ' + analyst_mode if analyst_mode else ''}] wall={wall:.1f}s")
+    print(f"{'node':<22} {'model':<24} {'calls':>5} {'node s':>7} {'llm s':>7} {'in tok':>8} {'out tok':>8} {'cost $':>8}")
+    total_in = total_out = total_cost = 0.0
+    for role in ROLE_SETTINGS:
+        stats = recorder.nodes.get(role)
+        if stats is None:
+            continue
+        model = ",".join(sorted(stats["models"])) or resolve_role(role)["model"]
+        usd = cost(model, stats["in"], stats["out"])
+        total_in += stats["in"]; total_out += stats["out"]; total_cost += usd or 0.0
+        print(f"{role:<22} {model:<24} {stats['calls']:>5} {stats['node_s']:>7.1f} {stats['llm_s']:>7.1f} "
+              f"{stats['in']:>8} {stats['out']:>8} {usd if usd is not None else float('nan'):>8.4f}")
+    print(f"{'total':<22} {'':<24} {'':>5} {wall:>7.1f} {'':>7} {total_in:>8.0f} {total_out:>8.0f} {total_cost:>8.4f}")
+
+def main():
+    """
+    Per-node latency and token cost of the research graph under model tier
+    configurations. Profiles are 'single' (every node on the default model),
+    'tiered' (ROLE_SETTINGS) or a path to a LLM_ROLES_FILE JSON file. Runs
+    make real LLM calls with the response cache disabled; --plan only prints
+    the resolved models and needs no API keys.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--profiles", nargs="+", default=["single", "tiered"])
+    parser.add_argument("--query", default="分析TSM和NVDA的近期表現與風險")
+    parser.add_argument("--style", default="Balanced")
+    parser.add_argument("--plan", action="store_true", help="Only print the resolved model per node")
+    parser.add_argument("--llm-router", action="store_true", help="Disable the router fast path so the router tier is measured")
+    parser.add_argument("--analyst-modes", nargs="+", default=[None], choices=["agent", "single_shot"],
+                        help="Run each profile once per analyst mode (default: ANALYST_MODE)")
+    args = parser.parse_args()
+
+    load_dotenv()
+    # Cached responses or reused research would hide the model's latency and cost
+    os.environ["LLM_CACHE"] = "0"
+    os.environ["RESEARCH_CACHE"] = "0"
+    if args.llm_router:
+        os.environ["ROUTER_FAST_PATH"] = "0"
+
+    for profile in args.profiles:
+        if args.plan:
+            print_plan(profile)
+        else:
+            for analyst_mode in args.analyst_modes:
+                run_profile(profile, args.query, args.style, analyst_mode)
+
+if __name__ == "__main__":
+    main()
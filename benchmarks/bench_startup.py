@@ -0,0 +1,83 @@
+import sys
+import os
+import argparse
+import importlib
+import time
+
+# Add the parent directory to sys.path to allow imports from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+# Nodes that build a ReAct agent per request (the editor calls its LLM directly)
+AGENT_NODES = [
+    "router", "data_analyst", "news_analyst", "trend_analyst", "pattern_analyst",
+    "indicator_analyst", "technical_strategist", "risk_manager",
+]
+
+STATE = {
+    "query": "分析TSM和NVDA的近期表現與風險",
+    "investment_style": "Balanced",
+    "tickers": ["TSM", "NVDA"],
+}
+
+def timed(func, repeat):
+    """Mean wall time of `func()` in milliseconds."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+def main():
+    """
+    Startup cost and per-request overhead of building the research runtime.
+    Reports the import time of the graph module (which compiles every node
+    prompt), the graph compilation time, and for each agent node the time to
+    build its agent from scratch versus reusing the cached one. The 'per
+    request' totals compare rebuilding everything on each request with the
+    build-once runtime. No LLM calls are made; a placeholder API key is used
+    when none is configured.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    load_dotenv()
+    # Building clients needs a key, not a valid one
+    for name in ("OPENAI_API_KEY", "GOOGLE_API_KEY", "GROQ_API_KEY"):
+        os.environ.setdefault(name, "bench-placeholder")
+
+    start = time.perf_counter()
+    from src.graph import create_graph, get_graph
+    import_ms = (time.perf_counter() - start) * 1000
+    print(f"import src.graph (prompts compiled): {import_ms:8.1f} ms")
+
+    compile_ms = timed(create_graph, args.repeat)
+    get_graph()
+    reuse_ms = timed(get_graph, args.repeat)
+    print(f"{'graph':<22} {'rebuild ms':>11} {'reuse ms':>9}")
+    print(f"{'create_graph':<22} {compile_ms:>11.2f} {reuse_ms:>9.4f}")
+
+    cold_total = compile_ms
+    warm_total = reuse_ms
+    for node in AGENT_NODES:
+        module = importlib.import_module(f"src.agents.{node}")
+        # Pooled LLM clients are shared either way; keep their first build out of the numbers
+        module._build_agent(STATE)
+
+        def cold():
+            # Drop the cached agents so each call builds from scratch, as before the cache
+            module.PROMPT._agents.clear()
+            module._build_agent(STATE)
+
+        cold_ms = timed(cold, args.repeat)
+        warm_ms = timed(lambda: module._build_agent(STATE), args.repeat)
+        cold_total += cold_ms
+        warm_total += warm_ms
+        print(f"{node:<22} {cold_ms:>11.2f} {warm_ms:>9.4f}")
+
+    print(f"{'per request':<22} {cold_total:>11.2f} {warm_total:>9.4f}  "
+          f"(saves {cold_total - warm_total:.1f} ms, {cold_total / max(warm_total, 1e-9):.0f}x)")
+
+if __name__ == "__main__":
+    main()
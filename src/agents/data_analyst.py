@@ -1,56 +1,39 @@
 from langchain.agents import create_agent
 from ..state import AgentState
 from ..tools.finance_tools import get_stock_analysis_data 
+from ..tools.market_data import use_snapshot
 from ..utils import get_llm
+from ..research_cache import evidence_style
+from .prompts import NodePrompt
+from .single_shot import analyst_mode, single_shot, asingle_shot
 
-def data_analyst_node(state: AgentState):
-    """
-    Agent node specializing in quantitative financial analysis.
-    
-    This agent uses a ReAct pattern to fetch historical financial data and 
-    performs trend analysis on revenue, earnings, margins, and valuation 
-    metrics, tailored to the user's specific investment style.
-    
-    Args:
-        state (AgentState): The current state of the graph.
-        
-    Returns:
-        dict: A dictionary containing the 'data_analysis' report string.
+# Analysis framework per investment style
+STYLE_GUIDELINES = {
+    "Conservative": """
+    **STYLE GUIDELINE: CONSERVATIVE (保守型)**
+    - **Primary Focus**: Financial Health and Stability (財務體質與穩定性).
+    - **Analysis Requirement**: Strictly check Debt Ratios and Cash Flow Coverage. Emphasize the **stability of margins** over explosive growth.
+    - **Valuation Requirement**: Must rigorously scrutinize if P/E is far above historical averages.
+    """,
+    "Aggressive": """
+    **STYLE GUIDELINE: AGGRESSIVE (積極型)**
+    - **Primary Focus**: Growth Potential (成長潛力) and Efficiency.
+    - **Analysis Requirement**: Rigorously check Revenue and Earnings **growth trajectories**. Tolerate higher valuations, but require proof that ROE or operating margins are **expanding**.
+    - **Valuation Requirement**: Focus on growth-related multiples like PEG or EV/EBITDA.
+    """,
+    "Balanced": """
+    **STYLE GUIDELINE: BALANCED (穩健型)**
+    - **Primary Focus**: Growth at a Reasonable Price (GARP). (風險調整後回報).
+    - **Analysis Requirement**: Balance the check of financial health and growth trends. Emphasize that valuation must be reasonable.
     """
-    # Initialize the LLM with zero temperature for consistent quantitative results
-    llm = get_llm(temperature=0)
-    tools = [get_stock_analysis_data]
-    
-    # Retrieve investment style and determine the corresponding analysis framework
-    style = state.get("investment_style", "Balanced")
+}
 
-    style_guidelines = {
-        "Conservative": """
-        **STYLE GUIDELINE: CONSERVATIVE (保守型)**
-        - **Primary Focus**: Financial Health and Stability (財務體質與穩定性).
-        - **Analysis Requirement**: Strictly check Debt Ratios and Cash Flow Coverage. Emphasize the **stability of margins** over explosive growth.
-        - **Valuation Requirement**: Must rigorously scrutinize if P/E is far above historical averages.
-        """,
-        "Aggressive": """
-        **STYLE GUIDELINE: AGGRESSIVE (積極型)**
-        - **Primary Focus**: Growth Potential (成長潛力) and Efficiency.
-        - **Analysis Requirement**: Rigorously check Revenue and Earnings **growth trajectories**. Tolerate higher valuations, but require proof that ROE or operating margins are **expanding**.
-        - **Valuation Requirement**: Focus on growth-related multiples like PEG or EV/EBITDA.
-        """,
-        "Balanced": """
-        **STYLE GUIDELINE: BALANCED (穩健型)**
-        - **Primary Focus**: Growth at a Reasonable Price (GARP). (風險調整後回報).
-        - **Analysis Requirement**: Balance the check of financial health and growth trends. Emphasize that valuation must be reasonable.
-        """
-    }
-    current_guideline = style_guidelines.get(style, style_guidelines["Balanced"])
-    
-    # Define the system prompt for the financial data analyst agent
-    system_prompt = f"""You are a Senior Financial Data Analyst at a top-tier investment bank.
+# System prompt for the financial data analyst agent; the style guideline is appended last
+PROMPT = NodePrompt(
+    "data_analyst",
+    instructions="""You are a Senior Financial Data Analyst at a top-tier investment bank.
     Your goal is to provide a rigorous quantitative analysis of the provided tickers, **specifically addressing the user's question** with a focus on LONG-TERM TRENDS.
-    
-    **Current Investment Strategy: {style}**
-    {current_guideline}
+    Apply the Current Investment Strategy given at the end of these instructions.
     
     1. **Data Retrieval**: Use the `get_stock_analysis_data` tool to fetch 5-year historical data.
     
@@ -80,31 +63,96 @@ def data_analyst_node(state: AgentState):
     Ensure numbers are formatted legibly (e.g., 1.2B, 35%).
     Use data from the "Income Statement Trends" and "Balance Sheet Trends" sections provided by the tool.
     If comparing multiple tickers, a comparison table is highly recommended.
-    """
+    """,
+    task="""Analyze the following tickers: {tickers}. 
 
-    # Initialize the ReAct agent with specific financial tools
-    agent = create_agent(
-        model=llm,
-        tools=tools,
-        system_prompt=system_prompt
-    )
-    
+        User's Specific Question: {query}
+
+        **Specific Instructions from Lead**:
+        {instructions}
+        """,
+    guidelines=STYLE_GUIDELINES,
+    neutral=True,
+)
+
+# Tools the analyst calls once per ticker
+TOOLS = [get_stock_analysis_data]
+
+def _task(state: AgentState):
+    """Builds the Data Analyst task message for the current state."""
     # Extract ticker list and user query from current graph state
     tickers = state["tickers"]
     query = state["query"]
     instructions = state.get("data_analyst_instructions", "")
     
     # Construct the user prompt with specific tickers and lead instructions
-    user_message = f"""Analyze the following tickers: {tickers}. 
+    user_message = PROMPT.task(tickers=tickers, query=query, instructions=instructions)
 
-        User's Specific Question: {query}
+    return user_message
 
-        **Specific Instructions from Lead**:
-        {instructions}
-        """
+def _build_agent(state: AgentState):
+    """Builds the Data Analyst agent and its task message for the current state."""
+    # Initialize the LLM with zero temperature for consistent quantitative results
+    llm = get_llm(temperature=0, role="data_analyst")
+    
+    # Retrieve the evidence style (Neutral when the run's evidence is cached); it selects the precompiled system prompt
+    style = evidence_style(state)
+
+    # Initialize the ReAct agent with specific financial tools, built once per LLM and style
+    agent = PROMPT.agent(llm, style, lambda system_prompt: create_agent(
+        model=llm,
+        tools=TOOLS,
+        system_prompt=system_prompt
+    ))
+    
+    return agent, _task(state)
+
+def data_analyst_node(state: AgentState):
+    """
+    Agent node specializing in quantitative financial analysis.
+    
+    This agent uses a ReAct pattern to fetch historical financial data and 
+    performs trend analysis on revenue, earnings, margins, and valuation 
+    metrics, tailored to the user's specific investment style.
+    
+    With `analyst_mode` 'single_shot', the tools run directly for every ticker
+    and the report takes a single LLM call instead of the ReAct loop.
+    
+    Args:
+        state (AgentState): The current state of the graph.
         
+    Returns:
+        dict: A dictionary containing the 'data_analysis' report string.
+    """
+    # Single-shot mode: the tools run directly for every ticker, then one LLM call
+    if analyst_mode(state) == "single_shot":
+        llm = get_llm(temperature=0, role="data_analyst")
+        style = evidence_style(state)
+        return {"data_analysis": single_shot(llm, PROMPT.system(style), _task(state), TOOLS, state)}
+    
+    agent, user_message = _build_agent(state)
+    
+    # Execute the agent workflow
+    with use_snapshot(state.get("market_data")):
+        result = agent.invoke({"messages": [("human", user_message)]})
+    
+    # Retrieve the final generated analysis content
+    last_message = result["messages"][-1]
+    return {"data_analysis": last_message.content}
+
+async def adata_analyst_node(state: AgentState):
+    """Async variant of `data_analyst_node`: awaits the agent so the event loop is free during LLM calls."""
+    # Single-shot mode: the tools run directly for every ticker, then one LLM call
+    if analyst_mode(state) == "single_shot":
+        llm = get_llm(temperature=0, role="data_analyst")
+        style = evidence_style(state)
+        return {"data_analysis": await asingle_shot(llm, PROMPT.system(style), _task(state), TOOLS, state)}
+    
+    agent, user_message = _build_agent(state)
+    
     # Execute the agent workflow
-    result = agent.invoke({"messages": [("human", user_message)]})
+    with use_snapshot(state.get("market_data")):
+        result = await agent.ainvoke({"messages": [("human", user_message)]})
     
     # Retrieve the final generated analysis content
     last_message = result["messages"][-1]
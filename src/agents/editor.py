@@ -1,58 +1,38 @@
 from langchain_core.messages import SystemMessage, HumanMessage
 from ..state import AgentState
 from ..utils import get_llm
+from ..research_cache import style_view
+from .prompts import NodePrompt
 
-def editor_node(state: AgentState):
-    """
-    Chief Editor node that synthesizes all individual agent reports into a professional memo.
+# Style-specific writing guidelines to shape the final narrative
+STYLE_GUIDELINES = {
+    "Conservative": """
+    **STYLE MODE: CONSERVATIVE (保守型)**
+    - **Tone**: Cautious, protective, and skeptical.
+    - **Verdict Logic**: If there is significant downside risk or high valuation, lean towards HOLD or SELL. Prioritize capital preservation over growth.
+    - **Key Phrase**: "While growth is visible, the valuation leaves no margin of safety..."
+    """,
     
-    This node acts as the final aggregator, applying investment style filters (Conservative, 
-    Aggressive, or Balanced) to ensure the tone, verdict logic, and risk weighting 
-    align with the user's selected strategy.
+    "Aggressive": """
+    **STYLE MODE: AGGRESSIVE (積極型)**
+    - **Tone**: Bold, visionary, and forward-looking.
+    - **Verdict Logic**: If the growth thesis is intact, tolerate volatility and high valuations. Lean towards BUY on dips.
+    - **Key Phrase**: "Despite short-term volatility, the long-term growth story remains compelling..."
+    """,
     
-    Args:
-        state (AgentState): The current state containing all analysis reports.
-        
-    Returns:
-        dict: A dictionary containing the final 'final_report' in Markdown format.
+    "Balanced": """
+    **STYLE MODE: BALANCED (穩健型)**
+    - **Tone**: Objective, nuanced, and measured.
+    - **Verdict Logic**: Weigh risk vs. reward evenly. Look for "Growth at a Reasonable Price" (GARP).
     """
-    # Initialize the LLM with zero temperature for a stable, professional tone
-    llm = get_llm(temperature=0)
-    
-    # 1. Retrieve the investment style from the state (defaulting to Balanced)
-    style = state.get("investment_style", "Balanced")
-    
-    # 2. Define style-specific writing guidelines to shape the final narrative
-    style_guidelines = {
-        "Conservative": """
-        **STYLE MODE: CONSERVATIVE (保守型)**
-        - **Tone**: Cautious, protective, and skeptical.
-        - **Verdict Logic**: If there is significant downside risk or high valuation, lean towards HOLD or SELL. Prioritize capital preservation over growth.
-        - **Key Phrase**: "While growth is visible, the valuation leaves no margin of safety..."
-        """,
-        
-        "Aggressive": """
-        **STYLE MODE: AGGRESSIVE (積極型)**
-        - **Tone**: Bold, visionary, and forward-looking.
-        - **Verdict Logic**: If the growth thesis is intact, tolerate volatility and high valuations. Lean towards BUY on dips.
-        - **Key Phrase**: "Despite short-term volatility, the long-term growth story remains compelling..."
-        """,
-        
-        "Balanced": """
-        **STYLE MODE: BALANCED (穩健型)**
-        - **Tone**: Objective, nuanced, and measured.
-        - **Verdict Logic**: Weigh risk vs. reward evenly. Look for "Growth at a Reasonable Price" (GARP).
-        """
-    }
+}
 
-    current_guideline = style_guidelines.get(style, style_guidelines["Balanced"])
-
-    # Define the system prompt with structured reporting requirements
-    system_prompt = f"""You are the Chief Editor of a prestigious investment research firm (like Goldman Sachs or Morgan Stanley).
+# System prompt with structured reporting requirements; the style guideline is appended last
+PROMPT = NodePrompt(
+    "editor",
+    instructions="""You are the Chief Editor of a prestigious investment research firm (like Goldman Sachs or Morgan Stanley).
     Your goal is to compile a comprehensive "Sell-Side" Investment Report, **specifically addressing the user's question**. (您的目標是編寫一份全面的「賣方」投資報告，特別針對用戶的問題。)
-    
-    **Current Investment Strategy: {style}**
-    {current_guideline}
+    Apply the Current Investment Strategy given at the end of these instructions.
 
     Inputs:
     - User Query: The specific question the user asked.
@@ -60,6 +40,9 @@ def editor_node(state: AgentState):
     - News Analysis (Catalysts, Sentiment)
     - Technical Strategy (Trend, Patterns, Momentum)
     - Risk Assessment (Bear Case, Risk Score)
+    Only the analyses the research plan called for are provided; never mention or speculate about the missing ones.
+    An analysis starting with [TIMEOUT] was cut off by the research time limit, and one starting with [UNAVAILABLE] could not be produced: say in one sentence that this part is unavailable and do not fill the gap with assumptions.
+    The analyses may be written for every investment style, with separate verdicts or ratings per style: use only those of the client's style and never mention the others.
     
     Output:
     - A professional Markdown report in **Traditional Chinese (繁體中文)**.
@@ -67,9 +50,9 @@ def editor_node(state: AgentState):
         1. **Narrative Flow**: Write in full, professional paragraphs. Avoid excessive bullet points. 
         2. **Verifiable Evidence**: Every claim must be backed by specific data points, dates, or source names.
         3. **Argumentative**: Don't just summarize; argue a thesis.
-        4. **Consistency**: Ensure the Final Verdict aligns with the **{style}** strategy.
+        4. **Consistency**: Ensure the Final Verdict aligns with the current strategy.
     
-    Structure:
+    Structure (write only the sections listed under **Report Sections** in the request, keeping this order):
     1. **Executive Summary (執行摘要)**: Direct Answer, Rating, and core reasoning.
     2. **Investment Thesis (投資論點)**: The "Bull Case" narrative.
     3. **Valuation & Financials (估值與財務)**: Analysis of P/E, margins, and peer comparison.
@@ -78,41 +61,108 @@ def editor_node(state: AgentState):
     6. **Conclusion (結論)**: Final recommendation.
     
     Tone: Authoritative, professional, and decisive.
-    """
-    
-    # Extract components from the graph state
-    user_query = state.get("query", "No specific query provided.")
-    data_analysis = state.get("data_analysis")
-    news_analysis = state.get("news_analysis")
-    technical_strategy = state.get("technical_strategy")
-    risk_assessment = state.get("risk_assessment")
-    
-    # Compose the prompt for the editor
-    user_message = f"""User Query:
+    """,
+    task="""User Query:
     {user_query}
 
-    Data Analysis:
-    {data_analysis}
+{reports}    Risk Assessment:
+    {risk_assessment}
+
+    **Report Sections**: {sections}
 
-    News Analysis:
-    {news_analysis}
+    Please generate the final Investment Memo for a {style} client.""",
+    guidelines=STYLE_GUIDELINES,
+)
 
-    Technical Strategy:
-    {technical_strategy}
+# Upstream reports in presentation order; branches the router skipped are left out
+REPORT_INPUTS = [
+    ("Data Analysis", "data_analysis"),
+    ("News Analysis", "news_analysis"),
+    ("Technical Strategy", "technical_strategy"),
+]
 
-    Risk Assessment:
-    {risk_assessment}
+# Memo sections and the reports each one is built from (None: always written)
+REPORT_SECTIONS = [
+    ("Executive Summary (執行摘要)", None),
+    ("Investment Thesis (投資論點)", ("data_analysis", "news_analysis")),
+    ("Valuation & Financials (估值與財務)", ("data_analysis",)),
+    ("Technical Outlook (技術展望)", ("technical_strategy",)),
+    ("Risk Factors (Bear Case) (風險因素/看空情境)", ("risk_assessment",)),
+    ("Conclusion (結論)", None),
+]
+
+def _sections(state: AgentState):
+    """Numbered list of the memo sections supported by the reports present in the state."""
+    titles = [title for title, needs in REPORT_SECTIONS if needs is None or any(state.get(key) for key in needs)]
+    return ", ".join(f"{i}. {title}" for i, title in enumerate(titles, start=1))
 
-    Please generate the final Investment Memo for a {style} client."""
+def partial_memo(state: AgentState, note: str):
+    """Memo returned when the editor overruns its deadline budget: the note, then every finished report verbatim."""
+    reports = REPORT_INPUTS + [("Risk Assessment", "risk_assessment")]
+    style = state.get("investment_style", "Balanced")
+    return "\n\n".join(
+        [note] + [f"## {title}\n\n{style_view(state[key], style)}" for title, key in reports if state.get(key)]
+    )
+
+def _build_messages(state: AgentState):
+    """Builds the editor LLM and its prompt messages for the current state."""
+    # Initialize the LLM with zero temperature for a stable, professional tone
+    llm = get_llm(temperature=0, role="editor")
+    
+    # Retrieve the investment style from the state (defaulting to Balanced)
+    style = state.get("investment_style", "Balanced")
+    
+    # Extract components from the graph state, keeping only the reports that were produced
+    # (style-neutral reports are reduced to the client's style)
+    user_query = state.get("query", "No specific query provided.")
+    reports = "".join(
+        f"    {title}:\n    {style_view(state[key], style)}\n\n" for title, key in REPORT_INPUTS if state.get(key)
+    )
+    risk_assessment = state.get("risk_assessment")
+    
+    # Compose the prompt for the editor; its structure follows the sections present
+    user_message = PROMPT.task(
+        user_query=user_query,
+        reports=reports,
+        risk_assessment=risk_assessment,
+        sections=_sections(state),
+        style=style,
+    )
     
     messages = [
-        SystemMessage(content=system_prompt),
+        SystemMessage(content=PROMPT.system(style)),
         HumanMessage(content=user_message)
     ]
 
+    return llm, messages
+
+def editor_node(state: AgentState):
+    """
+    Chief Editor node that synthesizes all individual agent reports into a professional memo.
+    
+    This node acts as the final aggregator, applying investment style filters (Conservative, 
+    Aggressive, or Balanced) to ensure the tone, verdict logic, and risk weighting 
+    align with the user's selected strategy. The memo only includes the sections
+    backed by reports the router's branch plan produced.
+    
+    Args:
+        state (AgentState): The current state containing all analysis reports.
+        
+    Returns:
+        dict: A dictionary containing the final 'final_report' in Markdown format.
+    """
+    llm, messages = _build_messages(state)
+
     # Optimization: Direct LLM invocation is used instead of an Agent here.
     # Since the Editor only synthesizes existing data and doesn't need external tools,
     # direct invocation is faster and saves tokens by avoiding reasoning loops.
     response = llm.invoke(messages)
     
+    return {"final_report": response.content}
+
+async def aeditor_node(state: AgentState):
+    """Async variant of `editor_node`: awaits the LLM so the event loop is free while it writes."""
+    llm, messages = _build_messages(state)
+    response = await llm.ainvoke(messages)
+    
     return {"final_report": response.content}
\ No newline at end of file
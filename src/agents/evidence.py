@@ -0,0 +1,68 @@
+import asyncio
+from ..state import AgentState
+from ..research_cache import EVIDENCE_KEYS, research_cache_enabled, research_key, load_evidence, save_evidence
+from .technical_analyst import UNAVAILABLE_MARKER
+
+def research_cache_node(state: AgentState, technical="split"):
+    """
+    Research cache lookup node that runs between the Router and the prefetch.
+
+    The evidence of a run (the data, news and technical reports) is written
+    style-neutral, so a run of the same question, tickers and trading date in
+    any investment style can reuse it. On a hit the cached reports are put in
+    the state and the graph goes straight to the Risk Manager; on a miss the
+    evidence stage runs and `evidence_store_node` saves its reports.
+
+    Args:
+        state (AgentState): The current graph state after routing.
+        technical (str): Technical branch variant of the graph (part of the key).
+
+    Returns:
+        dict: The 'research_key', plus the cached reports and 'evidence_cached' on a hit.
+    """
+    if not research_cache_enabled() or not state.get("tickers"):
+        return {"research_key": None, "evidence_cached": False}
+    key = research_key(state, technical)
+
+    # A broken cache must never stop the workflow; the evidence is then researched again
+    try:
+        evidence = load_evidence(key)
+    except Exception as e:
+        print(f"DEBUG: Research cache lookup failed: {e}")
+        evidence = None
+    if not evidence:
+        return {"research_key": key, "evidence_cached": False}
+
+    print(f"DEBUG: Reusing cached research evidence ({', '.join(evidence)})")
+    return {**evidence, "research_key": key, "evidence_cached": True}
+
+def evidence_store_node(state: AgentState):
+    """
+    Join node closing the evidence stage: saves the reports of every branch
+    that ran under the run's research key.
+
+    Runs whose evidence is incomplete (a node overran its deadline budget or
+    returned an unavailable report) or that were not looked up are not saved.
+
+    Args:
+        state (AgentState): The current graph state with the analysts' reports.
+
+    Returns:
+        dict: An empty update.
+    """
+    key = state.get("research_key")
+    unavailable = any((state.get(name) or "").startswith(UNAVAILABLE_MARKER) for name in EVIDENCE_KEYS)
+    if key and not state.get("timeouts") and not unavailable:
+        try:
+            save_evidence(key, state)
+        except Exception as e:
+            print(f"DEBUG: Research cache write failed: {e}")
+    return {}
+
+async def aresearch_cache_node(state: AgentState, technical="split"):
+    """Async variant of `research_cache_node`: the SQLite lookup runs in a worker thread."""
+    return await asyncio.to_thread(research_cache_node, state, technical)
+
+async def aevidence_store_node(state: AgentState):
+    """Async variant of `evidence_store_node`: the SQLite write runs in a worker thread."""
+    return await asyncio.to_thread(evidence_store_node, state)
@@ -1,69 +1,116 @@
 from langchain.agents import create_agent
 from ..state import AgentState
 from ..tools.technical_tools import get_technical_data
+from ..tools.market_data import use_snapshot
 from ..utils import get_llm
+from .prompts import NodePrompt
+from .single_shot import analyst_mode, single_shot, asingle_shot
 
-def indicator_analyst_node(state: AgentState):
-    """
-    Agent node specializing in Quantitative Technical Indicators.
-    
-    This agent analyzes momentum oscillators and strength indicators, specifically 
-    RSI (14) and Momentum Index (MTM 10), to identify potential price exhaustion, 
-    reversal signals, or trend confirmation.
-    
-    Args:
-        state (AgentState): The current state of the graph.
-        
-    Returns:
-        dict: A dictionary containing the 'indicator_analysis' report string.
-    """
-    # Initialize the LLM with deterministic settings for technical calculation interpretation
-    llm = get_llm(temperature=0)
-    tools = [get_technical_data]
-    
-    # Define the system identity and specialized technical analysis requirements
-    system_prompt = """You are an analyst specializing in Quantitative Technical Indicators. (您是一位專注於量化技術指標的分析師。)
+# System identity and specialized technical analysis requirements
+PROMPT = NodePrompt(
+    "indicator_analyst",
+    instructions="""You are an analyst specializing in Quantitative Technical Indicators. (您是一位專注於量化技術指標的分析師。)
     Your goal is to provide a comprehensive momentum assessment, identify overbought/oversold conditions, and check for indicator divergence based on the technical data provided.
     
-    1. Use the `get_technical_data` tool to retrieve indicator data for **RSI (14)** and **Momentum Index (MTM 10)**.
+    1. Use the `get_technical_data` tool to retrieve indicator data for **RSI (14)** and **Momentum Index (MTM 10)**, together with **MACD (12,26,9)** and **Stochastic (14,3)**.
     2. **Momentum Assessment (動能評估 using MTM)**: MTM > 0 indicates strong upward momentum; MTM < 0 indicates strong downward momentum. Based on the value change of MTM and its relationship to the zero axis, determine if the current market momentum is strong, exhausted, or neutral.
     3. **Overbought/Oversold Check (超買/超賣判斷 using RSI)**: Determine if the RSI (14) is in the overbought (>70) or oversold (<30) zone, and explain its implication for short-term prices.
-    4. **Integrated Judgment (綜合判斷)**: Combine the signals from both MTM and RSI to provide an overall conclusion on market momentum.
+    4. **Confirmation (指標確認 using MACD & Stochastic)**: Check whether the MACD histogram sign and the Stochastic %K/%D crossover confirm or contradict the MTM and RSI readings.
+    5. **Integrated Judgment (綜合判斷)**: Combine the signals from MTM, RSI, MACD and Stochastic to provide an overall conclusion on market momentum.
     
     Output a structured analysis report in **Traditional Chinese (繁體中文)**.
     
     **CRITICAL OUTPUT FORMAT**:
     - **Momentum Assessment (動能評估)**: This is your primary momentum judgment. You **MUST** clearly state the MTM (10) value and its significance for market momentum (e.g., MTM is +1.78, showing slight upward momentum), and provide an overall momentum conclusion.
     - **RSI Signal (RSI 訊號)**: Specific RSI value and its overbought/oversold level (e.g., 41.72, in the neutral zone).
-    - **Divergence Check (指標背離)**: Briefly summarize if any indicator (RSI or MTM) shows divergence from the price action.
+    - **MACD & Stochastic (MACD 與隨機指標)**: MACD histogram and Stochastic %K/%D values, and whether they confirm the momentum assessment.
+    - **Divergence Check (指標背離)**: Briefly summarize if any indicator (RSI, MTM or MACD) shows divergence from the price action.
     
     **IMPORTANT**: 
     Start directly with the analysis.
-    """
-    
-    # Initialize the ReAct agent with technical analysis tools
-    agent = create_agent(
-        model=llm,
-        tools=tools,
-        system_prompt=system_prompt
-    )
-    
+    """,
+    task="""分析以下股票的技術指標狀況: {tickers}. 
+
+        用戶的特定問題: {query}
+
+        **來自主管的具體指示**:
+        {instructions}
+        """,
+)
+
+# Tools the analyst calls once per ticker
+TOOLS = [get_technical_data]
+
+def _task(state: AgentState):
+    """Builds the Indicator Analyst task message for the current state."""
     # Extract operational parameters from the state
     tickers = state["tickers"]
     query = state["query"]
     instructions = state.get("indicator_analyst_instructions", "")
     
     # Construct the task-specific message for the agent
-    user_message = f"""分析以下股票的技術指標狀況: {tickers}. 
+    user_message = PROMPT.task(tickers=tickers, query=query, instructions=instructions)
 
-        用戶的特定問題: {query}
+    return user_message
 
-        **來自主管的具體指示**:
-        {instructions}
-        """
+def _build_agent(state: AgentState):
+    """Builds the Indicator Analyst agent and its task message for the current state."""
+    # Initialize the LLM with deterministic settings for technical calculation interpretation
+    llm = get_llm(temperature=0, role="indicator_analyst")
+    
+    # Initialize the ReAct agent with technical analysis tools, built once per LLM and reused
+    agent = PROMPT.agent(llm, None, lambda system_prompt: create_agent(
+        model=llm,
+        tools=TOOLS,
+        system_prompt=system_prompt
+    ))
+    
+    return agent, _task(state)
+
+def indicator_analyst_node(state: AgentState):
+    """
+    Agent node specializing in Quantitative Technical Indicators.
+    
+    This agent analyzes momentum oscillators and strength indicators, specifically 
+    RSI (14) and Momentum Index (MTM 10), confirmed by MACD and Stochastic, to identify 
+    potential price exhaustion, reversal signals, or trend confirmation.
+    
+    With `analyst_mode` 'single_shot', the tools run directly for every ticker
+    and the report takes a single LLM call instead of the ReAct loop.
+    
+    Args:
+        state (AgentState): The current state of the graph.
         
+    Returns:
+        dict: A dictionary containing the 'indicator_analysis' report string.
+    """
+    # Single-shot mode: the tools run directly for every ticker, then one LLM call
+    if analyst_mode(state) == "single_shot":
+        llm = get_llm(temperature=0, role="indicator_analyst")
+        return {"indicator_analysis": single_shot(llm, PROMPT.system(), _task(state), TOOLS, state)}
+    
+    agent, user_message = _build_agent(state)
+    
+    # Execute the technical indicator analysis workflow
+    with use_snapshot(state.get("market_data")):
+        result = agent.invoke({"messages": [("human", user_message)]})
+    
+    # Return the generated technical report to the graph state
+    last_message = result["messages"][-1]
+    return {"indicator_analysis": last_message.content}
+
+async def aindicator_analyst_node(state: AgentState):
+    """Async variant of `indicator_analyst_node`: awaits the agent so the event loop is free during LLM calls."""
+    # Single-shot mode: the tools run directly for every ticker, then one LLM call
+    if analyst_mode(state) == "single_shot":
+        llm = get_llm(temperature=0, role="indicator_analyst")
+        return {"indicator_analysis": await asingle_shot(llm, PROMPT.system(), _task(state), TOOLS, state)}
+    
+    agent, user_message = _build_agent(state)
+    
     # Execute the technical indicator analysis workflow
-    result = agent.invoke({"messages": [("human", user_message)]})
+    with use_snapshot(state.get("market_data")):
+        result = await agent.ainvoke({"messages": [("human", user_message)]})
     
     # Return the generated technical report to the graph state
     last_message = result["messages"][-1]
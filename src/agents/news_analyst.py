@@ -2,54 +2,34 @@ from langchain.agents import create_agent
 from ..state import AgentState
 from ..tools.search_tools import search_news, web_search
 from ..utils import get_llm
+from ..research_cache import evidence_style
+from .prompts import NodePrompt
 
-def news_analyst_node(state: AgentState):
-    """
-    Finance News Analyst node that utilizes a ReAct agent to search, 
-    filter, and synthesize market news based on investment styles.
-    
-    This agent balances between broad ticker coverage and specific web 
-    searches to address the user's query, providing sentiment analysis, 
-    catalyst identification, and structured news summaries.
-    
-    Args:
-        state (AgentState): The current graph state.
-        
-    Returns:
-        dict: A dictionary containing the 'news_analysis' report string.
+# Searching and analysis guidelines per investment style
+STYLE_GUIDELINES = {
+    "Conservative": """
+    **STYLE GUIDELINE: CONSERVATIVE (保守型)**
+    - **Search Focus**: Prioritize searching for **downside risk news** (下行風險新聞) like macro economic risks, regulatory threats, potential litigation, and supply chain disruptions.
+    - **Analysis Focus**: Deeply analyze the rationale behind the Bear arguments and prioritize risk news in the summary.
+    """,
+    "Aggressive": """
+    **STYLE GUIDELINE: AGGRESSIVE (積極型)**
+    - **Search Focus**: Prioritize searching for **growth catalyst news** (成長催化劑新聞) like new product launches, expansion plans, technological breakthroughs, and upward guidance revisions.
+    - **Analysis Focus**: Deeply analyze the feasibility of the Bull arguments and prioritize growth catalysts in the summary.
+    """,
+    "Balanced": """
+    **STYLE GUIDELINE: BALANCED (穩健型)**
+    - **Search Focus**: Balance the search for both bullish and bearish news.
+    - **Analysis Focus**: Look for structural changes ignored by the market.
     """
-    # Initialize the LLM with zero temperature for objective synthesis
-    llm = get_llm(temperature=0)
-    tools = [search_news, web_search]
-    
-    # Retrieve investment style to apply specific searching and analysis guidelines
-    style = state.get("investment_style", "Balanced")
+}
 
-    style_guidelines = {
-        "Conservative": """
-        **STYLE GUIDELINE: CONSERVATIVE (保守型)**
-        - **Search Focus**: Prioritize searching for **downside risk news** (下行風險新聞) like macro economic risks, regulatory threats, potential litigation, and supply chain disruptions.
-        - **Analysis Focus**: Deeply analyze the rationale behind the Bear arguments and prioritize risk news in the summary.
-        """,
-        "Aggressive": """
-        **STYLE GUIDELINE: AGGRESSIVE (積極型)**
-        - **Search Focus**: Prioritize searching for **growth catalyst news** (成長催化劑新聞) like new product launches, expansion plans, technological breakthroughs, and upward guidance revisions.
-        - **Analysis Focus**: Deeply analyze the feasibility of the Bull arguments and prioritize growth catalysts in the summary.
-        """,
-        "Balanced": """
-        **STYLE GUIDELINE: BALANCED (穩健型)**
-        - **Search Focus**: Balance the search for both bullish and bearish news.
-        - **Analysis Focus**: Look for structural changes ignored by the market.
-        """
-    }
-    current_guideline = style_guidelines.get(style, style_guidelines["Balanced"])
-    
-    # Construct the system prompt defining the persona and reporting constraints
-    system_prompt = f"""You are a Senior News Analyst at a top-tier investment bank.
+# System prompt defining the persona and reporting constraints; the style guideline is appended last
+PROMPT = NodePrompt(
+    "news_analyst",
+    instructions="""You are a Senior News Analyst at a top-tier investment bank.
     Your goal is to synthesize market news into actionable insights, **specifically addressing the user's question**. (您的目標是將市場新聞合成可操作的見解，特別針對用戶的問題。)
-    
-    **Current Investment Strategy: {style}**
-    {current_guideline}
+    Apply the Current Investment Strategy given at the end of these instructions.
 
     **Recency Rule**: Prioritize news from the **last 7 days** unless the user query explicitly specifies an older time frame.
 
@@ -59,7 +39,7 @@ def news_analyst_node(state: AgentState):
        - **STRATEGY**: If the user asks a specific question, you MUST use `web_search` with a targeted query.
     
     2. **Context-Aware Analysis**: Address the user's specific concern using filtered news.
-    3. **Debate Analysis**: Present Bull vs Bear arguments adjusted for the {style} style.
+    3. **Debate Analysis**: Present Bull vs Bear arguments adjusted for the current investment style.
     4. **Catalyst Identification**: Identify events likely to trigger price movement.
     5. **Sentiment Analysis**: Assess the market sentiment score (1-10).
     
@@ -73,14 +53,33 @@ def news_analyst_node(state: AgentState):
     **CRITICAL RULE FOR TOOL USE:**
     1. **NO INTERNAL MONOLOGUE**: Output the JSON tool call IMMEDIATELY.
     2. **SILENCE**: Do not explain your search process.
-    """
+    """,
+    task="""Find and analyze news for the following tickers: {tickers}. 
+
+        User's Specific Question: {query}
+
+        **Specific Instructions from Lead**:
+        {instructions}
+        """,
+    guidelines=STYLE_GUIDELINES,
+    neutral=True,
+)
+
+def _build_agent(state: AgentState):
+    """Builds the News Analyst agent and its task message for the current state."""
+    # Initialize the LLM with zero temperature for objective synthesis
+    llm = get_llm(temperature=0, role="news_analyst")
+    tools = [search_news, web_search]
+    
+    # Retrieve the evidence style (Neutral when the run's evidence is cached); it selects the precompiled system prompt
+    style = evidence_style(state)
     
-    # Initialize the ReAct agent with search capabilities
-    agent = create_agent(
+    # Initialize the ReAct agent with search capabilities, built once per LLM and style
+    agent = PROMPT.agent(llm, style, lambda system_prompt: create_agent(
         model=llm,
         tools=tools,
         system_prompt=system_prompt
-    )
+    ))
     
     # Extract operational parameters from the state
     tickers = state["tickers"]
@@ -88,17 +87,41 @@ def news_analyst_node(state: AgentState):
     instructions = state.get("news_analyst_instructions", "")
     
     # Construct the message containing specific tickers and lead analyst instructions
-    user_message = f"""Find and analyze news for the following tickers: {tickers}. 
+    user_message = PROMPT.task(tickers=tickers, query=query, instructions=instructions)
 
-        User's Specific Question: {query}
+    return agent, user_message
 
-        **Specific Instructions from Lead**:
-        {instructions}
-        """
+def news_analyst_node(state: AgentState):
+    """
+    Finance News Analyst node that utilizes a ReAct agent to search, 
+    filter, and synthesize market news based on investment styles.
+    
+    This agent balances between broad ticker coverage and specific web 
+    searches to address the user's query, providing sentiment analysis, 
+    catalyst identification, and structured news summaries.
+    
+    Args:
+        state (AgentState): The current graph state.
+        
+    Returns:
+        dict: A dictionary containing the 'news_analysis' report string.
+    """
+    agent, user_message = _build_agent(state)
     
     # Execute the news analysis workflow
     result = agent.invoke({"messages": [("human", user_message)]})
     
+    # Retrieve the content from the final message in the interaction sequence
+    last_message = result["messages"][-1]
+    return {"news_analysis": last_message.content}
+
+async def anews_analyst_node(state: AgentState):
+    """Async variant of `news_analyst_node`: awaits the agent so the event loop is free during LLM calls."""
+    agent, user_message = _build_agent(state)
+    
+    # Execute the news analysis workflow
+    result = await agent.ainvoke({"messages": [("human", user_message)]})
+    
     # Retrieve the content from the final message in the interaction sequence
     last_message = result["messages"][-1]
     return {"news_analysis": last_message.content}
\ No newline at end of file
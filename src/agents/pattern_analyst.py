@@ -1,33 +1,21 @@
 from langchain.agents import create_agent
 from ..state import AgentState
 from ..tools.technical_tools import get_technical_data
+from ..tools.pattern_tools import detect_chart_patterns
+from ..tools.market_data import use_snapshot
 from ..utils import get_llm
+from .prompts import NodePrompt
+from .single_shot import analyst_mode, single_shot, asingle_shot
 
-def pattern_analyst_node(state: AgentState):
-    """
-    Technical Pattern Analyst node that identifies chart patterns and price action signals.
-    
-    This agent uses historical price data to detect classical technical patterns 
-    (e.g., Head and Shoulders, Double Top/Bottom, Triangles) and provides 
-    breakout/breakdown levels to inform trading decisions.
-    
-    Args:
-        state (AgentState): The current graph state.
-        
-    Returns:
-        dict: A dictionary containing the 'pattern_analysis' report string.
-    """
-    # Initialize the LLM with zero temperature for precise pattern recognition logic
-    llm = get_llm(temperature=0)
-    tools = [get_technical_data]
-    
-    # Define the specialized system prompt for the pattern analyst
-    system_prompt = """You are a Technical Analyst specializing in Chart Patterns. (您是一位專注於圖表型態的技術分析師。)
+# Specialized system prompt for the pattern analyst
+PROMPT = NodePrompt(
+    "pattern_analyst",
+    instructions="""You are a Technical Analyst specializing in Chart Patterns. (您是一位專注於圖表型態的技術分析師。)
     Your goal is to identify any potential price patterns based on the technical data and price action provided, and offer related trading implications.
     
-    1. Use the `get_technical_data` tool to retrieve historical stock price data.
-    2. **Pattern Identification (型態識別)**: Identify if any significant patterns (e.g., Head and Shoulders Bottom/Top, Double Bottom, Double Top, Triangle Consolidation, Box Consolidation) exist within the last 6 months.
-    3. **Pattern Interpretation (型態解讀)**: If a pattern is identified, explain its bullish/bearish implication and the key breakout/breakdown levels.
+    1. Use the `detect_chart_patterns` tool to retrieve the algorithmically detected patterns (Head and Shoulders Bottom/Top, Double Bottom, Double Top, Triangle Consolidation, Box Consolidation, Channels) for the last 6 months, with their key levels, status and confidence.
+    2. **Pattern Identification (型態識別)**: Report the detected patterns, prioritizing those with the highest confidence. Do not infer patterns the tool did not detect. Use `get_technical_data` only if you need the latest close or moving averages for context.
+    3. **Pattern Interpretation (型態解讀)**: If a pattern is identified, explain its bullish/bearish implication and the key breakout/breakdown levels reported by the tool.
     
     Output a structured analysis report in **Traditional Chinese (繁體中文)**.
     
@@ -38,31 +26,92 @@ def pattern_analyst_node(state: AgentState):
     
     **IMPORTANT**: 
     Start directly with the analysis.
-    """
-    
-    # Create the ReAct agent with the specified technical tools
-    agent = create_agent(
-        model=llm,
-        tools=tools,
-        system_prompt=system_prompt
-    )
-    
+    """,
+    task="""分析以下股票的型態狀況: {tickers}. 
+
+        用戶的特定問題: {query}
+
+        **來自主管的具體指示**:
+        {instructions}
+        """,
+)
+
+# Tools the analyst calls once per ticker
+TOOLS = [detect_chart_patterns, get_technical_data]
+
+def _task(state: AgentState):
+    """Builds the Pattern Analyst task message for the current state."""
     # Extract operational parameters from the state
     tickers = state["tickers"]
     query = state["query"]
     instructions = state.get("pattern_analyst_instructions", "")
     
     # Construct the task-specific message for pattern detection
-    user_message = f"""分析以下股票的型態狀況: {tickers}. 
+    user_message = PROMPT.task(tickers=tickers, query=query, instructions=instructions)
 
-        用戶的特定問題: {query}
+    return user_message
 
-        **來自主管的具體指示**:
-        {instructions}
-        """
+def _build_agent(state: AgentState):
+    """Builds the Pattern Analyst agent and its task message for the current state."""
+    # Initialize the LLM with zero temperature for precise pattern recognition logic
+    llm = get_llm(temperature=0, role="pattern_analyst")
+    
+    # Create the ReAct agent with the specified technical tools, built once per LLM and reused
+    agent = PROMPT.agent(llm, None, lambda system_prompt: create_agent(
+        model=llm,
+        tools=TOOLS,
+        system_prompt=system_prompt
+    ))
+    
+    return agent, _task(state)
+
+def pattern_analyst_node(state: AgentState):
+    """
+    Technical Pattern Analyst node that identifies chart patterns and price action signals.
+    
+    Classical technical patterns (e.g., Head and Shoulders, Double Top/Bottom, 
+    Triangles) are detected algorithmically by the `detect_chart_patterns` tool; 
+    this agent interprets the structured findings and their breakout/breakdown 
+    levels to inform trading decisions.
+    
+    With `analyst_mode` 'single_shot', the tools run directly for every ticker
+    and the report takes a single LLM call instead of the ReAct loop.
+    
+    Args:
+        state (AgentState): The current graph state.
         
+    Returns:
+        dict: A dictionary containing the 'pattern_analysis' report string.
+    """
+    # Single-shot mode: the tools run directly for every ticker, then one LLM call
+    if analyst_mode(state) == "single_shot":
+        llm = get_llm(temperature=0, role="pattern_analyst")
+        return {"pattern_analysis": single_shot(llm, PROMPT.system(), _task(state), TOOLS, state)}
+    
+    agent, user_message = _build_agent(state)
+    
+    # Invoke the agent to perform the analysis
+    with use_snapshot(state.get("market_data")):
+        result = agent.invoke({"messages": [("human", user_message)]})
+    
+    # Retrieve the content of the final output message
+    last_message = result["messages"][-1]
+    
+    # Return the identified pattern analysis to the shared state
+    return {"pattern_analysis": last_message.content}
+
+async def apattern_analyst_node(state: AgentState):
+    """Async variant of `pattern_analyst_node`: awaits the agent so the event loop is free during LLM calls."""
+    # Single-shot mode: the tools run directly for every ticker, then one LLM call
+    if analyst_mode(state) == "single_shot":
+        llm = get_llm(temperature=0, role="pattern_analyst")
+        return {"pattern_analysis": await asingle_shot(llm, PROMPT.system(), _task(state), TOOLS, state)}
+    
+    agent, user_message = _build_agent(state)
+    
     # Invoke the agent to perform the analysis
-    result = agent.invoke({"messages": [("human", user_message)]})
+    with use_snapshot(state.get("market_data")):
+        result = await agent.ainvoke({"messages": [("human", user_message)]})
     
     # Retrieve the content of the final output message
     last_message = result["messages"][-1]
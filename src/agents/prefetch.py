@@ -0,0 +1,37 @@
+import asyncio
+from ..state import AgentState
+from ..tools.market_data import prefetch_market_data
+from .router import BRANCHES
+
+def prefetch_node(state: AgentState):
+    """
+    Data prefetch node that runs between the Router and the analyst fan-out.
+    
+    Instead of every analyst fetching ticker by ticker inside its own ReAct loop,
+    this node downloads daily/monthly OHLCV for all tickers in one batched request
+    and fetches valuation info and annual statements concurrently (only when the
+    fundamentals branch is planned). The compact result is stored in the state,
+    where the data tools read it first.
+    
+    Args:
+        state (AgentState): The current graph state containing the extracted tickers.
+        
+    Returns:
+        dict: A dictionary updating the state with the 'market_data' snapshot.
+    """
+    tickers = state.get("tickers") or []
+    # Valuation info and statements are only read by the Data Analyst
+    fundamentals = "fundamentals" in (state.get("branches") or BRANCHES)
+    
+    # A failed prefetch must never stop the workflow; tools fall back to live fetches
+    try:
+        snapshot = prefetch_market_data(tickers, fundamentals=fundamentals)
+    except Exception as e:
+        print(f"DEBUG: Market data prefetch failed: {e}")
+        snapshot = {}
+        
+    return {"market_data": snapshot}
+
+async def aprefetch_node(state: AgentState):
+    """Async variant of `prefetch_node`: runs the blocking downloads in a worker thread."""
+    return await asyncio.to_thread(prefetch_node, state)
@@ -0,0 +1,111 @@
+from ..tools.encoding import estimate_tokens
+
+# Precompiled node prompts with cache-friendly segment order.
+#
+# Providers cache the longest previously seen prompt prefix (tool schemas, then
+# messages in order), so each node's system prompt starts with its long,
+# invariant instructions and ends with the short investment-style segment; the
+# query, tickers and lead instructions follow in the human message. All style
+# variants are assembled once at import, so every request with the same style
+# sends a byte-identical system prompt, and all styles share the instructions
+# as a common prefix.
+#
+# Agents are built once as well: each node reuses the agent compiled for its
+# (pooled) LLM and style, so a request only formats its human message.
+
+DEFAULT_STYLE = "Balanced"
+
+# Pseudo-style of the evidence stage (see src/research_cache.py): one report
+# that serves every investment style, so it can be shared across styles
+NEUTRAL_STYLE = "Neutral"
+
+# Style segment appended after the invariant instructions
+STYLE_SEGMENT = """
+    **Current Investment Strategy: {style}**
+    {guideline}
+    """
+
+# Investment styles a client can choose
+INVESTMENT_STYLES = ("Conservative", "Aggressive", "Balanced")
+
+# Tag opening a line of a neutral report that only clients of one style see
+STYLE_TAG = "[{style}]"
+
+# Guideline of the neutral variant, followed by every style's guideline
+NEUTRAL_GUIDELINE = """**STYLE-NEUTRAL EVIDENCE (適用所有投資風格)**
+    This report is shared by clients of every investment style listed below. Cover the focus points of each style with equal care and report the evidence each one needs. Wherever a style implies its own verdict or rating, give it for each style separately, each on its own line starting with the style's tag: {tags} (e.g. `- [Conservative] Short-Term Technical Rating: NEUTRAL ...`). Each client only sees the tagged lines of their own style, so never tag shared analysis and never mention another style in an untagged line.
+    {guidelines}"""
+
+# Every compiled prompt by node name, for prefix-size reporting
+PROMPTS = {}
+
+
+class NodePrompt:
+    """
+    System prompt and task template of one graph node.
+
+    Args:
+        node (str): Graph node name.
+        instructions (str): Invariant system instructions (the cacheable prefix).
+        task (str): Human message template, formatted per request with `str.format`.
+        guidelines (Dict[str, str], optional): Investment style -> guideline text, appended after the instructions.
+        segment (str): Template of the style segment with `{style}` and `{guideline}` placeholders.
+        neutral (bool): Also compile a NEUTRAL_STYLE variant that combines every guideline (evidence nodes).
+    """
+
+    def __init__(self, node, instructions, task, guidelines=None, segment=STYLE_SEGMENT, neutral=False):
+        self.node = node
+        self.instructions = instructions
+        self.task_template = task
+        self._systems = {
+            style: instructions + segment.format(style=style, guideline=guideline)
+            for style, guideline in (guidelines or {}).items()
+        }
+        if neutral and guidelines:
+            tags = ", ".join(f"`{STYLE_TAG.format(style=style)}`" for style in guidelines)
+            combined = NEUTRAL_GUIDELINE.format(tags=tags, guidelines="".join(guidelines.values()))
+            self._systems[NEUTRAL_STYLE] = instructions + segment.format(style=NEUTRAL_STYLE, guideline=combined)
+        # (id(llm), style) -> (llm, agent); the LLM is kept so a reused id never matches
+        self._agents = {}
+        PROMPTS[node] = self
+
+    def system(self, style=DEFAULT_STYLE):
+        """Returns the precompiled system prompt for an investment style (unknown styles use Balanced)."""
+        if not self._systems:
+            return self.instructions
+        return self._systems.get(style) or self._systems[DEFAULT_STYLE]
+
+    def agent(self, llm, style, build):
+        """
+        Returns the node's agent for an LLM and investment style, building it on first use.
+
+        Args:
+            llm (BaseChatModel): The pooled chat model the agent runs on.
+            style (str): Investment style selecting the system prompt.
+            build (Callable[[str], Any]): Builds the agent from its system prompt.
+
+        Returns:
+            Any: The cached agent.
+        """
+        style = style if style in self._systems else DEFAULT_STYLE
+        key = (id(llm), style)
+        cached = self._agents.get(key)
+        if cached is None or cached[0] is not llm:
+            cached = (llm, build(self.system(style)))
+            self._agents[key] = cached
+        return cached[1]
+
+    def task(self, **values):
+        """Formats the human message with the per-request values (tickers, query, instructions...)."""
+        return self.task_template.format(**values)
+
+    def prefix_stats(self):
+        """Approximate token counts of the shared prefix and of the longest system prompt."""
+        prefix = estimate_tokens(self.instructions)
+        system = max([estimate_tokens(s) for s in self._systems.values()] or [prefix])
+        return {"prefix_tokens": prefix, "system_tokens": system, "prefix_ratio": round(prefix / system, 3)}
+
+
+def prefix_report():
+    """Returns the cacheable-prefix size of every compiled node prompt."""
+    return {node: prompt.prefix_stats() for node, prompt in PROMPTS.items()}
@@ -1,13 +1,106 @@
-from typing import List
+import os
+import re
+from typing import List, Optional
 from langchain.agents import create_agent
 from langchain_core.tools import tool
 from ..state import AgentState
+from ..tools.symbol_index import get_symbol_index
 from ..utils import get_llm
+from .prompts import NodePrompt
+
+# Queries left to the LLM even when every ticker resolves locally: long ones deserve
+# tailored instructions, and these markers imply tickers that are not named
+FAST_PATH_MAX_CHARS = 80
+IMPLICIT_SCOPE_MARKERS = (
+    "同業", "競爭", "對手", "供應鏈", "產業", "類股", "族群", "概念股", "相關", "之類",
+    "peer", "competitor", "rival", "sector", "industry", "supply chain", "related", "similar", "stocks like",
+)
+
+# Templated instructions used by the fast path, in the shape the Research Lead produces
+FAST_PATH_INSTRUCTIONS = {
+    "data_analyst_instructions": (
+        "Analyze {tickers}: revenue and earnings growth trajectory, gross/operating margin trends, "
+        "balance sheet health and free cash flow, and whether valuation (P/E, PEG) is justified by growth. "
+        "Answer the user's question: {query}"
+    ),
+    "news_analyst_instructions": (
+        "Search recent news for {tickers}: earnings and guidance, product or customer announcements, "
+        "regulatory and macro events, and the overall market sentiment. Answer the user's question: {query}"
+    ),
+    "trend_analyst_instructions": (
+        "Analyze the price direction of {tickers}: the 20-day vs 50-day Moving Average relationship, "
+        "key support and resistance levels, and the short- and medium-term trend."
+    ),
+    "pattern_analyst_instructions": (
+        "Identify chart and candlestick patterns for {tickers} (e.g. Head and Shoulders, Double Top/Bottom, "
+        "Triangles, Channels), with their key levels and whether they are confirmed."
+    ),
+    "indicator_analyst_instructions": (
+        "Evaluate momentum for {tickers} using the 14-period RSI, MACD and Stochastic, "
+        "flagging overbought/oversold conditions and divergences."
+    ),
+}
+
+# Research branches and the analysts they run: 'fundamentals' (Data Analyst),
+# 'news' (News Analyst), 'technical' (trend/pattern/indicator analysts and strategist)
+BRANCHES = ("fundamentals", "news", "technical")
+
+# Keywords that place a narrow question in a branch (ASCII keywords match whole words)
+BRANCH_KEYWORDS = {
+    "fundamentals": (
+        "財報", "營收", "獲利", "毛利", "營益率", "淨利", "估值", "本益比", "本淨比", "現金流", "負債", "股息", "殖利率",
+        "eps", "pe", "p/e", "peg", "roe", "valuation", "revenue", "earnings", "margin", "cash flow", "debt", "dividend",
+    ),
+    "news": (
+        "新聞", "消息", "事件", "催化", "法說", "傳聞", "政策", "關稅", "情緒",
+        "news", "headline", "announcement", "catalyst", "sentiment", "rumor",
+    ),
+    "technical": (
+        "rsi", "macd", "kd", "均線", "移動平均", "超買", "超賣", "型態", "技術面", "技術分析", "支撐", "壓力", "突破", "跌破",
+        "k線", "動能", "背離", "布林", "走勢", "sma", "moving average", "support", "resistance", "overbought", "oversold",
+        "chart", "pattern", "technical", "momentum", "breakout", "stochastic",
+    ),
+}
+
+# Investment-decision wording needs every branch, whatever else the question mentions
+# ('超買'/'超賣' are indicator terms, so bare '買'/'賣' are not markers)
+DECISION_MARKERS = (
+    "買進", "買入", "賣出", "可以買", "能買", "該買", "要買", "加碼", "減碼", "投資", "值得", "前景", "建議",
+    "buy", "sell", "invest", "outlook", "recommend",
+)
+
+def _keyword_pattern(keywords):
+    parts = [
+        rf"(?<![a-z]){re.escape(k)}(?![a-z])" if k.isascii() else re.escape(k)
+        for k in keywords
+    ]
+    return re.compile("|".join(parts))
+
+_BRANCH_PATTERNS = {branch: _keyword_pattern(keywords) for branch, keywords in BRANCH_KEYWORDS.items()}
+
+def _normalize_branches(branches):
+    """
+    Validates a branch plan; BRANCH_PLANNING=0, an empty or unusable plan runs every branch.
+
+    Returns:
+        List[str]: Planned branches in `BRANCHES` order.
+    """
+    planned = [b for b in BRANCHES if b in (branches or ())]
+    if not planned or os.getenv("BRANCH_PLANNING", "1") == "0":
+        return list(BRANCHES)
+    return planned
+
+def _plan_branches(query):
+    """Branches a query needs, from keywords; broad or investment-decision queries get all of them."""
+    folded = query.casefold()
+    if any(marker in folded for marker in DECISION_MARKERS):
+        return list(BRANCHES)
+    return _normalize_branches([b for b, pattern in _BRANCH_PATTERNS.items() if pattern.search(folded)])
 
 @tool
-def submit_routing_instructions(tickers: List[str], data_analyst_instructions: str, news_analyst_instructions: str, trend_analyst_instructions: str, pattern_analyst_instructions: str, indicator_analyst_instructions: str):
+def submit_routing_instructions(tickers: List[str], data_analyst_instructions: str, news_analyst_instructions: str, trend_analyst_instructions: str, pattern_analyst_instructions: str, indicator_analyst_instructions: str, branches: Optional[List[str]] = None):
     """
-    Submit the extracted tickers and specific instructions for the Data Analyst, News Analyst, Trend Analyst, Pattern Analyst, and Indicator Analyst.
+    Submit the extracted tickers, the research branches to run and specific instructions for the Data Analyst, News Analyst, Trend Analyst, Pattern Analyst, and Indicator Analyst.
     
     Args:
         tickers: List of stock tickers found in the query.
@@ -16,28 +109,14 @@ def submit_routing_instructions(tickers: List[str], data_analyst_instructions: s
         trend_analyst_instructions: Specific instructions for the Trend Analyst (MA, trend lines, direction).
         pattern_analyst_instructions: Specific instructions for the Pattern Analyst (candlestick and chart patterns).
         indicator_analyst_instructions: Specific instructions for the Indicator Analyst (RSI, MACD, Stochastic).
+        branches: Research branches the question needs, any of 'fundamentals' (Data Analyst), 'news' (News Analyst) and 'technical' (Trend, Pattern and Indicator Analysts). Omit or list all three for broad or buy/sell questions.
     """
     return "Instructions submitted."
 
-def router_node(state: AgentState):
-    """
-    Router agent node that extracts tickers and orchestrates task assignments.
-    
-    This agent acts as the gateway of the research workflow, parsing the user's 
-    intent to identify relevant stock symbols and generating tailored, high-precision 
-    instructions for each specialized sub-agent.
-    
-    Args:
-        state (AgentState): The current graph state containing the raw user query.
-        
-    Returns:
-        dict: A dictionary updating the state with tickers and individualized instructions.
-    """
-    # Initialize the LLM with zero temperature for reliable extraction and routing
-    llm = get_llm(temperature=0)
-    
-    # Define the core coordinating persona and task extraction logic
-    system_prompt = """You are a Senior Financial Research Lead.
+# System prompt for the core coordinating persona and task extraction logic
+PROMPT = NodePrompt(
+    "router",
+    instructions="""You are a Senior Financial Research Lead.
     Your job is to coordinate the research flow by analyzing the user's query and assigning tasks. (您的工作是透過分析用戶的查詢並分配任務來協調研究流程。)
     
     1. **Analyze User Query**: Understand the core question, hypothesis, or concern.
@@ -51,22 +130,54 @@ def router_node(state: AgentState):
     5. **Assign to Trend Analyst**: Create specific instructions, focusing on Moving Averages, price direction, and timeframes (e.g., "Analyze the relationship between the 20-day and 50-day Moving Averages.").
     6. **Assign to Pattern Analyst**: Create specific instructions, focusing on candlestick or chart patterns (e.g., "Look for a Head and Shoulders Bottom or a Flag pattern.").
     7. **Assign to Indicator Analyst**: Create specific instructions, focusing on momentum (RSI, MACD) and volatility indicators (e.g., "Evaluate momentum using the 14-period RSI.").
+    8. **Plan Branches**: Choose the research branches the question actually needs: 'fundamentals', 'news', 'technical'. A narrow question runs only its branch (e.g., "Is NVDA's RSI overbought?" needs only 'technical'; "What did TSM report for margins?" needs only 'fundamentals'). Broad, comparative or buy/sell questions need all three. Analysts of unplanned branches may get empty instructions.
        
     **Goal**: Do NOT just pass the general query. Translate the user's intent into precise, actionable technical instructions.
     
     You **MUST** call the `submit_routing_instructions` tool to output your decision.
+    """,
+    task="{query}",
+)
+
+def _fast_route(state: AgentState):
+    """
+    Routes simple queries from the local symbol index, without an LLM round trip.
+
+    Returns:
+        dict | None: The routing state update, or None when the query is ambiguous
+        or complex enough to need the Research Lead.
     """
+    if os.getenv("ROUTER_FAST_PATH", "1") == "0":
+        return None
+    query = state["query"].strip()
+    if len(query) > FAST_PATH_MAX_CHARS or any(m in query.casefold() for m in IMPLICIT_SCOPE_MARKERS):
+        return None
+    tickers, unresolved = get_symbol_index().resolve(query)
+    if not tickers or unresolved:
+        return None
+
+    print(f"DEBUG: Router fast path resolved {tickers}")
+    names = ", ".join(tickers)
+    update = {"tickers": tickers, "branches": _plan_branches(query)}
+    update.update({key: template.format(tickers=names, query=query) for key, template in FAST_PATH_INSTRUCTIONS.items()})
+    return update
+
+def _build_agent(state: AgentState):
+    """Builds the Research Lead routing agent for the current state."""
+    # Initialize the LLM with zero temperature for reliable extraction and routing
+    llm = get_llm(temperature=0, role="router")
     
-    # Create the ReAct agent with the routing tool
-    agent = create_agent(
+    # Create the ReAct agent with the routing tool, built once per LLM and reused
+    agent = PROMPT.agent(llm, None, lambda system_prompt: create_agent(
         model=llm,
         tools=[submit_routing_instructions],
         system_prompt=system_prompt
-    )
-    
-    # Execute routing by passing the raw query to the Research Lead agent
-    result = agent.invoke({"messages": [("human", state["query"])]})
-    
+    ))
+
+    return agent
+
+def _parse_routing(result, state: AgentState):
+    """Turns the routing agent's tool call into state updates, falling back to the raw query."""
     # Extract the tool call to parse the assigned instructions
     messages = result["messages"]
     tool_call = None
@@ -82,6 +193,7 @@ def router_node(state: AgentState):
         args = tool_call["args"]
         return {
             "tickers": args.get("tickers", []),
+            "branches": _normalize_branches(args.get("branches")),
             "data_analyst_instructions": args.get("data_analyst_instructions", ""),
             "news_analyst_instructions": args.get("news_analyst_instructions", ""),
             "trend_analyst_instructions": args.get("trend_analyst_instructions", ""),
@@ -93,9 +205,59 @@ def router_node(state: AgentState):
     default_instruction = state["query"]
     return {
         "tickers": [], 
+        "branches": list(BRANCHES),
         "data_analyst_instructions": default_instruction, 
         "news_analyst_instructions": default_instruction,
         "trend_analyst_instructions": default_instruction,
         "pattern_analyst_instructions": default_instruction,
         "indicator_analyst_instructions": default_instruction
-    }
\ No newline at end of file
+    }
+
+def timeout_route(state: AgentState):
+    """
+    Routing used when the Research Lead overruns its deadline budget: every
+    branch, the raw query as instructions, and the tickers the local symbol
+    index resolves from the query.
+    """
+    update = _parse_routing({"messages": []}, state)
+    update["tickers"] = get_symbol_index().resolve(state["query"])[0]
+    return update
+
+def router_node(state: AgentState):
+    """
+    Router agent node that extracts tickers and orchestrates task assignments.
+    
+    This agent acts as the gateway of the research workflow, parsing the user's 
+    intent to identify relevant stock symbols and generating tailored, high-precision 
+    instructions for each specialized sub-agent. Short queries whose tickers all
+    resolve from the local symbol index are routed with templated instructions,
+    without calling the LLM.
+    
+    Args:
+        state (AgentState): The current graph state containing the raw user query.
+        
+    Returns:
+        dict: A dictionary updating the state with tickers and individualized instructions.
+    """
+    # Simple queries naming known tickers skip the LLM on the critical path
+    update = _fast_route(state)
+    if update is not None:
+        return update
+    
+    agent = _build_agent(state)
+    
+    # Execute routing by passing the raw query to the Research Lead agent
+    result = agent.invoke({"messages": [("human", PROMPT.task(query=state["query"]))]})
+    return _parse_routing(result, state)
+
+async def arouter_node(state: AgentState):
+    """Async variant of `router_node`: awaits the agent so the event loop is free during LLM calls."""
+    update = _fast_route(state)
+    if update is not None:
+        return update
+    
+    agent = _build_agent(state)
+    
+    # Execute routing by passing the raw query to the Research Lead agent
+    result = await agent.ainvoke({"messages": [("human", PROMPT.task(query=state["query"]))]})
+    return _parse_routing(result, state)
\ No newline at end of file
@@ -0,0 +1,109 @@
+import asyncio
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.messages import SystemMessage, HumanMessage
+from ..tools.market_data import use_snapshot
+
+# Execution modes of the tool-driven analysts (data, trend, pattern, indicator).
+#
+# 'agent' runs the ReAct loop: one LLM call to emit the tool calls, the tools,
+# then a second call to write the report. These analysts always call the same
+# tools once per ticker, so 'single_shot' calls them directly, in parallel for
+# every ticker, puts their output in the task message and makes exactly one
+# LLM call. Open-ended agents (news analyst) always use the ReAct loop.
+
+ANALYST_MODES = ("agent", "single_shot")
+
+# Appended to the task message; the system prompt stays identical in both modes
+TOOL_OUTPUT_SEGMENT = """
+
+**Tool Output (already retrieved for every ticker; do NOT call any tool)**:
+{data}
+"""
+
+MAX_TOOL_WORKERS = 8
+
+
+def analyst_mode(state):
+    """Mode of the tool-driven analysts for a run: the state's `analyst_mode`, else ANALYST_MODE (default 'agent')."""
+    mode = state.get("analyst_mode") or os.getenv("ANALYST_MODE", "agent")
+    return mode if mode in ANALYST_MODES else "agent"
+
+
+def _run_tool(tool, ticker):
+    try:
+        return tool.invoke({"ticker": ticker})
+    except Exception as e:
+        # Reported to the model as text, as a ReAct tool error would be
+        return f"Error running {tool.name} for {ticker}: {e}"
+
+
+def _format_outputs(calls, outputs):
+    return "\n\n".join(f"### {tool.name}({ticker})\n{output}" for (tool, ticker), output in zip(calls, outputs))
+
+
+def run_tools(tools, tickers, market_data=None):
+    """
+    Calls every tool for every ticker in parallel and formats their outputs.
+
+    Args:
+        tools (List[BaseTool]): Tools taking a single `ticker` argument.
+        tickers (List[str]): Tickers extracted by the router.
+        market_data (Dict[str, Any], optional): Prefetched snapshot read first by the tools.
+
+    Returns:
+        str: One section per (tool, ticker) call, in ticker order.
+    """
+    calls = [(tool, ticker) for ticker in tickers for tool in tools]
+    if not calls:
+        return "No tickers were provided."
+    with use_snapshot(market_data):
+        with ThreadPoolExecutor(max_workers=min(MAX_TOOL_WORKERS, len(calls))) as pool:
+            # Each worker runs in a copy of the current context so it sees the snapshot
+            futures = [pool.submit(contextvars.copy_context().run, _run_tool, tool, ticker) for tool, ticker in calls]
+            outputs = [future.result() for future in futures]
+    return _format_outputs(calls, outputs)
+
+
+async def arun_tools(tools, tickers, market_data=None):
+    """Async variant of `run_tools`: the blocking tools run in worker threads."""
+    calls = [(tool, ticker) for ticker in tickers for tool in tools]
+    if not calls:
+        return "No tickers were provided."
+    with use_snapshot(market_data):
+        # to_thread copies the current context, snapshot included
+        outputs = await asyncio.gather(*[asyncio.to_thread(_run_tool, tool, ticker) for tool, ticker in calls])
+    return _format_outputs(calls, outputs)
+
+
+def _messages(system_prompt, user_message, data):
+    return [
+        SystemMessage(content=system_prompt),
+        HumanMessage(content=user_message + TOOL_OUTPUT_SEGMENT.format(data=data))
+    ]
+
+
+def single_shot(llm, system_prompt, user_message, tools, state):
+    """
+    Runs an analyst with pre-injected tool output and a single LLM call.
+
+    Args:
+        llm (BaseChatModel): The analyst's model.
+        system_prompt (str): The analyst's precompiled system prompt.
+        user_message (str): The analyst's task message.
+        tools (List[BaseTool]): Tools whose output the report is based on.
+        state (AgentState): Current graph state (tickers and prefetched market data).
+
+    Returns:
+        str: The generated report.
+    """
+    data = run_tools(tools, state["tickers"], state.get("market_data"))
+    return llm.invoke(_messages(system_prompt, user_message, data)).content
+
+
+async def asingle_shot(llm, system_prompt, user_message, tools, state):
+    """Async variant of `single_shot`."""
+    data = await arun_tools(tools, state["tickers"], state.get("market_data"))
+    response = await llm.ainvoke(_messages(system_prompt, user_message, data))
+    return response.content
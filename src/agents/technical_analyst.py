@@ -0,0 +1,108 @@
+from langchain_core.messages import SystemMessage, HumanMessage
+from pydantic import BaseModel, Field
+from ..state import AgentState
+from ..tools.technical_tools import get_technical_data
+from ..tools.pattern_tools import detect_chart_patterns
+from ..utils import get_llm
+from ..research_cache import evidence_style
+from .prompts import NodePrompt
+from .single_shot import TOOL_OUTPUT_SEGMENT, run_tools, arun_tools
+from .technical_strategist import STYLE_RULES
+
+class TechnicalReport(BaseModel):
+    """The four technical sections, each a Markdown report in Traditional Chinese (繁體中文)."""
+    trend_analysis: str = Field(description="Trend Overview (趨勢概況), MA Signal (均線信號: SMA_20 vs SMA_50) and Key Levels (關鍵價位: 90-day resistance and support).")
+    pattern_analysis: str = Field(description="Identified Pattern (識別型態), Pattern Implication (型態意義) and Breakout Levels (爆發點位), using only the detected patterns.")
+    indicator_analysis: str = Field(description="Momentum Assessment (動能評估, MTM 10 value), RSI Signal, MACD & Stochastic confirmation and Divergence Check (指標背離).")
+    technical_strategy: str = Field(description="Technical Summary (技術總結), Short-Term Technical Rating (BULLISH / NEUTRAL / BEARISH), Recommended Strategy (建議策略) and Signal Consistency (技術信號一致性).")
+
+# System prompt covering the trend, pattern, indicator and strategist roles; the style's rating rules are appended last
+PROMPT = NodePrompt(
+    "technical_analyst",
+    instructions="""You are a Senior Technical Strategist who performs the complete technical analysis alone: trends and moving averages, chart patterns, momentum indicators, and the integrated trading view. (您是一位資深技術策略師，獨自完成趨勢、型態、動能指標分析與整合的交易觀點。)
+    The output of `get_technical_data` (moving averages, RSI, MTM, MACD, Stochastic, 90-day levels) and `detect_chart_patterns` (algorithmically detected patterns with key levels, status and confidence) is provided for every ticker.
+    Apply the Current Investment Strategy and its rating rules given at the end of these instructions.
+
+    1. **Trend (趨勢分析)**: Determine the trend (Bullish, Bearish, or Consolidation) from the SMA_20 vs SMA_50 relationship, whether the price holds above key MAs, and the 90-day resistance and support levels.
+    2. **Patterns (型態分析)**: Report the detected patterns, prioritizing the highest confidence, with their implication and breakout/breakdown levels. Do not infer patterns that were not detected; if none, state that the price is in a no-obvious-pattern or consolidation phase.
+    3. **Indicators (指標分析)**: State the MTM (10) value and its momentum implication, whether RSI (14) is overbought (>70) or oversold (<30), whether MACD and Stochastic confirm them, and any divergence from price.
+    4. **Strategy (技術策略)**: Integrate the three into short-term (1 week) and medium-term (1 month) ratings that strictly follow the rating rules, a recommended trading strategy, and the most consistent and most contradictory signals.
+
+    Write every section in **Traditional Chinese (繁體中文)** Markdown, addressing the user's question where relevant.
+    Start each section directly with the analysis. Do NOT use introductory phrases.
+    """,
+    task="""分析以下股票的技術面 (趨勢、型態、動能指標與策略): {tickers}.
+
+        用戶的特定問題: {query}
+
+        **來自主管的具體指示**:
+        {instructions}
+        """,
+    guidelines=STYLE_RULES,
+    neutral=True,
+)
+
+# Opens every technical report when the model's answer could not be parsed
+UNAVAILABLE_MARKER = "[UNAVAILABLE]"
+
+# Tools whose output is computed once per ticker and shared by all four sections
+TOOLS = [get_technical_data, detect_chart_patterns]
+
+# Router instructions merged into the consolidated task
+_INSTRUCTION_KEYS = ("trend_analyst_instructions", "pattern_analyst_instructions", "indicator_analyst_instructions")
+
+def _task(state: AgentState):
+    """Builds the Technical Analyst task message from the router's three technical instructions."""
+    instructions = "\n        ".join(
+        f"- {state[key]}" for key in _INSTRUCTION_KEYS if state.get(key)
+    )
+    return PROMPT.task(tickers=state["tickers"], query=state["query"], instructions=instructions)
+
+def _build(state: AgentState, data):
+    """Builds the structured-output model and its prompt messages for the current state."""
+    # Initialize the LLM with zero temperature for consistent technical interpretation
+    llm = get_llm(temperature=0, role="technical_analyst")
+    style = evidence_style(state)
+
+    # The structured-output runnable is built once per LLM and reused
+    model = PROMPT.agent(llm, None, lambda system_prompt: llm.with_structured_output(TechnicalReport, include_raw=True))
+    messages = [
+        SystemMessage(content=PROMPT.system(style)),
+        HumanMessage(content=_task(state) + TOOL_OUTPUT_SEGMENT.format(data=data))
+    ]
+    return model, messages
+
+def _sections(result):
+    """Maps the structured report onto the four technical state keys."""
+    report = result.get("parsed")
+    if report is None:
+        # Keep the run going; the risk manager and the editor treat the marked branch as missing
+        note = f"{UNAVAILABLE_MARKER} technical_analyst returned no parsable report; this analysis is unavailable."
+        return {key: note for key in TechnicalReport.model_fields}
+    return report.model_dump()
+
+def technical_analyst_node(state: AgentState):
+    """
+    Consolidated technical node replacing the trend, pattern and indicator
+    analysts and the technical strategist.
+
+    Technical data and detected patterns are computed once per ticker and a
+    single structured LLM call writes all four sections, so the latency of the
+    technical branch is one model call instead of at least seven.
+
+    Args:
+        state (AgentState): The current graph state.
+
+    Returns:
+        dict: The 'trend_analysis', 'pattern_analysis', 'indicator_analysis'
+        and 'technical_strategy' reports.
+    """
+    data = run_tools(TOOLS, state["tickers"], state.get("market_data"))
+    model, messages = _build(state, data)
+    return _sections(model.invoke(messages))
+
+async def atechnical_analyst_node(state: AgentState):
+    """Async variant of `technical_analyst_node`: awaits the tools and the LLM so the event loop stays free."""
+    data = await arun_tools(TOOLS, state["tickers"], state.get("market_data"))
+    model, messages = _build(state, data)
+    return _sections(await model.ainvoke(messages))
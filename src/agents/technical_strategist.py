@@ -1,53 +1,35 @@
 from langchain.agents import create_agent
 from ..state import AgentState
 from ..utils import get_llm
+from ..research_cache import evidence_style
+from .prompts import NodePrompt
 
-def technical_strategist_node(state: AgentState):
-    """
-    Technical Strategist node that synthesizes inputs from Trend, Pattern, and Indicator Analysts.
-    
-    This agent consolidates various technical signals into a cohesive outlook and 
-    provides actionable trading recommendations based on the user's specific 
-    investment style (Conservative, Aggressive, or Balanced).
-    
-    Args:
-        state (AgentState): The current graph state containing individual analyst reports.
-        
-    Returns:
-        dict: A dictionary updating the state with the 'technical_strategy' report.
+# Style-specific rating logic
+STYLE_RULES = {
+    "Conservative": """
+    **RATING RULES: CONSERVATIVE (保守型)**
+    - **BUY Condition**: Must have all (Trend, Pattern, Indicator) signals **strongly Bullish**, and the price must be far from the 90-day resistance level.
+    - **SELL Condition**: Consider SELL or HOLD if even one major signal is Bearish (e.g., breaking below a key MA), or if indicators show **Overbought** conditions.
+    - **Recommendation Tendency**: Leans towards NEUTRAL or BEARISH, avoids chasing highs.
+    """,
+    "Aggressive": """
+    **RATING RULES: AGGRESSIVE (積極型)**
+    - **BUY Condition**: As long as the trend is clearly upward, a BUY recommendation is justified, even if indicators are temporarily overbought or a short-term consolidation pattern appears.
+    - **SELL Condition**: Only consider SELL if the price breaks below the long-term trend line or a **decisive reversal pattern** emerges.
+    - **Recommendation Tendency**: Leans towards BULLISH, provided there are no decisive bearish technical signals.
+    """,
+    "Balanced": """
+    **RATING RULES: BALANCED (穩健型)**
+    - **BUY/HOLD Condition**: At least two out of the three (Trend, Pattern, Indicator) signals must be Bullish, and indicator signals must not diverge from the price.
     """
-    # Initialize the LLM with zero temperature for consistent strategic synthesis
-    llm = get_llm(temperature=0)
-    
-    # Retrieve investment style and define style-specific rating logic
-    style = state.get("investment_style", "Balanced")
-
-    style_rules = {
-        "Conservative": """
-        **RATING RULES: CONSERVATIVE (保守型)**
-        - **BUY Condition**: Must have all (Trend, Pattern, Indicator) signals **strongly Bullish**, and the price must be far from the 90-day resistance level.
-        - **SELL Condition**: Consider SELL or HOLD if even one major signal is Bearish (e.g., breaking below a key MA), or if indicators show **Overbought** conditions.
-        - **Recommendation Tendency**: Leans towards NEUTRAL or BEARISH, avoids chasing highs.
-        """,
-        "Aggressive": """
-        **RATING RULES: AGGRESSIVE (積極型)**
-        - **BUY Condition**: As long as the trend is clearly upward, a BUY recommendation is justified, even if indicators are temporarily overbought or a short-term consolidation pattern appears.
-        - **SELL Condition**: Only consider SELL if the price breaks below the long-term trend line or a **decisive reversal pattern** emerges.
-        - **Recommendation Tendency**: Leans towards BULLISH, provided there are no decisive bearish technical signals.
-        """,
-        "Balanced": """
-        **RATING RULES: BALANCED (穩健型)**
-        - **BUY/HOLD Condition**: At least two out of the three (Trend, Pattern, Indicator) signals must be Bullish, and indicator signals must not diverge from the price.
-        """
-    }
-    current_rule = style_rules.get(style, style_rules["Balanced"])
+}
 
-    # Define the system prompt for the strategist persona
-    system_prompt = f"""You are a Senior Technical Strategist, responsible for integrating various technical analyses (Trend, Pattern, Indicator) into a coherent and actionable trading view. (您是一位資深技術策略師，負責將各項技術分析整合為一個連貫且具有行動力的交易觀點。)
+# System prompt for the strategist persona; the style's rating rules are appended last
+PROMPT = NodePrompt(
+    "technical_strategist",
+    instructions="""You are a Senior Technical Strategist, responsible for integrating various technical analyses (Trend, Pattern, Indicator) into a coherent and actionable trading view. (您是一位資深技術策略師，負責將各項技術分析整合為一個連貫且具有行動力的交易觀點。)
     Your goal is to provide a clear technical summary for the user's investment decision based on all technical analysis results.
-    
-    **Current Investment Strategy: {style}**
-    {current_rule}
+    Apply the Current Investment Strategy and its rating rules given at the end of these instructions.
 
     Inputs include:
     - Trend Analysis (趨勢分析)
@@ -55,7 +37,7 @@ def technical_strategist_node(state: AgentState):
     - Indicator Analysis (指標分析)
     
     Integrate this information and answer the following key questions:
-    1. **Overall Technical Rating**: What is the short-term (1 week) and medium-term (1 month) technical rating: Bullish (看漲), Bearish (看跌), or Neutral (中性)? (**Must strictly adhere to the {style} rating rules**).
+    1. **Overall Technical Rating**: What is the short-term (1 week) and medium-term (1 month) technical rating: Bullish (看漲), Bearish (看跌), or Neutral (中性)? (**Must strictly adhere to the current strategy's rating rules**).
     2. **Trading Strategy**: What is the recommended trading strategy? (e.g., Buy on dips, Wait for breakout, Observe, Reduce position).
     3. **Technical Summary**: Organize the most consistent and most contradictory technical signals.
     
@@ -69,14 +51,38 @@ def technical_strategist_node(state: AgentState):
     
     **IMPORTANT**: 
     Start directly with the analysis.
-    """
+    """,
+    task="""User Query:
+{user_query}
+
+Trend Analysis:
+{trend_analysis}
+
+Pattern Analysis:
+{pattern_analysis}
+
+Indicator Analysis:
+{indicator_analysis}
+
+請根據上述輸入，產生一個技術策略總結報告。""",
+    guidelines=STYLE_RULES,
+    neutral=True,
+)
+
+def _build_agent(state: AgentState):
+    """Builds the Technical Strategist agent and its task message for the current state."""
+    # Initialize the LLM with zero temperature for consistent strategic synthesis
+    llm = get_llm(temperature=0, role="technical_strategist")
+    
+    # Retrieve the evidence style (Neutral when the run's evidence is cached); it selects the system prompt and rating rules
+    style = evidence_style(state)
     
-    # Create the ReAct agent (no external tools needed as it synthesizes text inputs)
-    agent = create_agent(
+    # Create the ReAct agent (no external tools needed as it synthesizes text inputs), built once per LLM and style
+    agent = PROMPT.agent(llm, style, lambda system_prompt: create_agent(
         model=llm,
         tools=[],
         system_prompt=system_prompt
-    )
+    ))
     
     # Extract operational parameters and previous analysis results from the state
     user_query = state.get("query", "No specific query provided.")
@@ -85,23 +91,45 @@ def technical_strategist_node(state: AgentState):
     indicator_analysis = state.get("indicator_analysis", "No indicator analysis provided.")
     
     # Construct the synthesis prompt
-    user_message = f"""User Query:
-{user_query}
-
-Trend Analysis:
-{trend_analysis}
-
-Pattern Analysis:
-{pattern_analysis}
+    user_message = PROMPT.task(
+        user_query=user_query,
+        trend_analysis=trend_analysis,
+        pattern_analysis=pattern_analysis,
+        indicator_analysis=indicator_analysis,
+    )
 
-Indicator Analysis:
-{indicator_analysis}
+    return agent, user_message
 
-請根據上述輸入，產生一個技術策略總結報告。"""
+def technical_strategist_node(state: AgentState):
+    """
+    Technical Strategist node that synthesizes inputs from Trend, Pattern, and Indicator Analysts.
+    
+    This agent consolidates various technical signals into a cohesive outlook and 
+    provides actionable trading recommendations based on the user's specific 
+    investment style (Conservative, Aggressive, or Balanced).
+    
+    Args:
+        state (AgentState): The current graph state containing individual analyst reports.
+        
+    Returns:
+        dict: A dictionary updating the state with the 'technical_strategy' report.
+    """
+    agent, user_message = _build_agent(state)
     
     # Execute the agent to generate the strategic outlook
     result = agent.invoke({"messages": [("human", user_message)]})
     
+    # Return the synthesized technical strategy to the graph state
+    last_message = result["messages"][-1]
+    return {"technical_strategy": last_message.content}
+
+async def atechnical_strategist_node(state: AgentState):
+    """Async variant of `technical_strategist_node`: awaits the agent so the event loop is free during LLM calls."""
+    agent, user_message = _build_agent(state)
+    
+    # Execute the agent to generate the strategic outlook
+    result = await agent.ainvoke({"messages": [("human", user_message)]})
+    
     # Return the synthesized technical strategy to the graph state
     last_message = result["messages"][-1]
     return {"technical_strategy": last_message.content}
\ No newline at end of file
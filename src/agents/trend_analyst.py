@@ -1,28 +1,15 @@
 from langchain.agents import create_agent
 from ..state import AgentState
 from ..tools.technical_tools import get_technical_data
+from ..tools.market_data import use_snapshot
 from ..utils import get_llm
+from .prompts import NodePrompt
+from .single_shot import analyst_mode, single_shot, asingle_shot
 
-def trend_analyst_node(state: AgentState):
-    """
-    Technical Trend Analyst node focusing on price direction and moving averages.
-    
-    This agent retrieves historical price data and technical indicators to evaluate 
-    the relationship between short-term and medium-term moving averages (SMA_20 vs SMA_50) 
-    and identifies key support and resistance levels.
-    
-    Args:
-        state (AgentState): The current graph state.
-        
-    Returns:
-        dict: A dictionary updating the state with the 'trend_analysis' report.
-    """
-    # Initialize the LLM with zero temperature for consistent trend signal interpretation
-    llm = get_llm(temperature=0)
-    tools = [get_technical_data]
-    
-    # Define the system prompt for the trend analysis expert persona
-    system_prompt = """You are a Senior Technical Analyst specializing in Trends and Moving Averages (MA). (您是一位專注於趨勢和移動平均線的資深技術分析師。)
+# System prompt for the trend analysis expert persona
+PROMPT = NodePrompt(
+    "trend_analyst",
+    instructions="""You are a Senior Technical Analyst specializing in Trends and Moving Averages (MA). (您是一位專注於趨勢和移動平均線的資深技術分析師。)
     Your goal is to provide a clear trend assessment and key price level analysis based on the technical data provided.
     
     1. Use the `get_technical_data` tool to retrieve technical indicator data.
@@ -38,31 +25,89 @@ def trend_analyst_node(state: AgentState):
     
     **IMPORTANT**: 
     Start directly with the analysis.
-    """
-    
-    # Create the ReAct agent with the technical analysis toolset
-    agent = create_agent(
-        model=llm,
-        tools=tools,
-        system_prompt=system_prompt
-    )
-    
+    """,
+    task="""分析以下股票的趨勢狀況: {tickers}. 
+
+        用戶的特定問題: {query}
+
+        **來自主管的具體指示**:
+        {instructions}
+        """,
+)
+
+# Tools the analyst calls once per ticker
+TOOLS = [get_technical_data]
+
+def _task(state: AgentState):
+    """Builds the Trend Analyst task message for the current state."""
     # Extract operational parameters from the state
     tickers = state["tickers"]
     query = state["query"]
     instructions = state.get("trend_analyst_instructions", "")
     
     # Construct the task message for the trend analyst
-    user_message = f"""分析以下股票的趨勢狀況: {tickers}. 
+    user_message = PROMPT.task(tickers=tickers, query=query, instructions=instructions)
 
-        用戶的特定問題: {query}
+    return user_message
 
-        **來自主管的具體指示**:
-        {instructions}
-        """
+def _build_agent(state: AgentState):
+    """Builds the Trend Analyst agent and its task message for the current state."""
+    # Initialize the LLM with zero temperature for consistent trend signal interpretation
+    llm = get_llm(temperature=0, role="trend_analyst")
+    
+    # Create the ReAct agent with the technical analysis toolset, built once per LLM and reused
+    agent = PROMPT.agent(llm, None, lambda system_prompt: create_agent(
+        model=llm,
+        tools=TOOLS,
+        system_prompt=system_prompt
+    ))
+    
+    return agent, _task(state)
+
+def trend_analyst_node(state: AgentState):
+    """
+    Technical Trend Analyst node focusing on price direction and moving averages.
+    
+    This agent retrieves historical price data and technical indicators to evaluate 
+    the relationship between short-term and medium-term moving averages (SMA_20 vs SMA_50) 
+    and identifies key support and resistance levels.
+    
+    With `analyst_mode` 'single_shot', the tools run directly for every ticker
+    and the report takes a single LLM call instead of the ReAct loop.
+    
+    Args:
+        state (AgentState): The current graph state.
         
+    Returns:
+        dict: A dictionary updating the state with the 'trend_analysis' report.
+    """
+    # Single-shot mode: the tools run directly for every ticker, then one LLM call
+    if analyst_mode(state) == "single_shot":
+        llm = get_llm(temperature=0, role="trend_analyst")
+        return {"trend_analysis": single_shot(llm, PROMPT.system(), _task(state), TOOLS, state)}
+    
+    agent, user_message = _build_agent(state)
+    
+    # Execute the agent to perform technical trend evaluation
+    with use_snapshot(state.get("market_data")):
+        result = agent.invoke({"messages": [("human", user_message)]})
+    
+    # Return the generated trend report to the shared state
+    last_message = result["messages"][-1]
+    return {"trend_analysis": last_message.content}
+
+async def atrend_analyst_node(state: AgentState):
+    """Async variant of `trend_analyst_node`: awaits the agent so the event loop is free during LLM calls."""
+    # Single-shot mode: the tools run directly for every ticker, then one LLM call
+    if analyst_mode(state) == "single_shot":
+        llm = get_llm(temperature=0, role="trend_analyst")
+        return {"trend_analysis": await asingle_shot(llm, PROMPT.system(), _task(state), TOOLS, state)}
+    
+    agent, user_message = _build_agent(state)
+    
     # Execute the agent to perform technical trend evaluation
-    result = agent.invoke({"messages": [("human", user_message)]})
+    with use_snapshot(state.get("market_data")):
+        result = await agent.ainvoke({"messages": [("human", user_message)]})
     
     # Return the generated trend report to the shared state
     last_message = result["messages"][-1]
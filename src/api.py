@@ -1,17 +1,54 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from typing import Optional
 from dotenv import load_dotenv
-from src.graph import create_graph
+from src.graph import TECHNICAL_MODES, get_graph
+from src.checkpoints import open_checkpointer, get_checkpoint_stats
+from src.deadline import get_deadline_stats
+from src.research_cache import EVIDENCE_KEYS, get_research_cache_stats, style_view
+from src.state import TICKER_REPORT_KEYS, add_unique, merge_ticker_reports
+from src.tools.market_data import get_cache_stats
+from src.utils import warm_up_llm, aclose_llm_clients
+from src.llm_cache import get_llm_cache_stats
+from src.llm_scheduler import get_llm_scheduler_stats, request_scope
+import asyncio
 import json 
 import os 
+import time
+import uuid
 
 import pandas
 
 # Load environment variables from the .env file
 load_dotenv()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Compiles the research graph, opens the durable run checkpointer and warms
+    up the pooled LLM client at startup (set LLM_WARMUP=0 to skip the warm-up),
+    and closes the checkpoint database and the shared connection pools on shutdown.
+    """
+    global _checkpointer
+    async with open_checkpointer() as checkpointer:
+        _checkpointer = checkpointer
+        # Compile once; every request reuses the same graph
+        for mode in TECHNICAL_MODES:
+            _graph(mode)
+        if os.getenv("LLM_WARMUP", "1") != "0":
+            # Run in a worker thread so that a slow provider does not delay startup
+            asyncio.get_running_loop().run_in_executor(None, warm_up_llm)
+        try:
+            yield
+        finally:
+            _checkpointer = None
+            _checkpointed_graphs.clear()
+    await aclose_llm_clients()
+
 # Initialize the FastAPI application
-app = FastAPI(title="Investment Agent API")
+app = FastAPI(title="Investment Agent API", lifespan=lifespan)
 
 class ResearchRequest(BaseModel):
     """
@@ -20,66 +57,292 @@ class ResearchRequest(BaseModel):
     Attributes:
         query (str): The specific research question or list of stock tickers.
         style (str): The target investment strategy (e.g., Balanced, Growth, Value).
+        analyst_mode (str, optional): 'agent' or 'single_shot' for the tool-driven analysts (defaults to ANALYST_MODE).
+        technical_mode (str, optional): 'split' or 'consolidated' technical branch (defaults to TECHNICAL_MODE).
+        fanout (str, optional): 'batched' or 'per_ticker' analyst runs (defaults to FANOUT_MODE).
+        deadline_s (float, optional): Seconds the run may take (defaults to RESEARCH_DEADLINE; 0 for none).
     """
     query: str
     style: str = "Balanced"  # Default investment style is set to Balanced
+    analyst_mode: Optional[str] = None
+    technical_mode: Optional[str] = None
+    fanout: Optional[str] = None
+    deadline_s: Optional[float] = None
+
+# Graph nodes whose completion is reported to streaming clients
+STREAMED_NODES = (
+    "router", "research_cache", "prefetch", "data_analyst", "news_analyst", "trend_analyst", "pattern_analyst",
+    "indicator_analyst", "technical_strategist", "technical_analyst", "risk_manager", "editor",
+)
+
+# Durable checkpointer opened by the lifespan (None when CHECKPOINTS=0 or outside the app)
+_checkpointer = None
+_checkpointed_graphs = {}
+
+def _technical_mode(request: ResearchRequest):
+    """The request's technical variant (unknown values use 'split')."""
+    mode = request.technical_mode or os.getenv("TECHNICAL_MODE", "split")
+    return mode if mode in TECHNICAL_MODES else "split"
+
+def _graph(mode):
+    """Returns the compiled graph of a technical variant, bound to the checkpointer when one is open."""
+    graph = get_graph(mode)
+    if _checkpointer is None:
+        return graph
+    if mode not in _checkpointed_graphs:
+        # Same compiled graph, saving its state after every step
+        _checkpointed_graphs[mode] = graph.copy(update={"checkpointer": _checkpointer})
+    return _checkpointed_graphs[mode]
+
+def _graph_for(request: ResearchRequest):
+    """Returns the compiled graph of the request's technical variant."""
+    return _graph(_technical_mode(request))
+
+def _run_config(run_id, mode, deadline_s=None):
+    """
+    Graph config of a run: its checkpoint thread, the variant needed to resume
+    it and its deadline, split by the graph into per-node budgets.
+    """
+    if deadline_s is None:
+        deadline_s = float(os.getenv("RESEARCH_DEADLINE", "600"))
+    configurable = {"thread_id": run_id}
+    if deadline_s > 0:
+        configurable["deadline"] = time.time() + deadline_s
+    return {"configurable": configurable, "metadata": {"technical_mode": mode}}
+
+async def _finish_run(run_id):
+    """Drops the checkpoints of a completed run; only failed runs are kept for resuming."""
+    if _checkpointer is not None:
+        await _checkpointer.adelete_thread(run_id)
+
+def _initial_state(request: ResearchRequest):
+    """Builds the initial graph state with all required fields for the agentic architecture."""
+    return {
+        "query": request.query,
+        "investment_style": request.style,  # Pass the style parameter into the State
+        "analyst_mode": request.analyst_mode,
+        "fanout": request.fanout,
+        "tickers": [],
+        "branches": None,
+        "market_data": None,
+        "data_analyst_instructions": None,
+        "news_analyst_instructions": None,
+        "trend_analyst_instructions": None,
+        "pattern_analyst_instructions": None,
+        "indicator_analyst_instructions": None,
+        "data_analysis": None,
+        "news_analysis": None,
+        "trend_analysis": None,
+        "pattern_analysis": None,
+        "indicator_analysis": None,
+        "technical_strategy": None,
+        "risk_assessment": None,
+        "final_report": None,
+        "research_key": None,
+        "evidence_cached": False,
+        "timeouts": [],
+    }
+
+def _export_snapshot(result):
+    """Exports the resulting state to a JSON file for frontend development/testing."""
+    output_filename = "real_data_snapshot.json"
+    
+    # Use default=str to handle non-serializable objects like datetime
+    with open(output_filename, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=4, default=str)
+        
+    print(f"✅ Research data exported to: {os.path.abspath(output_filename)}")
 
 @app.post("/research")
 async def research(request: ResearchRequest):
     """
     Endpoint to trigger the multi-agent research workflow.
     
-    This route initializes the agent graph, passes the user query into the state,
+    This route runs the shared agent graph, passes the user query into the state,
     executes the analysis, and exports a snapshot of the results to a JSON file
     for development and debugging purposes.
+    
+    The run is checkpointed under a run id, returned as `run_id` in the result
+    and in the `X-Run-Id` header of an error response, so a failed run can be
+    continued with `/research/{run_id}/resume`.
+    
+    Evidence researched for the same question, tickers and trading date in any
+    investment style is reused (`evidence_cached`); only the risk assessment
+    and the memo are written again for the requested style.
+    
+    The run must finish within `deadline_s`. A node that overruns its share
+    returns a report marked [TIMEOUT] and is listed in `timeouts`; the memo is
+    still written from the reports that finished.
     """
+    run_id = uuid.uuid4().hex
+    mode = _technical_mode(request)
     try:
-        # Initialize the LangGraph workflow
-        graph = create_graph()
-        
-        # Initialize the state object with all required fields for the agentic architecture
-        initial_state = {
-            "query": request.query,
-            "investment_style": request.style,  # Pass the style parameter into the State
-            "tickers": [],
-            "data_analyst_instructions": None,
-            "news_analyst_instructions": None,
-            "trend_analyst_instructions": None,
-            "pattern_analyst_instructions": None,
-            "indicator_analyst_instructions": None,
-            "data_analysis": None,
-            "news_analysis": None,
-            "trend_analysis": None,
-            "pattern_analysis": None,
-            "indicator_analysis": None,
-            "technical_strategy": None,
-            "risk_assessment": None,
-            "final_report": None
-        }
-        
-        # Invoke the graph to start the multi-agent execution
-        result = graph.invoke(initial_state)
+        # Reuse the LangGraph workflow compiled at startup
+        graph = _graph(mode)
+        initial_state = _initial_state(request)
         
-        # Export the resulting state to a JSON file for frontend development/testing
-        output_filename = "real_data_snapshot.json"
+        # Run the graph asynchronously so concurrent requests share the event loop
+        # instead of blocking it for the whole multi-agent execution
+        # LLM calls of this request are queued fairly against other requests
+        cache_before = get_cache_stats()
+        with request_scope():
+            result = await graph.ainvoke(initial_state, _run_config(run_id, mode, request.deadline_s))
+        cache_after = get_cache_stats()
+        await _finish_run(run_id)
         
-        # Use default=str to handle non-serializable objects like datetime
-        with open(output_filename, "w", encoding="utf-8") as f:
-            json.dump(result, f, ensure_ascii=False, indent=4, default=str)
-            
-        print(f"✅ Research data exported to: {os.path.abspath(output_filename)}")
-        
-        return result
+        print(
+            f"📦 Market data: {cache_after['network_fetches'] - cache_before['network_fetches']} fetches, "
+            f"{cache_after['saved_round_trips'] - cache_before['saved_round_trips']} round-trips saved"
+        )
+        return _response(result, run_id)
         
     except Exception as e:
         # Print the full stack trace for backend debugging
         import traceback
         traceback.print_exc()
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=500, detail=str(e), headers={"X-Run-Id": run_id})
+
+def _client_view(update, style):
+    """Reduces the style-neutral evidence reports of a state or update to the client's style."""
+    return {key: style_view(value, style) if key in EVIDENCE_KEYS else value for key, value in update.items()}
+
+def _response(result, run_id):
+    """Turns a final graph state into the research response and exports its snapshot."""
+    result = _client_view(result, result.get("investment_style"))
+    # The prefetched market data is internal working state; keep it out of the response
+    result.pop("market_data", None)
+    result["run_id"] = run_id
+    _export_snapshot(result)
+    return result
+
+@app.post("/research/{run_id}/resume")
+async def resume_research(run_id: str, deadline_s: Optional[float] = None):
+    """
+    Continues a failed `/research` run from its last checkpoint.
+    
+    Nodes that completed before the failure are not executed again: only the
+    failed node and the nodes downstream of it run, within a new deadline
+    (`deadline_s` query parameter, defaults to RESEARCH_DEADLINE). Returns the
+    same payload as `/research`; 404 when the run is unknown, already completed
+    or expired, 503 when checkpointing is disabled.
+    """
+    if _checkpointer is None:
+        raise HTTPException(status_code=503, detail="Checkpointing is disabled (CHECKPOINTS=0)")
+    checkpoint = await _checkpointer.aget_tuple({"configurable": {"thread_id": run_id}})
+    if checkpoint is None:
+        raise HTTPException(status_code=404, detail=f"No resumable run '{run_id}'")
+    
+    # Resume on the variant the run started with
+    mode = checkpoint.metadata.get("technical_mode", "split")
+    try:
+        with request_scope():
+            # No input: continue from the saved state and pending node outputs
+            result = await _graph(mode).ainvoke(None, _run_config(run_id, mode, deadline_s))
+        await _finish_run(run_id)
+        return _response(result, run_id)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e), headers={"X-Run-Id": run_id})
+
+def _sse(event, data):
+    """Formats one server-sent event with a JSON payload."""
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+def _chunk_text(content):
+    """Extracts the text of a streamed message chunk (string or list of content blocks)."""
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block.get("text", "") for block in content
+        if isinstance(block, dict) and block.get("type") == "text"
+    )
+
+def _merge_update(result, update):
+    """Applies a node's update to the accumulated result with the graph's reducers."""
+    for key, value in update.items():
+        if key in TICKER_REPORT_KEYS:
+            # Per-ticker analysts each report one section; merge them as the graph does
+            value = merge_ticker_reports(result.get(key), value)
+        elif key == "timeouts":
+            value = add_unique(result.get(key), value)
+        result[key] = value
+
+@app.post("/research/stream")
+async def research_stream(request: ResearchRequest):
+    """
+    Streaming variant of `/research` using server-sent events.
+    
+    Emits a `node` event as soon as each graph node completes (router, research_cache
+    (carrying the reused reports on a hit), prefetch, the analysts, technical_strategist, risk_manager, editor) carrying that node's
+    state update (one event per ticker for analysts fanned out per ticker), `token` events with the editor's report text as it is generated,
+    and a final `done` event with the full result (the same payload `/research`
+    returns). Failures are reported as an `error` event carrying the `run_id`
+    to pass to `/research/{run_id}/resume`.
+    """
+    run_id = uuid.uuid4().hex
+    technical_mode = _technical_mode(request)
+    graph = _graph(technical_mode)
+    initial_state = _initial_state(request)
+
+    async def events():
+        result = dict(initial_state)
+        try:
+            # LLM calls of this request are queued fairly against other requests;
+            # 'updates' yields each node's output on completion, 'messages' yields LLM tokens
+            with request_scope():
+                async for mode, chunk in graph.astream(
+                    initial_state, _run_config(run_id, technical_mode, request.deadline_s), stream_mode=["updates", "messages"]
+                ):
+                    if mode == "messages":
+                        message, metadata = chunk
+                        text = _chunk_text(message.content)
+                        if metadata.get("langgraph_node") == "editor" and text:
+                            yield _sse("token", {"node": "editor", "text": text})
+                        continue
+                    for node, update in chunk.items():
+                        if node not in STREAMED_NODES:
+                            continue
+                        update = dict(update or {})
+                        _merge_update(result, update)
+                        # The prefetched market data is internal working state; keep it out of the stream
+                        update.pop("market_data", None)
+                        yield _sse("node", {"node": node, "update": _client_view(update, request.style)})
+
+            await _finish_run(run_id)
+            yield _sse("done", _response(result, run_id))
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            yield _sse("error", {"detail": str(e), "run_id": run_id})
+
+    # Disable proxy buffering so events reach the client as they are produced
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @app.get("/health")
 async def health():
     """
     Standard health check endpoint to verify service availability.
     """
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Exposes runtime counters: the shared market-data and LLM response cache statistics,
+    the LLM scheduler's queue depths and wait times, the checkpoint write times per node,
+    the number of deadline overruns per node and the research cache hit rate.
+    """
+    return {
+        "market_data_cache": get_cache_stats(),
+        "llm_cache": get_llm_cache_stats(),
+        "llm_scheduler": get_llm_scheduler_stats(),
+        "checkpoints": get_checkpoint_stats(),
+        "deadlines": get_deadline_stats(),
+        "research_cache": get_research_cache_stats(),
+    }
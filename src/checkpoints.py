@@ -0,0 +1,149 @@
+import os
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import aiosqlite
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+# Durable checkpoints of API graph runs.
+#
+# Every research request runs under a run id used as the LangGraph thread id.
+# After each superstep the graph state is saved to a local SQLite file, and the
+# output of every finished node is saved as soon as the node returns. When a
+# node fails (an editor timeout after the analysts have finished), the run can
+# be resumed by its id: LangGraph restores the last checkpoint, reuses the saved
+# outputs of the nodes that succeeded and re-executes only the failed node and
+# the nodes downstream of it. Runs that complete are deleted; failed runs are
+# kept for CHECKPOINT_TTL seconds.
+
+DEFAULT_PATH = os.path.join(os.path.dirname(__file__), "..", ".cache", "checkpoints.sqlite")
+DEFAULT_TTL = 24 * 3600
+
+
+def _node_of(config, task_path=""):
+    """Graph node a checkpoint write belongs to."""
+    namespace = config["configurable"].get("checkpoint_ns") or ""
+    # Agents built with create_agent checkpoint as subgraphs: 'data_analyst:<id>|model:<id>'
+    if namespace:
+        return namespace.split("|", 1)[0].split(":", 1)[0]
+    kind, _, rest = task_path.partition(", ")
+    if kind == "~__pregel_pull":
+        return rest.split(", ", 1)[0]
+    if kind == "~__pregel_push":
+        # Per-ticker sends are identified by position only
+        return "send"
+    # Checkpoint saved at the end of a superstep
+    return "superstep"
+
+
+class TimedCheckpointer(AsyncSqliteSaver):
+    """
+    SQLite checkpointer that times its writes per graph node.
+
+    Args:
+        conn (aiosqlite.Connection): Open connection to the checkpoint database.
+    """
+
+    def __init__(self, conn, **kwargs):
+        super().__init__(conn, **kwargs)
+        self._timings = {}
+
+    def _record(self, node, seconds):
+        timing = self._timings.setdefault(node, {"writes": 0, "seconds": 0.0, "max_seconds": 0.0})
+        timing["writes"] += 1
+        timing["seconds"] += seconds
+        timing["max_seconds"] = max(timing["max_seconds"], seconds)
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        start = time.perf_counter()
+        try:
+            return await super().aput(config, checkpoint, metadata, new_versions)
+        finally:
+            self._record(_node_of(config), time.perf_counter() - start)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        start = time.perf_counter()
+        try:
+            return await super().aput_writes(config, writes, task_id, task_path)
+        finally:
+            self._record(_node_of(config, task_path), time.perf_counter() - start)
+
+    async def prune(self, ttl):
+        """Deletes the checkpoints of runs not updated for `ttl` seconds; returns how many runs were dropped."""
+        await self.setup()
+        cutoff = time.time() - ttl
+        # Checkpoint ids are time-ordered UUIDs; the newest one per run dates its last update
+        async with self.conn.execute("SELECT thread_id, MAX(checkpoint_id) FROM checkpoints GROUP BY thread_id") as cursor:
+            rows = await cursor.fetchall()
+        stale = [thread_id for thread_id, checkpoint_id in rows if _checkpoint_time(checkpoint_id) < cutoff]
+        for thread_id in stale:
+            await self.adelete_thread(thread_id)
+        return len(stale)
+
+    def stats(self):
+        """Returns the number of checkpoint writes and their mean and max time in milliseconds, per node."""
+        by_node = {
+            node: {
+                "writes": t["writes"],
+                "mean_ms": round(t["seconds"] * 1000 / t["writes"], 3),
+                "max_ms": round(t["max_seconds"] * 1000, 3),
+            }
+            for node, t in self._timings.items()
+        }
+        writes = sum(t["writes"] for t in self._timings.values())
+        seconds = sum(t["seconds"] for t in self._timings.values())
+        return {
+            "writes": writes,
+            "mean_ms": round(seconds * 1000 / writes, 3) if writes else 0.0,
+            "by_node": by_node,
+        }
+
+
+def _checkpoint_time(checkpoint_id):
+    """Unix time encoded in a checkpoint id (a version 6 UUID)."""
+    value = int(checkpoint_id.replace("-", ""), 16)
+    # v6 stores the 60-bit timestamp (100 ns since 1582-10-15) in its leading bits
+    timestamp = ((value >> 80) << 12) | ((value >> 64) & 0x0FFF)
+    return (timestamp - 0x01B21DD213814000) / 1e7
+
+
+# Checkpointer of the running API process
+_active = None
+
+
+@asynccontextmanager
+async def open_checkpointer(path=None):
+    """
+    Opens the durable checkpointer for the lifetime of the API (None when CHECKPOINTS=0).
+
+    Runs older than CHECKPOINT_TTL seconds are pruned on open.
+
+    Args:
+        path (str, optional): Database file; defaults to CHECKPOINT_PATH.
+
+    Yields:
+        TimedCheckpointer | None: The open checkpointer.
+    """
+    global _active
+    if os.getenv("CHECKPOINTS", "1") == "0":
+        yield None
+        return
+    path = Path(path or os.getenv("CHECKPOINT_PATH", DEFAULT_PATH))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    async with aiosqlite.connect(path) as conn:
+        checkpointer = TimedCheckpointer(conn)
+        await conn.execute("PRAGMA journal_mode=WAL")
+        pruned = await checkpointer.prune(float(os.getenv("CHECKPOINT_TTL", str(DEFAULT_TTL))))
+        if pruned:
+            print(f"DEBUG: Pruned {pruned} expired checkpointed runs")
+        _active = checkpointer
+        try:
+            yield checkpointer
+        finally:
+            _active = None
+
+
+def get_checkpoint_stats():
+    """Returns the write timings of the API's checkpointer (empty when checkpointing is off)."""
+    return _active.stats() if _active is not None else {}
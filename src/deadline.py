@@ -0,0 +1,233 @@
+import asyncio
+import contextvars
+import threading
+import time
+
+import httpx
+
+# End-to-end request deadlines.
+#
+# A research run carries an absolute deadline (epoch seconds) in its config, so
+# a resumed run can be given a new one. Each node starts with a budget: the time
+# left, split over the stages still ahead in proportion to their share, so time
+# saved upstream flows to the later stages. The budget is enforced around the
+# node and its end is published in a context variable, which the LLM transport
+# (request timeouts capped at the time left) and the data and search tools
+# read. A node that overruns returns a report marked with TIMEOUT_MARKER
+# instead of failing, so the risk manager and the editor still deliver a memo
+# within the deadline.
+
+# Stages of the critical path in execution order: (stage, nodes, share of the time)
+STAGES = [
+    ("router", ("router",), 0.05),
+    ("prefetch", ("prefetch",), 0.10),
+    ("analysts", ("data_analyst", "news_analyst", "trend_analyst", "pattern_analyst",
+                  "indicator_analyst", "technical_analyst"), 0.35),
+    ("technical_strategist", ("technical_strategist",), 0.10),
+    ("risk_manager", ("risk_manager",), 0.15),
+    ("editor", ("editor",), 0.25),
+]
+
+# Opens every report a node could not finish within its budget
+TIMEOUT_MARKER = "[TIMEOUT]"
+
+# End (epoch seconds) of the budget of the node running in the current context
+_node_deadline = contextvars.ContextVar("node_deadline", default=None)
+
+# Nodes that overran their budget, process-wide
+_timeouts = {}
+_timeouts_lock = threading.Lock()
+
+
+def node_budget(node, deadline, now=None):
+    """
+    Seconds a node may run: the time left before the deadline, times the node's
+    stage share over the shares of its stage and every later one.
+
+    Args:
+        node (str): Graph node name (nodes outside STAGES get all the time left).
+        deadline (float): Run deadline in epoch seconds.
+        now (float, optional): Current epoch time.
+
+    Returns:
+        float: The budget, 0 once the deadline has passed.
+    """
+    left = max(0.0, deadline - (time.time() if now is None else now))
+    for i, (_, nodes, share) in enumerate(STAGES):
+        if node in nodes:
+            return left * share / sum(s for _, _, s in STAGES[i:])
+    return left
+
+
+def remaining():
+    """Seconds left in the current node's budget, or None outside a deadline."""
+    end = _node_deadline.get()
+    return None if end is None else max(0.0, end - time.time())
+
+
+def tool_timeout(default):
+    """Timeout for a blocking call made by a tool: `default`, capped at the node's remaining budget."""
+    left = remaining()
+    return default if left is None else min(default, left)
+
+
+def call_with_timeout(func, timeout, *args):
+    """
+    Runs a blocking call in a worker thread and waits at most `timeout` seconds.
+
+    The worker runs in a copy of the current context. A call that times out is
+    abandoned, not interrupted; its result is discarded when it returns.
+
+    Raises:
+        TimeoutError: The call did not return in time.
+    """
+    if timeout is None:
+        return func(*args)
+    outcome = {}
+
+    def run():
+        try:
+            outcome["value"] = func(*args)
+        except BaseException as e:
+            outcome["error"] = e
+
+    worker = threading.Thread(target=contextvars.copy_context().run, args=(run,), daemon=True)
+    worker.start()
+    worker.join(timeout)
+    if worker.is_alive():
+        raise TimeoutError(f"{getattr(func, '__name__', 'call')} did not return within {timeout:.1f}s")
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["value"]
+
+
+def call_within_budget(func, *args):
+    """Runs a blocking call that has no timeout of its own, abandoning it when the node's budget runs out."""
+    return call_with_timeout(func, remaining(), *args)
+
+
+def call_without_budget(func, *args):
+    """Runs a call outside any node budget, for work shared with requests that have their own deadlines."""
+    token = _node_deadline.set(None)
+    try:
+        return func(*args)
+    finally:
+        _node_deadline.reset(token)
+
+
+def run_config_deadline(config):
+    """The run deadline (epoch seconds) from a graph config, or None."""
+    return ((config or {}).get("configurable") or {}).get("deadline")
+
+
+def _overran(end):
+    # Any failure once the budget is spent (a capped LLM request, a tool
+    # timeout) is the budget running out, not an error of the node
+    return time.time() >= end - 0.05
+
+
+def _record_timeout(node, budget):
+    with _timeouts_lock:
+        _timeouts[node] = _timeouts.get(node, 0) + 1
+    print(f"DEBUG: {node} overran its {budget:.1f}s budget; returning a partial result")
+
+
+def run_with_budget(node, func, state, config, fallback):
+    """
+    Runs a node within its share of the run deadline.
+
+    Args:
+        node (str): Graph node name.
+        func (Callable): The node implementation.
+        state (AgentState): Node input.
+        config (RunnableConfig): Run config carrying the deadline.
+        fallback (Callable[[AgentState, float], dict]): Builds the marked update returned on overrun.
+
+    Returns:
+        dict: The node's update, or the fallback's when it overran.
+    """
+    deadline = run_config_deadline(config)
+    if deadline is None:
+        return func(state)
+    budget = node_budget(node, deadline)
+    end = time.time() + budget
+
+    def call():
+        _node_deadline.set(end)
+        return func(state)
+
+    try:
+        return call_with_timeout(call, budget)
+    except Exception:
+        if not _overran(end):
+            raise
+    _record_timeout(node, budget)
+    return fallback(state, budget)
+
+
+async def arun_with_budget(node, afunc, state, config, fallback):
+    """Async variant of `run_with_budget`; an overrunning node is cancelled."""
+    deadline = run_config_deadline(config)
+    if deadline is None:
+        return await afunc(state)
+    budget = node_budget(node, deadline)
+    end = time.time() + budget
+
+    async def call():
+        # wait_for runs this in a new task, so the budget stays local to the node
+        _node_deadline.set(end)
+        return await afunc(state)
+
+    try:
+        return await asyncio.wait_for(call(), budget)
+    except Exception:
+        if not _overran(end):
+            raise
+    _record_timeout(node, budget)
+    return fallback(state, budget)
+
+
+def _cap(request):
+    left = remaining()
+    if left is None:
+        return
+    if left <= 0:
+        raise httpx.TimeoutException("Node budget exhausted before the request was sent", request=request)
+    timeout = dict(request.extensions.get("timeout") or {})
+    for key in ("connect", "read", "write", "pool"):
+        timeout[key] = left if timeout.get(key) is None else min(timeout[key], left)
+    request.extensions["timeout"] = timeout
+
+
+class DeadlineTransport(httpx.BaseTransport):
+    """httpx transport capping each request's timeouts at the current node's remaining budget."""
+
+    def __init__(self, transport):
+        self._transport = transport
+
+    def handle_request(self, request):
+        _cap(request)
+        return self._transport.handle_request(request)
+
+    def close(self):
+        self._transport.close()
+
+
+class AsyncDeadlineTransport(httpx.AsyncBaseTransport):
+    """Async variant of `DeadlineTransport`."""
+
+    def __init__(self, transport):
+        self._transport = transport
+
+    async def handle_async_request(self, request):
+        _cap(request)
+        return await self._transport.handle_async_request(request)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def get_deadline_stats():
+    """Returns the number of budget overruns per node since startup."""
+    with _timeouts_lock:
+        return {"timeouts": sum(_timeouts.values()), "by_node": dict(_timeouts)}
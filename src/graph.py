@@ -1,16 +1,92 @@
+from functools import partial
 from langgraph.graph import StateGraph, END
-from .state import AgentState
-from .agents.router import router_node
-from .agents.data_analyst import data_analyst_node
-from .agents.news_analyst import news_analyst_node
-from .agents.risk_manager import risk_manager_node
-from .agents.editor import editor_node
-from .agents.trend_analyst import trend_analyst_node
-from .agents.pattern_analyst import pattern_analyst_node
-from .agents.indicator_analyst import indicator_analyst_node
-from .agents.technical_strategist import technical_strategist_node
-
-def create_graph():
+from langgraph.types import Send
+from .state import AgentState, FANOUT_MODES, TICKER_REPORT_KEYS, TICKER_SECTION, fanout_mode
+from langchain_core.runnables import RunnableLambda
+from .deadline import TIMEOUT_MARKER, run_with_budget, arun_with_budget
+from .agents.router import BRANCHES, router_node, arouter_node, timeout_route
+from .agents.prefetch import prefetch_node, aprefetch_node
+from .agents.evidence import research_cache_node, aresearch_cache_node, evidence_store_node, aevidence_store_node
+from .agents.data_analyst import data_analyst_node, adata_analyst_node
+from .agents.news_analyst import news_analyst_node, anews_analyst_node
+from .agents.risk_manager import risk_manager_node, arisk_manager_node
+from .agents.editor import editor_node, aeditor_node, partial_memo
+from .agents.trend_analyst import trend_analyst_node, atrend_analyst_node
+from .agents.pattern_analyst import pattern_analyst_node, apattern_analyst_node
+from .agents.indicator_analyst import indicator_analyst_node, aindicator_analyst_node
+from .agents.technical_strategist import technical_strategist_node, atechnical_strategist_node
+from .agents.technical_analyst import technical_analyst_node, atechnical_analyst_node
+
+# Variants of the technical branch: 'split' runs the trend, pattern and indicator
+# analysts joined by the technical strategist; 'consolidated' runs one node that
+# writes all four technical reports with a single LLM call
+TECHNICAL_MODES = ("split", "consolidated")
+
+# Report keys each node fills, marked when the node overruns its deadline budget
+NODE_REPORTS = {
+    "data_analyst": ("data_analysis",),
+    "news_analyst": ("news_analysis",),
+    "trend_analyst": ("trend_analysis",),
+    "pattern_analyst": ("pattern_analysis",),
+    "indicator_analyst": ("indicator_analysis",),
+    "technical_strategist": ("technical_strategy",),
+    "technical_analyst": ("trend_analysis", "pattern_analysis", "indicator_analysis", "technical_strategy"),
+    "risk_manager": ("risk_assessment",),
+}
+
+def _timeout_update(name, state, budget):
+    """Marked partial result of a node that overran its deadline budget; the run continues with it."""
+    note = f"{TIMEOUT_MARKER} {name} did not finish within its {budget:.0f}s time budget; this analysis is unavailable."
+    if name == "router":
+        update = timeout_route(state)
+    elif name == "prefetch":
+        # The data tools fetch live whatever the snapshot lacks
+        update = {"market_data": {}}
+    elif name == "editor":
+        update = {"final_report": partial_memo(state, note)}
+    else:
+        update = {key: note for key in NODE_REPORTS.get(name, ())}
+    update["timeouts"] = [name]
+    return _label_sections(state, update)
+
+def _node(name, func, afunc):
+    """
+    Wraps a node's sync and async implementations (`invoke` uses the first,
+    `ainvoke` the second) so each runs within its share of the run deadline.
+    """
+    def fallback(state, budget):
+        return _timeout_update(name, state, budget)
+
+    def run(state, config):
+        return run_with_budget(name, func, state, config, fallback)
+
+    async def arun(state, config):
+        return await arun_with_budget(name, afunc, state, config, fallback)
+
+    return RunnableLambda(run, afunc=arun if afunc else None, name=name)
+
+def _label_sections(state, update):
+    """Heads each report of a per-ticker run with its ticker's section heading (other runs pass through)."""
+    index = state.get("ticker_index")
+    if index is None:
+        return update
+    heading = TICKER_SECTION.format(index=index, ticker=state["tickers"][0])
+    return {
+        key: f"{heading}\n\n{value}" if key in TICKER_REPORT_KEYS and isinstance(value, str) else value
+        for key, value in update.items()
+    }
+
+def _analyst(name, func, afunc):
+    """Like `_node`, for analysts that may receive a single ticker through a per-ticker send."""
+    def labelled(state):
+        return _label_sections(state, func(state))
+
+    async def alabelled(state):
+        return _label_sections(state, await afunc(state))
+
+    return _node(name, labelled, alabelled if afunc else None)
+
+def create_graph(technical="split"):
     """
     Constructs and compiles the LangGraph state machine for the multi-agent workflow.
     
@@ -18,43 +94,96 @@ def create_graph():
     handles synchronization points (join), and establishes the final sequential 
     processing order to generate the investment report.
 
+    Args:
+        technical (str): Technical branch variant, 'split' (four agents) or
+            'consolidated' (one node filling the same four state keys).
+
     Returns:
         CompiledStateGraph: The compiled workflow ready for execution.
     """
+    if technical not in TECHNICAL_MODES:
+        raise ValueError(f"Unknown technical mode '{technical}', expected one of {TECHNICAL_MODES}")
+
     # Initialize the state graph with the shared AgentState schema
     workflow = StateGraph(AgentState)
 
-    # Register all agent nodes into the graph
-    workflow.add_node("router", router_node)
-    workflow.add_node("data_analyst", data_analyst_node)
-    workflow.add_node("news_analyst", news_analyst_node)
-    workflow.add_node("trend_analyst", trend_analyst_node)
-    workflow.add_node("pattern_analyst", pattern_analyst_node)
-    workflow.add_node("indicator_analyst", indicator_analyst_node)
-    workflow.add_node("technical_strategist", technical_strategist_node)
-    workflow.add_node("risk_manager", risk_manager_node)
-    workflow.add_node("editor", editor_node)
+    # Register all agent nodes into the graph (sync and async implementations)
+    workflow.add_node("router", _node("router", router_node, arouter_node))
+    workflow.add_node("research_cache", _node(
+        "research_cache", partial(research_cache_node, technical=technical), partial(aresearch_cache_node, technical=technical)
+    ))
+    workflow.add_node("prefetch", _node("prefetch", prefetch_node, aprefetch_node))
+    workflow.add_node("data_analyst", _analyst("data_analyst", data_analyst_node, adata_analyst_node))
+    workflow.add_node("news_analyst", _analyst("news_analyst", news_analyst_node, anews_analyst_node))
+    if technical == "consolidated":
+        workflow.add_node("technical_analyst", _analyst("technical_analyst", technical_analyst_node, atechnical_analyst_node))
+    else:
+        workflow.add_node("trend_analyst", _analyst("trend_analyst", trend_analyst_node, atrend_analyst_node))
+        workflow.add_node("pattern_analyst", _analyst("pattern_analyst", pattern_analyst_node, apattern_analyst_node))
+        workflow.add_node("indicator_analyst", _analyst("indicator_analyst", indicator_analyst_node, aindicator_analyst_node))
+        workflow.add_node("technical_strategist", _node("technical_strategist", technical_strategist_node, atechnical_strategist_node))
+    # Deferred: runs once, after every branch that was started has finished
+    workflow.add_node("evidence_store", _node("evidence_store", evidence_store_node, aevidence_store_node), defer=True)
+    workflow.add_node("risk_manager", _node("risk_manager", risk_manager_node, arisk_manager_node))
+    workflow.add_node("editor", _node("editor", editor_node, aeditor_node))
 
     # Define the entry point of the workflow
     workflow.set_entry_point("router")
 
-    # Routing logic: Parallel Fan-Out from Router to all Analysts
-    workflow.add_edge("router", "data_analyst")
-    workflow.add_edge("router", "news_analyst")
-    workflow.add_edge("router", "trend_analyst")
-    workflow.add_edge("router", "pattern_analyst")
-    workflow.add_edge("router", "indicator_analyst")
-
-    # Technical Analysts synchronization: Join at Technical Strategist
-    workflow.add_edge("trend_analyst", "technical_strategist")
-    workflow.add_edge("pattern_analyst", "technical_strategist")
-    workflow.add_edge("indicator_analyst", "technical_strategist")
+    # Research cache lookup: evidence researched earlier for the same question,
+    # tickers and trading date (in any style) skips straight to the synthesis
+    workflow.add_edge("router", "research_cache")
+
+    def evidence_source(state):
+        """Risk Manager when the evidence was reused, else the evidence stage."""
+        return "risk_manager" if state.get("evidence_cached") else "prefetch"
+
+    # On a miss, batched market-data prefetch for all extracted tickers before the analysts start
+    workflow.add_conditional_edges("research_cache", evidence_source, ["prefetch", "risk_manager"])
+
+    # Entry nodes of each research branch
+    if technical == "consolidated":
+        # One node produces the whole technical branch
+        technical_entry = ["technical_analyst"]
+        technical_output = "technical_analyst"
+    else:
+        technical_entry = ["trend_analyst", "pattern_analyst", "indicator_analyst"]
+        technical_output = "technical_strategist"
+    branch_entries = {"fundamentals": ["data_analyst"], "news": ["news_analyst"], "technical": technical_entry}
+
+    def planned_branches(state):
+        """
+        Entry nodes of the branches in the router's plan (every branch without a plan),
+        or with per-ticker fan-out one send per entry node and ticker.
+        """
+        branches = state.get("branches") or BRANCHES
+        nodes = [node for branch in BRANCHES if branch in branches for node in branch_entries[branch]]
+        tickers = state.get("tickers") or []
+        if fanout_mode(state) != "per_ticker" or len(tickers) < 2:
+            return nodes
+        # Map step: each analyst sees only its ticker; the report reducer joins the sections
+        return [
+            Send(node, {**state, "tickers": [ticker], "ticker_index": index})
+            for node in nodes for index, ticker in enumerate(tickers, start=1)
+        ]
+
+    # Routing logic: Parallel Fan-Out from Prefetch to the planned Analysts only
+    # (per ticker as well in 'per_ticker' fan-out mode)
+    workflow.add_conditional_edges("prefetch", planned_branches, [node for nodes in branch_entries.values() for node in nodes])
+
+    if technical != "consolidated":
+        # Technical Analysts synchronization: Join at Technical Strategist
+        workflow.add_edge("trend_analyst", "technical_strategist")
+        workflow.add_edge("pattern_analyst", "technical_strategist")
+        workflow.add_edge("indicator_analyst", "technical_strategist")
     
-    # Parallel branch synchronization: Final join at Risk Manager
-    # Risk Manager waits for results from Data, News, and Technical Strategy
-    workflow.add_edge("data_analyst", "risk_manager")
-    workflow.add_edge("news_analyst", "risk_manager")
-    workflow.add_edge("technical_strategist", "risk_manager")
+    # Parallel branch synchronization: Final join at Evidence Store
+    # Evidence Store is deferred, so it waits for whichever of Data, News and
+    # Technical Strategy were planned, runs exactly once and caches their reports
+    workflow.add_edge("data_analyst", "evidence_store")
+    workflow.add_edge("news_analyst", "evidence_store")
+    workflow.add_edge(technical_output, "evidence_store")
+    workflow.add_edge("evidence_store", "risk_manager")
 
     # Transition from risk assessment to the final editing phase
     workflow.add_edge("risk_manager", "editor")
@@ -63,4 +192,24 @@ def create_graph():
     workflow.add_edge("editor", END)
 
     # Compile the graph into an executable state machine
-    return workflow.compile()
\ No newline at end of file
+    return workflow.compile()
+
+_graphs = {}
+
+def get_graph(technical="split"):
+    """
+    Returns the process-wide compiled graph of a technical variant, compiling it on first use.
+
+    The compiled graph holds no per-request state (inputs such as the query,
+    style and instructions travel in the graph state), so one instance per
+    variant serves every request.
+
+    Args:
+        technical (str): Technical branch variant, see `create_graph`.
+
+    Returns:
+        CompiledStateGraph: The shared compiled workflow.
+    """
+    if technical not in _graphs:
+        _graphs[technical] = create_graph(technical)
+    return _graphs[technical]
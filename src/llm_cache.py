@@ -0,0 +1,278 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import warnings
+from pathlib import Path
+
+from langchain_core.caches import BaseCache
+from langchain_core._api import LangChainBetaWarning
+from langchain_core.load import dumps, loads
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk
+from langchain_core.runnables.config import var_child_runnable_config
+
+# Persistent exact-match cache for chat model responses.
+#
+# Chat models returned by `get_llm` are built with a `ResponseCache`, so every
+# call (including the model steps inside a ReAct agent) first looks up a key
+# derived from the canonicalized message list, the model configuration and the
+# temperature. Tool results are part of the message list, so a cached answer is
+# only reused while the underlying market data is unchanged. Entries live in a
+# local SQLite file shared by API workers, expire per graph node and are evicted
+# least-recently-used once the file exceeds its size budget.
+
+# Seconds a response stays valid, per graph node (override with LLM_CACHE_TTL_<NODE>)
+NODE_TTLS = {
+    "router": 24 * 3600,
+    "data_analyst": 6 * 3600,
+    "news_analyst": 1800,
+    "trend_analyst": 3600,
+    "pattern_analyst": 3600,
+    "indicator_analyst": 3600,
+    "technical_strategist": 3600,
+    "technical_analyst": 3600,
+    "risk_manager": 3600,
+    "editor": 3600,
+}
+DEFAULT_TTL = 3600
+
+# Classes revived from the cache; stored payloads never contain models or secrets
+_ALLOWED_OBJECTS = [ChatGeneration, ChatGenerationChunk, AIMessage, AIMessageChunk]
+
+# Per-run metadata that differs between otherwise identical messages
+_VOLATILE_KEYS = {"response_metadata", "usage_metadata"}
+
+
+def current_node():
+    """Name of the outer graph node the current model call runs in, or None outside a graph."""
+    config = var_child_runnable_config.get() or {}
+    metadata = config.get("metadata") or {}
+    namespace = metadata.get("langgraph_checkpoint_ns") or ""
+    # Agents built with create_agent run as subgraphs: 'data_analyst:<id>|model:<id>'
+    if namespace:
+        return namespace.split("|", 1)[0].split(":", 1)[0]
+    return metadata.get("langgraph_node")
+
+
+def canonicalize_prompt(prompt):
+    """
+    Normalizes a serialized message list so that equivalent conversations share a key.
+
+    Provider-generated tool-call ids are renumbered in order of appearance, and
+    per-run metadata (token usage, timings, fingerprints) is dropped.
+    """
+    try:
+        data = json.loads(prompt)
+    except ValueError:
+        return prompt
+    ids = {}
+
+    def rename(value):
+        return ids.setdefault(value, f"call_{len(ids)}")
+
+    def walk(node):
+        if isinstance(node, dict):
+            out = {}
+            for key, value in node.items():
+                if key in _VOLATILE_KEYS:
+                    continue
+                if key in ("id", "tool_call_id") and isinstance(value, str):
+                    out[key] = rename(value)
+                else:
+                    out[key] = walk(value)
+            return out
+        if isinstance(node, list):
+            return [walk(v) for v in node]
+        return node
+
+    return json.dumps(walk(data), sort_keys=True, ensure_ascii=False)
+
+
+class ResponseStore:
+    """
+    SQLite backend shared by every model's `ResponseCache`.
+
+    Args:
+        path (str | Path): Database file.
+        max_bytes (int): Size budget of the stored responses; least recently used entries are evicted beyond it.
+        ttls (Dict[str, float], optional): Per-node TTLs; defaults to NODE_TTLS with env overrides.
+        default_ttl (float): TTL for calls outside a known node.
+    """
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024, ttls=None, default_ttl=DEFAULT_TTL):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.ttls = dict(NODE_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self._conn = None
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "expirations": 0, "evictions": 0, "writes": 0}
+        self._by_node = {}
+
+    def _connection(self):
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, node TEXT, value TEXT NOT NULL, size INTEGER NOT NULL,"
+                " expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_access)")
+            self._conn = conn
+        return self._conn
+
+    def ttl_for(self, node):
+        """TTL for a node: LLM_CACHE_TTL_<NODE>, then the configured table, then the default."""
+        if node:
+            override = os.getenv(f"LLM_CACHE_TTL_{node.upper()}")
+            if override is not None:
+                return float(override)
+            if node in self.ttls:
+                return self.ttls[node]
+        return self.default_ttl
+
+    def _count(self, name, node):
+        self._counters[name] += 1
+        if name in ("hits", "misses"):
+            per_node = self._by_node.setdefault(node or "-", {"hits": 0, "misses": 0})
+            per_node[name] += 1
+
+    def get(self, key, node):
+        """Returns the stored value for a key, or None when missing or expired."""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and row[1] <= now:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                conn.commit()
+                self._counters["expirations"] += 1
+                row = None
+            if row is None:
+                self._count("misses", node)
+                return None
+            conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self._count("hits", node)
+            return row[0]
+
+    def put(self, key, node, value, ttl):
+        """Stores a value, then evicts least recently used entries beyond the size budget."""
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, node, value, size, expires_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, node, value, size, now + ttl, now),
+            )
+            self._counters["writes"] += 1
+            self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_access"):
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self._counters["evictions"] += len(victims)
+
+    def clear(self):
+        """Drops all stored responses and resets the counters."""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+            for name in self._counters:
+                self._counters[name] = 0
+            self._by_node.clear()
+
+    def stats(self):
+        """Returns hit/miss/eviction counters, the overall and per-node hit rates, and the stored size."""
+        with self._lock:
+            conn = self._connection()
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            stats = dict(self._counters)
+            by_node = {
+                node: {**c, "hit_rate": round(c["hits"] / (c["hits"] + c["misses"]), 3)}
+                for node, c in self._by_node.items() if c["hits"] + c["misses"]
+            }
+        lookups = stats["hits"] + stats["misses"]
+        stats.update(
+            entries=entries,
+            bytes=size,
+            hit_rate=round(stats["hits"] / lookups, 3) if lookups else 0.0,
+            by_node=by_node,
+        )
+        return stats
+
+
+class ResponseCache(BaseCache):
+    """
+    LangChain cache attached to one chat model (`cache=` parameter).
+
+    Args:
+        store (ResponseStore): Shared SQLite backend.
+        model_key (str): Provider, model and temperature of the owning chat model.
+    """
+
+    def __init__(self, store, model_key):
+        self.store = store
+        self.model_key = model_key
+
+    def _key(self, prompt, llm_string):
+        material = "\x00".join([self.model_key, llm_string, canonicalize_prompt(prompt)])
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt, llm_string):
+        node = current_node()
+        if self.store.ttl_for(node) <= 0:
+            return None
+        value = self.store.get(self._key(prompt, llm_string), node)
+        if value is None:
+            return None
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", LangChainBetaWarning)
+            return loads(value, allowed_objects=_ALLOWED_OBJECTS)
+
+    def update(self, prompt, llm_string, return_val):
+        node = current_node()
+        ttl = self.store.ttl_for(node)
+        if ttl <= 0:
+            return
+        self.store.put(self._key(prompt, llm_string), node, dumps(list(return_val)), ttl)
+
+    def clear(self, **kwargs):
+        self.store.clear()
+
+
+# Shared backend for the process (set LLM_CACHE=0 to disable)
+response_store = ResponseStore(
+    os.getenv("LLM_CACHE_PATH", os.path.join(os.path.dirname(__file__), "..", ".cache", "llm_responses.sqlite")),
+    max_bytes=int(float(os.getenv("LLM_CACHE_MAX_MB", "256")) * 1024 * 1024),
+    default_ttl=float(os.getenv("LLM_CACHE_TTL", str(DEFAULT_TTL))),
+)
+
+
+def get_response_cache(provider, model_name, temperature):
+    """Returns the response cache for a chat model, or None when LLM_CACHE=0."""
+    if os.getenv("LLM_CACHE", "1") == "0":
+        return None
+    return ResponseCache(response_store, f"{provider}|{model_name}|{temperature}")
+
+
+def get_llm_cache_stats():
+    """Returns the counters of the shared LLM response cache."""
+    return response_store.stats()
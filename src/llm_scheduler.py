@@ -0,0 +1,541 @@
+import asyncio
+import contextvars
+import email.utils
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+import httpx
+from langchain_core.rate_limiters import BaseRateLimiter
+
+# Shared admission control for LLM calls.
+#
+# One research request fans out to five analysts, each running its own ReAct
+# loop, so bursts easily exceed the provider's rate limits and end in 429s and
+# retry storms. Every call to the provider first waits for admission here:
+#
+# - concurrency is capped per provider (requests in flight to its API host);
+# - requests and tokens per minute are metered per model with token buckets,
+#   and kept in sync with the provider's x-ratelimit-remaining-* headers;
+# - a 429 pauses the model for its Retry-After, so queued calls wait instead
+#   of retrying into the same wall;
+# - waiting calls are queued per research request and served round-robin, so
+#   one large request cannot starve the others.
+#
+# OpenAI and Groq calls are admitted by an httpx transport on the shared
+# connection pool, which also sees the SDK's own retries. Google's SDK manages
+# its own transport and is admitted through LangChain's `rate_limiter` hook
+# (request and token rates only, since the hook has no completion callback).
+
+# Fallback limits per provider (concurrency applies to the whole provider)
+PROVIDER_LIMITS = {
+    "openai": {"concurrency": 16, "rpm": 500, "tpm": 200_000},
+    "groq": {"concurrency": 8, "rpm": 30, "tpm": 8_000},
+    "google": {"concurrency": 8, "rpm": 10, "tpm": 250_000},
+}
+
+# Per-model rate limits overriding the provider fallback (0 or None means unlimited)
+MODEL_LIMITS = {
+    "gpt-5": {"rpm": 500, "tpm": 500_000},
+    "gpt-5-mini": {"rpm": 500, "tpm": 500_000},
+    "gpt-5-nano": {"rpm": 500, "tpm": 200_000},
+    "gpt-4o-mini": {"rpm": 500, "tpm": 200_000},
+    "openai/gpt-oss-120b": {"rpm": 30, "tpm": 8_000},
+    "openai/gpt-oss-20b": {"rpm": 30, "tpm": 8_000},
+    "gemini-2.5-pro": {"rpm": 5, "tpm": 250_000},
+    "gemini-2.5-flash": {"rpm": 10, "tpm": 250_000},
+    "gemini-2.5-flash-lite": {"rpm": 15, "tpm": 250_000},
+}
+
+# Completion tokens assumed when a request does not set max_tokens
+DEFAULT_OUTPUT_TOKENS = 1024
+
+# Pause after a 429 without a Retry-After header
+DEFAULT_RETRY_AFTER = 1.0
+
+# Research request the current LLM calls belong to (fair-queuing key)
+_request_scope = contextvars.ContextVar("llm_request_scope", default="default")
+
+
+@contextmanager
+def request_scope(name=None):
+    """Tags the LLM calls made inside the block as one research request for fair queuing."""
+    token = _request_scope.set(name or uuid.uuid4().hex)
+    try:
+        yield
+    finally:
+        _request_scope.reset(token)
+
+
+def _env_limit(name):
+    value = os.getenv(name)
+    return None if value is None else int(float(value))
+
+
+class _Bucket:
+    """Token bucket refilled continuously at `per_window` units per window."""
+
+    def __init__(self, per_window, window, now):
+        self.capacity = float(per_window) if per_window else None
+        self.level = self.capacity
+        self.rate = self.capacity / window if self.capacity else None
+        self.updated = now
+
+    def _refill(self, now):
+        if self.capacity is not None:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until `amount` units are available (0 when unlimited)."""
+        if self.capacity is None:
+            return 0.0
+        self._refill(now)
+        deficit = min(amount, self.capacity) - self.level
+        return max(0.0, deficit / self.rate)
+
+    def take(self, amount):
+        if self.capacity is not None:
+            self.level -= min(amount, self.capacity)
+
+    def clamp(self, remaining, now):
+        """Lowers the level to what the provider reports as remaining."""
+        if self.capacity is not None:
+            self._refill(now)
+            self.level = min(self.level, float(remaining))
+
+
+class _Waiter:
+    def __init__(self, provider, model, scope, tokens, hold):
+        self.provider = provider
+        self.model = model
+        self.scope = scope
+        self.tokens = tokens
+        self.hold = hold
+        self.enqueued = time.monotonic()
+        self.granted = False
+        self.released = False
+        self.wake = None
+
+
+class _ModelLimiter:
+    """Queues and rate buckets of one (provider, model)."""
+
+    def __init__(self, provider, model, limits, window, now):
+        self.provider = provider
+        self.model = model
+        self.limits = limits
+        self.requests = _Bucket(limits.get("rpm"), window, now)
+        self.tokens = _Bucket(limits.get("tpm"), window, now)
+        self.paused_until = 0.0
+        # scope -> waiters; scopes rotate to the back after being served (round-robin)
+        self.queues = OrderedDict()
+        self.depth = 0
+        self.max_depth = 0
+        self.admitted = 0
+        self.throttled = 0
+        self.waits = deque(maxlen=1000)
+
+    def enqueue(self, waiter):
+        self.queues.setdefault(waiter.scope, deque()).append(waiter)
+        self.depth += 1
+        self.max_depth = max(self.max_depth, self.depth)
+
+    def head(self):
+        return next(iter(self.queues.values()))[0] if self.queues else None
+
+    def pop_head(self):
+        scope, queue = next(iter(self.queues.items()))
+        waiter = queue.popleft()
+        del self.queues[scope]
+        if queue:
+            self.queues[scope] = queue
+        self.depth -= 1
+        return waiter
+
+    def remove(self, waiter):
+        queue = self.queues.get(waiter.scope)
+        if queue and waiter in queue:
+            queue.remove(waiter)
+            self.depth -= 1
+            if not queue:
+                del self.queues[waiter.scope]
+
+
+class LLMScheduler:
+    """
+    Admission control shared by every LLM client of the process.
+
+    Args:
+        provider_limits (Dict[str, dict], optional): Fallback limits per provider; defaults to PROVIDER_LIMITS.
+        model_limits (Dict[str, dict], optional): Rate limits per model; defaults to MODEL_LIMITS.
+        window (float): Length in seconds of the rate-limit window ('per minute').
+    """
+
+    def __init__(self, provider_limits=None, model_limits=None, window=60.0):
+        self.provider_limits = dict(PROVIDER_LIMITS if provider_limits is None else provider_limits)
+        self.model_limits = dict(MODEL_LIMITS if model_limits is None else model_limits)
+        self.window = window
+        self._lock = threading.Lock()
+        self._models = {}
+        self._in_flight = {}
+
+    def limits(self, provider, model):
+        """Effective limits: LLM_MAX_CONCURRENCY / LLM_RPM / LLM_TPM, then the model, then the provider."""
+        limits = dict(self.provider_limits.get(provider, {}))
+        limits.update(self.model_limits.get(model, {}))
+        for key, env in (("concurrency", "LLM_MAX_CONCURRENCY"), ("rpm", "LLM_RPM"), ("tpm", "LLM_TPM")):
+            override = _env_limit(env)
+            if override is not None:
+                limits[key] = override
+        return limits
+
+    def _limiter(self, provider, model):
+        key = (provider, model)
+        limiter = self._models.get(key)
+        if limiter is None:
+            limiter = _ModelLimiter(provider, model, self.limits(provider, model), self.window, time.monotonic())
+            self._models[key] = limiter
+        return limiter
+
+    def _blocked_for(self, limiter, waiter, now):
+        """0 when the waiter can go now, None when only a release can unblock it, else seconds to wait."""
+        concurrency = limiter.limits.get("concurrency")
+        if waiter.hold and concurrency and self._in_flight.get(limiter.provider, 0) >= concurrency:
+            return None
+        return max(
+            limiter.paused_until - now,
+            limiter.requests.wait_time(1, now),
+            limiter.tokens.wait_time(waiter.tokens, now),
+            0.0,
+        )
+
+    def _dispatch(self, provider):
+        """Admits queued waiters of a provider in fair order; returns the time until the next retry."""
+        now = time.monotonic()
+        delays = []
+        progress = True
+        while progress:
+            progress = False
+            for limiter in self._models.values():
+                waiter = limiter.head() if limiter.provider == provider else None
+                if waiter is None:
+                    continue
+                # Head-of-line per model: a large request is never overtaken indefinitely
+                blocked = self._blocked_for(limiter, waiter, now)
+                if blocked == 0:
+                    self._grant(limiter, limiter.pop_head(), now)
+                    progress = True
+                elif blocked is not None:
+                    delays.append(blocked)
+        return min(delays) if delays else None
+
+    def _grant(self, limiter, waiter, now):
+        if waiter.hold:
+            self._in_flight[limiter.provider] = self._in_flight.get(limiter.provider, 0) + 1
+        limiter.requests.take(1)
+        limiter.tokens.take(waiter.tokens)
+        limiter.admitted += 1
+        limiter.waits.append(now - waiter.enqueued)
+        waiter.granted = True
+        if waiter.wake is not None:
+            waiter.wake()
+
+    def _enqueue(self, provider, model, tokens, hold, wake):
+        waiter = _Waiter(provider, model, _request_scope.get(), tokens, hold)
+        waiter.wake = wake
+        with self._lock:
+            self._limiter(provider, model).enqueue(waiter)
+            delay = self._dispatch(provider)
+        return waiter, delay
+
+    def _abandon(self, waiter):
+        with self._lock:
+            if not waiter.granted:
+                self._limiter(waiter.provider, waiter.model).remove(waiter)
+                self._dispatch(waiter.provider)
+                return
+        self.release(waiter)
+
+    def acquire(self, provider, model, tokens=0, hold=True, blocking=True):
+        """
+        Blocks until a call may be sent.
+
+        Args:
+            provider (str): LLM provider.
+            model (str): Model name.
+            tokens (int): Estimated prompt plus completion tokens.
+            hold (bool): Whether the call occupies a concurrency slot until `release`.
+            blocking (bool): If False, returns None instead of waiting.
+
+        Returns:
+            The admission ticket to pass to `release`, or None when not admitted.
+        """
+        event = threading.Event()
+        waiter, delay = self._enqueue(provider, model, tokens, hold, event.set)
+        try:
+            while not waiter.granted:
+                if not blocking:
+                    self._abandon(waiter)
+                    return None
+                event.wait(delay)
+                with self._lock:
+                    delay = self._dispatch(provider)
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        return waiter
+
+    async def aacquire(self, provider, model, tokens=0, hold=True, blocking=True):
+        """Async variant of `acquire`: waits without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        waiter, delay = self._enqueue(provider, model, tokens, hold, lambda: loop.call_soon_threadsafe(event.set))
+        try:
+            while not waiter.granted:
+                if not blocking:
+                    self._abandon(waiter)
+                    return None
+                try:
+                    await asyncio.wait_for(event.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                with self._lock:
+                    delay = self._dispatch(provider)
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        return waiter
+
+    def release(self, ticket, headers=None):
+        """
+        Frees the ticket's concurrency slot and syncs the buckets with the provider's rate-limit headers.
+        """
+        with self._lock:
+            if ticket.released:
+                return
+            ticket.released = True
+            if ticket.hold:
+                self._in_flight[ticket.provider] -= 1
+            if headers is not None:
+                limiter = self._limiter(ticket.provider, ticket.model)
+                now = time.monotonic()
+                remaining_requests = headers.get("x-ratelimit-remaining-requests")
+                remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+                try:
+                    if remaining_requests is not None:
+                        limiter.requests.clamp(remaining_requests, now)
+                    if remaining_tokens is not None:
+                        limiter.tokens.clamp(remaining_tokens, now)
+                except ValueError:
+                    pass
+            self._dispatch(ticket.provider)
+
+    def throttle(self, provider, model, retry_after):
+        """Pauses admissions for a model after a 429, for `retry_after` seconds."""
+        with self._lock:
+            limiter = self._limiter(provider, model)
+            limiter.throttled += 1
+            limiter.paused_until = max(limiter.paused_until, time.monotonic() + retry_after)
+
+    def stats(self):
+        """Returns per-model queue depth, admissions, 429 count and wait-time percentiles, plus in-flight calls."""
+        now = time.monotonic()
+        with self._lock:
+            models = {}
+            for (provider, model), limiter in self._models.items():
+                waits = sorted(limiter.waits)
+
+                def percentile(q):
+                    return round(waits[min(len(waits) - 1, int(q * len(waits)))] * 1000, 1) if waits else 0.0
+
+                models[f"{provider}/{model}"] = {
+                    "limits": limiter.limits,
+                    "queue_depth": limiter.depth,
+                    "max_queue_depth": limiter.max_depth,
+                    "admitted": limiter.admitted,
+                    "throttled": limiter.throttled,
+                    "paused_for_s": round(max(0.0, limiter.paused_until - now), 2),
+                    "wait_ms": {
+                        "mean": round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+                        "p50": percentile(0.5),
+                        "p95": percentile(0.95),
+                        "max": round(waits[-1] * 1000, 1) if waits else 0.0,
+                    },
+                }
+            return {"in_flight": dict(self._in_flight), "models": models}
+
+
+def retry_after_seconds(headers):
+    """Parses retry-after-ms / Retry-After (seconds or HTTP date); None when absent."""
+    value = headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        parsed = email.utils.parsedate_to_datetime(value)
+        return max(0.0, parsed.timestamp() - time.time()) if parsed else None
+
+
+def _describe(request):
+    """(model, estimated tokens) of a completion request, or None for requests that are not metered."""
+    if request.method != "POST":
+        return None
+    try:
+        body = json.loads(request.content)
+    except (httpx.RequestNotRead, ValueError):
+        return None
+    if not isinstance(body, dict) or "model" not in body:
+        return None
+    output = body.get("max_completion_tokens") or body.get("max_tokens") or DEFAULT_OUTPUT_TOKENS
+    return body["model"], len(request.content) // 4 + int(output)
+
+
+class _ReleasingStream(httpx.SyncByteStream):
+    """Response body that releases the admission ticket once fully read or closed."""
+
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            self._release()
+
+
+class _AsyncReleasingStream(httpx.AsyncByteStream):
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+
+
+class SchedulingTransport(httpx.BaseTransport):
+    """
+    httpx transport that admits each completion request through the scheduler.
+
+    The concurrency slot is held until the response body is closed, so
+    streamed completions count for their whole duration.
+
+    Args:
+        transport (httpx.BaseTransport): Underlying (pooled) transport.
+        provider (str): Provider whose limits apply.
+        scheduler (LLMScheduler, optional): Defaults to the process-wide scheduler.
+    """
+
+    def __init__(self, transport, provider, scheduler=None):
+        self._transport = transport
+        self.provider = provider
+        self.scheduler = scheduler or llm_scheduler
+
+    def handle_request(self, request):
+        job = _describe(request)
+        if job is None:
+            return self._transport.handle_request(request)
+        model, tokens = job
+        ticket = self.scheduler.acquire(self.provider, model, tokens)
+        try:
+            response = self._transport.handle_request(request)
+        except BaseException:
+            self.scheduler.release(ticket)
+            raise
+        if response.status_code == 429:
+            self.scheduler.throttle(self.provider, model, retry_after_seconds(response.headers) or DEFAULT_RETRY_AFTER)
+        release = lambda: self.scheduler.release(ticket, response.headers)
+        return httpx.Response(response.status_code, headers=response.headers,
+                              stream=_ReleasingStream(response.stream, release), extensions=response.extensions)
+
+    def close(self):
+        self._transport.close()
+
+
+class AsyncSchedulingTransport(httpx.AsyncBaseTransport):
+    """Async variant of `SchedulingTransport`; queued requests wait without blocking the event loop."""
+
+    def __init__(self, transport, provider, scheduler=None):
+        self._transport = transport
+        self.provider = provider
+        self.scheduler = scheduler or llm_scheduler
+
+    async def handle_async_request(self, request):
+        job = _describe(request)
+        if job is None:
+            return await self._transport.handle_async_request(request)
+        model, tokens = job
+        ticket = await self.scheduler.aacquire(self.provider, model, tokens)
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            self.scheduler.release(ticket)
+            raise
+        if response.status_code == 429:
+            self.scheduler.throttle(self.provider, model, retry_after_seconds(response.headers) or DEFAULT_RETRY_AFTER)
+        release = lambda: self.scheduler.release(ticket, response.headers)
+        return httpx.Response(response.status_code, headers=response.headers,
+                              stream=_AsyncReleasingStream(response.stream, release), extensions=response.extensions)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+class SchedulerRateLimiter(BaseRateLimiter):
+    """
+    LangChain `rate_limiter` backed by the scheduler, for SDKs whose HTTP transport cannot be replaced.
+
+    Each model call is admitted against the request and token rates (with the
+    default completion size as its token estimate); it does not hold a
+    concurrency slot, since the hook is not told when the call completes.
+    """
+
+    def __init__(self, provider, model, scheduler=None):
+        self.provider = provider
+        self.model = model
+        self.scheduler = scheduler or llm_scheduler
+
+    def acquire(self, *, blocking=True):
+        ticket = self.scheduler.acquire(self.provider, self.model, DEFAULT_OUTPUT_TOKENS, hold=False, blocking=blocking)
+        return ticket is not None
+
+    async def aacquire(self, *, blocking=True):
+        ticket = await self.scheduler.aacquire(self.provider, self.model, DEFAULT_OUTPUT_TOKENS,
+                                               hold=False, blocking=blocking)
+        return ticket is not None
+
+
+# Shared scheduler for the process (set LLM_SCHEDULER=0 to disable)
+llm_scheduler = LLMScheduler()
+
+
+def scheduler_enabled():
+    """Whether LLM calls go through the shared scheduler (LLM_SCHEDULER, on by default)."""
+    return os.getenv("LLM_SCHEDULER", "1") != "0"
+
+
+def get_llm_scheduler_stats():
+    """Returns the queue and wait-time metrics of the shared LLM scheduler."""
+    return llm_scheduler.stats()
@@ -0,0 +1,147 @@
+import datetime
+import hashlib
+import json
+import os
+import re
+from zoneinfo import ZoneInfo
+
+from .agents.prompts import DEFAULT_STYLE, INVESTMENT_STYLES, NEUTRAL_STYLE, STYLE_TAG
+from .agents.single_shot import analyst_mode
+from .llm_cache import ResponseStore
+from .state import fanout_mode
+
+# Whole-run research cache shared across investment styles.
+#
+# A run splits into an evidence stage (prefetch, the data, news and technical
+# analysts) and a synthesis stage (risk manager, editor). While the cache is on,
+# the evidence nodes write style-neutral reports (NEUTRAL_STYLE prompts that
+# cover every style's focus and put each style's verdicts on lines tagged with
+# STYLE_TAG), so their output does not depend on the client's style; every
+# reader (risk manager, editor, API response) sees them through `style_view`. The evidence of a finished run is stored under
+# a key of the normalized query, the tickers and the trading date; a later run
+# of the same question in another style reuses it and only the risk manager
+# and the editor run again. Entries live in their own SQLite file (the LLM
+# response cache backend) and expire after RESEARCH_CACHE_TTL seconds.
+
+# State keys of the evidence stage
+EVIDENCE_KEYS = (
+    "data_analysis", "news_analysis", "trend_analysis", "pattern_analysis",
+    "indicator_analysis", "technical_strategy",
+)
+
+DEFAULT_TTL = 1800
+
+# Exchange calendar the trading date is taken from
+MARKET_TZ = ZoneInfo("America/New_York")
+
+# A line of a neutral report opening with a style tag, after any list or quote markers
+_STYLE_TAGS = "|".join(re.escape(STYLE_TAG.format(style=style)) for style in INVESTMENT_STYLES)
+_STYLE_LINE_RE = re.compile(rf"^([\s>*\-]*)({_STYLE_TAGS})[ \t]*")
+
+# Node name of the entries in the store's counters
+_NODE = "research"
+
+# Shared backend for the process (set RESEARCH_CACHE=0 to disable)
+research_store = ResponseStore(
+    os.getenv("RESEARCH_CACHE_PATH", os.path.join(os.path.dirname(__file__), "..", ".cache", "research.sqlite")),
+    max_bytes=int(float(os.getenv("RESEARCH_CACHE_MAX_MB", "64")) * 1024 * 1024),
+    ttls={},
+)
+
+
+def research_cache_enabled():
+    """Whether evidence is cached and shared across styles (RESEARCH_CACHE, on by default)."""
+    return os.getenv("RESEARCH_CACHE", "1") != "0"
+
+
+def evidence_style(state):
+    """Style of the evidence nodes' prompts: NEUTRAL_STYLE when the run's evidence is cached, else the run's style."""
+    if state.get("research_key"):
+        return NEUTRAL_STYLE
+    return state.get("investment_style", DEFAULT_STYLE)
+
+
+def style_view(report, style):
+    """
+    A report as a client of one style sees it: lines tagged for the other
+    styles are dropped and the style's own tag is removed (untagged reports
+    pass through).
+
+    Args:
+        report (Optional[str]): An evidence report.
+        style (str): The client's investment style (unknown styles see Balanced).
+
+    Returns:
+        Optional[str]: The filtered report.
+    """
+    if not isinstance(report, str):
+        return report
+    own = STYLE_TAG.format(style=style if style in INVESTMENT_STYLES else DEFAULT_STYLE)
+    lines = []
+    for line in report.split("\n"):
+        match = _STYLE_LINE_RE.match(line)
+        if match is None:
+            lines.append(line)
+        elif match.group(2) == own:
+            lines.append(match.group(1) + line[match.end():])
+    return "\n".join(lines)
+
+
+def trading_date(now=None):
+    """Date of the latest US trading session (weekends map to the Friday before; holidays are not skipped)."""
+    day = (now or datetime.datetime.now(MARKET_TZ)).astimezone(MARKET_TZ).date()
+    return day - datetime.timedelta(days=max(0, day.weekday() - 4))
+
+
+def normalize_query(query):
+    """Case- and whitespace-insensitive form of a query."""
+    return re.sub(r"\s+", " ", (query or "").casefold()).strip()
+
+
+def research_key(state, technical, now=None):
+    """
+    Cache key of a run's evidence.
+
+    Besides the normalized query, the tickers and the trading date, the key
+    covers every input that changes the shape of the evidence: the planned
+    branches, the resolved analyst and fan-out modes and the technical variant. The
+    investment style is deliberately not part of it.
+
+    Args:
+        state (AgentState): Graph state after the router.
+        technical (str): Technical branch variant of the graph.
+        now (datetime, optional): Current time, for the trading date.
+
+    Returns:
+        str: The hex digest key.
+    """
+    material = json.dumps({
+        "query": normalize_query(state.get("query")),
+        "tickers": state.get("tickers") or [],
+        "date": trading_date(now).isoformat(),
+        "branches": sorted(state.get("branches") or []),
+        "analyst_mode": analyst_mode(state),
+        "fanout": fanout_mode(state),
+        "technical": technical,
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def load_evidence(key):
+    """Returns the cached evidence reports of a key, or None."""
+    value = research_store.get(key, _NODE)
+    return None if value is None else json.loads(value)
+
+
+def save_evidence(key, state):
+    """Stores the evidence reports of a finished evidence stage; returns the number of reports saved."""
+    evidence = {name: state[name] for name in EVIDENCE_KEYS if state.get(name)}
+    if evidence:
+        ttl = float(os.getenv("RESEARCH_CACHE_TTL", str(DEFAULT_TTL)))
+        research_store.put(key, _NODE, json.dumps(evidence, ensure_ascii=False), ttl)
+    return len(evidence)
+
+
+def get_research_cache_stats():
+    """Returns the counters of the research cache."""
+    return research_store.stats()
@@ -1,5 +1,65 @@
-from typing import TypedDict, List, Optional, Annotated
-import operator
+from typing import TypedDict, List, Optional, Annotated, Dict, Any
+import os
+import re
+
+# How the analysts after prefetch cover the tickers: 'batched' runs each analyst
+# once for all tickers; 'per_ticker' sends one run per ticker (map), all running
+# concurrently, and the report reducer merges their sections (reduce), so the
+# branch takes about as long as a single-ticker analysis
+FANOUT_MODES = ("batched", "per_ticker")
+
+def fanout_mode(state):
+    """Fan-out mode of a run: the state's `fanout`, else FANOUT_MODE (default 'batched')."""
+    mode = state.get("fanout") or os.getenv("FANOUT_MODE", "batched")
+    return mode if mode in FANOUT_MODES else "batched"
+
+# Heading that opens one ticker's section of a report written per ticker
+TICKER_SECTION = "## 【{index}】{ticker}"
+_TICKER_SECTION_RE = re.compile(r"^## 【(\d+)】\S+[ \t]*$", re.MULTILINE)
+
+# State keys written by the analysts that can run per ticker
+TICKER_REPORT_KEYS = (
+    "data_analysis", "news_analysis", "trend_analysis", "pattern_analysis",
+    "indicator_analysis", "technical_strategy",
+)
+
+def _ticker_sections(report):
+    """Splits a per-ticker report into {index: section}, or returns None for any other report."""
+    matches = list(_TICKER_SECTION_RE.finditer(report))
+    if not matches or matches[0].start() != 0:
+        return None
+    ends = [m.start() for m in matches[1:]] + [len(report)]
+    return {int(m.group(1)): report[m.start():end].strip() for m, end in zip(matches, ends)}
+
+def merge_ticker_reports(current, update):
+    """
+    Reducer of the analyst report keys.
+
+    Per-ticker analysts (see `FANOUT_MODE`) run concurrently and each writes one
+    section headed by `TICKER_SECTION`; the sections are merged in ticker order,
+    whatever order the analysts finished in. Any other update (a whole report,
+    or None in a new run's input) replaces the current value.
+
+    Args:
+        current (Optional[str]): The report accumulated so far.
+        update (Optional[str]): The report or section written by a node.
+
+    Returns:
+        Optional[str]: The merged report.
+    """
+    if not isinstance(current, str) or not isinstance(update, str):
+        return update
+    old, new = _ticker_sections(current), _ticker_sections(update)
+    if old is None or new is None:
+        return update
+    merged = {**old, **new}
+    return "\n\n".join(merged[index] for index in sorted(merged))
+
+def add_unique(current, update):
+    """Reducer of list keys: appends the new items not already present (per-ticker runs of a node report it once)."""
+    merged = list(current or [])
+    merged.extend(item for item in update or [] if item not in merged)
+    return merged
 
 class AgentState(TypedDict):
     """
@@ -13,6 +73,15 @@ class AgentState(TypedDict):
     query: str
     tickers: List[str]
     investment_style: Optional[str]  # Target style, e.g., "growth", "value", "dividend"
+    analyst_mode: Optional[str]  # "agent" (ReAct loop) or "single_shot" (tools pre-run, one LLM call)
+    fanout: Optional[str]  # "batched" (one analyst run for all tickers) or "per_ticker" (one run per ticker)
+    ticker_index: Optional[int]  # 1-based position of the ticker, set only on per-ticker sends
+
+    # Research branches planned by the router: "fundamentals", "news", "technical" (all when unset)
+    branches: Optional[List[str]]
+
+    # Prefetched market data (compact column arrays per ticker), read first by the data tools
+    market_data: Optional[Dict[str, Any]]
 
     # Dynamic instructions for specialized agents
     data_analyst_instructions: Optional[str]
@@ -21,16 +90,23 @@ class AgentState(TypedDict):
     pattern_analyst_instructions: Optional[str]
     indicator_analyst_instructions: Optional[str]
 
-    # Intermediate analysis results
-    data_analysis: Optional[str]
-    news_analysis: Optional[str]
+    # Intermediate analysis results (merged per ticker when the analysts are fanned out)
+    data_analysis: Annotated[Optional[str], merge_ticker_reports]
+    news_analysis: Annotated[Optional[str], merge_ticker_reports]
     
     # Specialized technical analysis reports
-    trend_analysis: Optional[str]
-    pattern_analysis: Optional[str]
-    indicator_analysis: Optional[str]
-    technical_strategy: Optional[str]
+    trend_analysis: Annotated[Optional[str], merge_ticker_reports]
+    pattern_analysis: Annotated[Optional[str], merge_ticker_reports]
+    indicator_analysis: Annotated[Optional[str], merge_ticker_reports]
+    technical_strategy: Annotated[Optional[str], merge_ticker_reports]
     
     # Final synthesized outputs
     risk_assessment: Optional[str]
-    final_report: Optional[str]
\ No newline at end of file
+    final_report: Optional[str]
+
+    # Research cache: key of the run's evidence, and whether the reports above were reused from it
+    research_key: Optional[str]
+    evidence_cached: Optional[bool]
+
+    # Nodes that overran their share of the request deadline and returned a marked partial result
+    timeouts: Annotated[List[str], add_unique]
\ No newline at end of file
@@ -0,0 +1,173 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Compact, token-budgeted encoding of tool outputs.
+#
+# Tool results are appended to the message history and re-sent on every ReAct
+# step, so they are emitted as short `key=value` lines and CSV tables without
+# padding, in a fixed section order. Each section has a priority; when the
+# output exceeds the tool's token budget, the lowest-priority sections are
+# trimmed first.
+
+# Approximate token budget per tool (override with TOOL_TOKEN_BUDGET_<TOOL_NAME>)
+TOKEN_BUDGETS = {
+    "get_stock_analysis_data": 700,
+    "get_technical_data": 350,
+    "detect_chart_patterns": 350,
+    "search_news": 1200,
+}
+DEFAULT_TOKEN_BUDGET = 800
+
+_SUFFIXES = [(1e12, "T"), (1e9, "B"), (1e6, "M")]
+
+
+def estimate_tokens(text):
+    """Rough token count (about 4 characters per token for mixed English/numeric text)."""
+    return (len(text) + 3) // 4
+
+
+def token_budget(tool_name):
+    """Token budget for a tool, from TOOL_TOKEN_BUDGET_<TOOL_NAME> or the defaults."""
+    override = os.getenv(f"TOOL_TOKEN_BUDGET_{tool_name.upper()}")
+    if override:
+        return int(override)
+    return TOKEN_BUDGETS.get(tool_name, DEFAULT_TOKEN_BUDGET)
+
+
+def format_numbers(values, decimals=2):
+    """
+    Formats numbers with T/B/M suffixes in one vectorized pass.
+
+    Args:
+        values (array-like): Numeric values; NaN and non-numeric entries become ''.
+        decimals (int): Digits after the decimal point.
+
+    Returns:
+        np.ndarray: Formatted strings, same shape as `values`.
+    """
+    x = pd.to_numeric(pd.Series(np.ravel(np.asarray(values, dtype=object))), errors="coerce").to_numpy(dtype=float)
+    magnitude = np.abs(x)
+    conditions = [magnitude >= threshold for threshold, _ in _SUFFIXES]
+    divisor = np.select(conditions, [threshold for threshold, _ in _SUFFIXES], 1.0)
+    suffix = np.select(conditions, [s for _, s in _SUFFIXES], "")
+    scaled = np.where(np.isnan(x), 0.0, x / divisor)
+    text = np.char.add(np.char.mod(f"%.{decimals}f", scaled), suffix)
+    return np.where(np.isnan(x), "", text).reshape(np.shape(values))
+
+
+def format_value(value):
+    """Formats one scalar: numbers via `format_numbers`, None as '', strings unchanged."""
+    if value is None:
+        return ""
+    if isinstance(value, (bool, np.bool_)):
+        return str(value)
+    if isinstance(value, (int, np.integer)):
+        return str(value) if abs(value) < 1e6 else str(format_numbers([value])[0])
+    if isinstance(value, (float, np.floating)):
+        return str(format_numbers([value])[0])
+    return str(value)
+
+
+def encode_kv(mapping):
+    """Encodes a flat mapping as 'key=value;key=value', skipping missing values."""
+    parts = []
+    for key, value in mapping.items():
+        text = format_value(value)
+        if text != "":
+            parts.append(f"{key}={text}")
+    return ";".join(parts)
+
+
+def encode_table(frame, index_label="", decimals=2, numeric=True):
+    """
+    Encodes a DataFrame as CSV lines without padding.
+
+    Args:
+        frame (pd.DataFrame): Table to encode; datetime labels are shortened to dates.
+        index_label (str): Header for the index column.
+        decimals (int): Digits after the decimal point for numeric cells.
+        numeric (bool): Whether to format cells with `format_numbers`.
+
+    Returns:
+        str: Header line followed by one line per row.
+    """
+    if frame is None or frame.empty:
+        return "n/a"
+
+    def labels(axis):
+        if isinstance(axis, pd.DatetimeIndex):
+            return list(axis.strftime("%Y-%m-%d"))
+        return [str(label) for label in axis]
+
+    cells = format_numbers(frame.to_numpy(), decimals) if numeric else frame.astype(str).to_numpy()
+    rows = [",".join([index_label] + labels(frame.columns))]
+    rows += [",".join([label] + list(row)) for label, row in zip(labels(frame.index), cells)]
+    return "\n".join(rows)
+
+
+class Section:
+    """
+    One named block of a tool output.
+
+    Args:
+        name (str): Short section header.
+        body (str): Encoded content.
+        priority (int): Higher is kept longer when trimming to the token budget.
+    """
+
+    def __init__(self, name, body, priority=0):
+        self.name = name
+        self.body = body
+        self.priority = priority
+
+    def render(self):
+        return f"[{self.name}]\n{self.body}" if self.name else self.body
+
+
+def encode_sections(title, sections, budget=None):
+    """
+    Joins sections in their given order, trimming to a token budget.
+
+    Whole sections are dropped lowest priority first (latest first among equal
+    priorities); if the highest-priority sections alone still exceed the
+    budget, the last one kept is truncated line by line. Dropped sections are
+    listed in a trailing 'trimmed=' line so the model knows they exist.
+
+    Args:
+        title (str): First line of the output.
+        sections (List[Section]): Sections in output order.
+        budget (int, optional): Approximate token budget; None disables trimming.
+
+    Returns:
+        str: The encoded output.
+    """
+    def render(kept, dropped):
+        parts = [title] + [s.render() for s in kept]
+        if dropped:
+            parts.append("trimmed=" + ",".join(s.name for s in dropped))
+        return "\n".join(parts)
+
+    kept = [s for s in sections if s.body]
+    dropped = []
+    output = render(kept, dropped)
+    if budget is None:
+        return output
+
+    while estimate_tokens(output) > budget and len(kept) > 1:
+        victim = min(range(len(kept)), key=lambda i: (kept[i].priority, -i))
+        dropped.append(kept.pop(victim))
+        output = render(kept, dropped)
+
+    if estimate_tokens(output) > budget and kept:
+        # A single section over budget: keep as many of its leading lines as fit
+        last = kept[-1]
+        lines = last.body.split("\n")
+        while len(lines) > 1 and estimate_tokens(output) > budget:
+            lines.pop()
+            kept[-1] = Section(last.name, "\n".join(lines + ["..."]), last.priority)
+            output = render(kept, dropped)
+        if estimate_tokens(output) > budget:
+            output = output[:budget * 4 - 3] + "..."
+    return output
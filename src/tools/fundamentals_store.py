@@ -0,0 +1,167 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+# Statements are refetched this long after an announced earnings date, once the filing is out
+EARNINGS_GRACE = 24 * 3600.0
+
+
+def _earnings_due(earnings_date):
+    """Epoch seconds at which the statements of an earnings date are expected to be out."""
+    return pd.Timestamp(earnings_date, tz="UTC").timestamp() + EARNINGS_GRACE
+
+
+def _reports_next_year(fiscal_period, earnings_date):
+    """
+    Whether an earnings date announces the fiscal year after `fiscal_period`.
+
+    The calendar lists quarterly announcements, but the stored statements are
+    annual: only an announcement made after the next fiscal year has ended
+    can bring a newer period (unknown periods are assumed to).
+    """
+    if not fiscal_period:
+        return True
+    return pd.Timestamp(earnings_date) > pd.Timestamp(fiscal_period) + pd.DateOffset(years=1)
+
+
+class FundamentalsStore:
+    """
+    Persistent per-ticker store for financial statements, revalidated by fiscal calendar.
+
+    Annual statements change at most a few times a year, so a stored record is
+    served from disk until one of the following makes it due for revalidation:
+
+    - the announced earnings date (plus a grace period) has passed;
+    - the earnings date of the next fiscal year passed but the refetch still
+      showed the previous period (the filing is not out yet): retry after
+      `retry_after`, until the period advances (the triggering date is kept as
+      `pending_earnings`, since the calendar moves on to the next date once it
+      has passed). Quarterly earnings dates in between only schedule the
+      revalidation; they cannot advance the annual period, so they never
+      trigger retries;
+    - `max_age` elapsed since the last fetch, as a safety net for tickers
+      without a known earnings date.
+
+    Each record holds the latest reported fiscal period, the next earnings
+    date and the JSON-safe statement tables produced by the fetcher. Records
+    are replaced atomically, so API workers and the Streamlit app can share
+    the directory.
+
+    Args:
+        root (str | Path): Directory holding one JSON file per ticker.
+        fetcher (Callable): `fetcher(ticker)` returning a dict with 'fiscal_period',
+            'earnings_date' (ISO date or None) and 'datasets' (name -> JSON-safe table).
+        max_age (float): Seconds after which a record is revalidated regardless of the calendar.
+        retry_after (float): Seconds between rechecks while a reported period is not yet available.
+    """
+
+    def __init__(self, root, fetcher, max_age=30 * 24 * 3600.0, retry_after=24 * 3600.0):
+        self.root = Path(root)
+        self.fetcher = fetcher
+        self.max_age = max_age
+        self.retry_after = retry_after
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def path(self, ticker):
+        """Returns the record file path for a ticker."""
+        safe = ticker.replace("/", "_").replace("^", "_")
+        return self.root / f"{safe}.json"
+
+    def _lock(self, ticker):
+        with self._locks_guard:
+            return self._locks.setdefault(ticker, threading.Lock())
+
+    def read(self, ticker):
+        """Returns the stored record for a ticker, or None when absent or unreadable."""
+        try:
+            with open(self.path(ticker), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, ticker, record):
+        path = self.path(ticker)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(record, f, allow_nan=False)
+        os.replace(tmp, path)
+
+    def revalidate_at(self, fetched_at, earnings_date, period_advanced, pending_earnings=None, fiscal_period=None):
+        """
+        Computes when a freshly fetched record becomes due for revalidation.
+
+        Args:
+            fetched_at (float): Epoch seconds of the fetch.
+            earnings_date (str | None): Next (or latest announced) earnings date.
+            period_advanced (bool): Whether the fetch returned a newer fiscal period than the previous record.
+            pending_earnings (str | None): Past earnings date whose period the statements do not show yet.
+            fiscal_period (str | None): Latest fiscal period of the fetched statements.
+
+        Returns:
+            float: Epoch seconds.
+        """
+        due = fetched_at + self.max_age
+        if pending_earnings and not period_advanced:
+            # Results were announced but the statements still show the old period
+            due = min(due, fetched_at + self.retry_after)
+        if earnings_date:
+            earnings = _earnings_due(earnings_date)
+            if earnings > fetched_at:
+                due = min(due, earnings)
+            elif not period_advanced and _reports_next_year(fiscal_period, earnings_date):
+                due = min(due, fetched_at + self.retry_after)
+        return due
+
+    def is_fresh(self, record, now=None):
+        """Whether a stored record can be served without revalidation."""
+        return record is not None and (now or time.time()) < record.get("revalidate_at", 0)
+
+    def load(self, ticker):
+        """
+        Returns the record for a ticker, fetching only when it is missing or due.
+
+        Falls back to the stored (possibly stale) record when the fetch fails.
+        """
+        with self._lock(ticker):
+            record = self.read(ticker)
+            if self.is_fresh(record):
+                return record
+            try:
+                fetched = self.fetcher(ticker)
+            except Exception as e:
+                if record is None:
+                    raise
+                print(f"DEBUG: Fundamentals refresh failed for {ticker}, serving stored record: {e}")
+                return record
+
+            now = time.time()
+            previous_period = record.get("fiscal_period") if record else None
+            period = fetched.get("fiscal_period")
+            advanced = previous_period is None or (period is not None and period > previous_period)
+            # The earnings date that made the stored period outdated, kept until the period advances
+            pending = None
+            if record and not advanced:
+                passed = record.get("earnings_date")
+                if passed and _earnings_due(passed) > now:
+                    passed = None
+                pending = next((
+                    date for date in (record.get("pending_earnings"), passed)
+                    if date and _reports_next_year(previous_period, date)
+                ), None)
+            record = {
+                "ticker": ticker,
+                "fiscal_period": period,
+                "earnings_date": fetched.get("earnings_date"),
+                "pending_earnings": pending,
+                "fetched_at": now,
+                "revalidate_at": self.revalidate_at(now, fetched.get("earnings_date"), advanced, pending, period),
+                "datasets": fetched["datasets"],
+            }
+            self._write(ticker, record)
+            return record
@@ -0,0 +1,403 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Vectorized technical indicator engine.
+#
+# Every function takes a 2-D float array shaped (tickers, bars), oldest bar
+# first, and returns an array of the same shape, computing all tickers in one
+# pass. NaN handling follows the pandas implementations in technical_tools.py:
+# a rolling window containing a NaN yields NaN, and warm-up bars are NaN.
+
+
+def as_matrix(values):
+    """Promotes a 1-D series of bars to a (1, bars) float matrix."""
+    matrix = np.asarray(values, dtype=float)
+    return matrix[np.newaxis, :] if matrix.ndim == 1 else matrix
+
+
+def align_histories(histories, columns=("Close", "High", "Low", "Volume")):
+    """
+    Aligns per-ticker OHLCV DataFrames on a shared date index.
+
+    Args:
+        histories (Dict[str, pd.DataFrame]): Price history per ticker.
+        columns (Iterable[str]): Columns to extract as matrices.
+
+    Returns:
+        Tuple[List[str], pd.DatetimeIndex, Dict[str, np.ndarray]]: The ticker order,
+        the union of bar dates, and one (tickers, bars) matrix per column, NaN where
+        a ticker has no bar.
+    """
+    tickers = list(histories)
+    frames = {col: pd.concat({t: histories[t][col] for t in tickers}, axis=1) for col in columns}
+    index = frames[columns[0]].index
+    matrices = {col: frame.reindex(index).to_numpy(dtype=float).T for col, frame in frames.items()}
+    return tickers, index, matrices
+
+
+def shift(x, n):
+    """Shifts each row `n` bars to the right, padding with NaN (pandas `shift`)."""
+    out = np.full_like(x, np.nan)
+    if n < x.shape[1]:
+        out[:, n:] = x[:, :-n] if n else x
+    return out
+
+
+def diff(x, n=1):
+    """Difference against the value `n` bars earlier (pandas `diff`)."""
+    return x - shift(x, n)
+
+
+def rolling_sum(x, window):
+    """
+    Rolling sum over `window` bars using cumulative sums, O(bars) per ticker.
+
+    Rows are centered on their minimum finite value before summing to limit the
+    floating-point error of long cumulative sums.
+    """
+    bars = x.shape[1]
+    out = np.full_like(x, np.nan)
+    if window > bars:
+        return out
+    missing = np.isnan(x)
+    offset = np.nan_to_num(np.fmin.reduce(x, axis=1, keepdims=True)) if bars else 0.0
+    centered = np.where(missing, 0.0, x - offset)
+
+    csum = np.cumsum(centered, axis=1)
+    csum = np.concatenate([np.zeros((x.shape[0], 1)), csum], axis=1)
+    cmiss = np.cumsum(missing, axis=1)
+    cmiss = np.concatenate([np.zeros((x.shape[0], 1), dtype=cmiss.dtype), cmiss], axis=1)
+
+    sums = csum[:, window:] - csum[:, :-window] + offset * window
+    gaps = cmiss[:, window:] - cmiss[:, :-window]
+    out[:, window - 1:] = np.where(gaps > 0, np.nan, sums)
+    return out
+
+
+def sma(x, window):
+    """Simple moving average with `min_periods=window` (pandas `rolling(window).mean()`)."""
+    return rolling_sum(x, window) / window
+
+
+def rolling_max(x, window):
+    """Rolling maximum over strided windows (pandas `rolling(window).max()`)."""
+    out = np.full_like(x, np.nan)
+    if window <= x.shape[1]:
+        out[:, window - 1:] = sliding_window_view(x, window, axis=1).max(axis=2)
+    return out
+
+
+def rolling_min(x, window):
+    """Rolling minimum over strided windows (pandas `rolling(window).min()`)."""
+    out = np.full_like(x, np.nan)
+    if window <= x.shape[1]:
+        out[:, window - 1:] = sliding_window_view(x, window, axis=1).min(axis=2)
+    return out
+
+
+def ema(x, span):
+    """
+    Exponential moving average (pandas `ewm(span=span, adjust=False, ignore_na=True).mean()`).
+
+    The recursion runs over bars but is vectorized across tickers; leading NaNs
+    are skipped per ticker and later NaNs carry the previous value forward.
+    """
+    alpha = 2.0 / (span + 1.0)
+    out = np.full_like(x, np.nan)
+    prev = np.full(x.shape[0], np.nan)
+    for i in range(x.shape[1]):
+        col = x[:, i]
+        prev = np.where(np.isnan(prev), col, np.where(np.isnan(col), prev, alpha * col + (1 - alpha) * prev))
+        out[:, i] = prev
+    return out
+
+
+def mtm(close, window=10):
+    """Momentum: Close(t) - Close(t - window)."""
+    return diff(close, window)
+
+
+def rsi(close, window=14):
+    """
+    Relative Strength Index from simple rolling averages of gains and losses.
+
+    Mirrors `technical_tools.calculate_rsi` exactly, including its conventions:
+    the first (undefined) delta counts as zero, and any undefined ratio
+    (warm-up bars, or a flat window with no gains and no losses) maps to 0.
+    """
+    return _rsi_from_delta(diff(close, 1), window)
+
+
+def _rsi_from_delta(delta, window):
+    """Simple-average RSI from precomputed one-bar close deltas."""
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    avg_gain = sma(gain, window)
+    avg_loss = sma(loss, window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / avg_loss
+        term = 100.0 / (1.0 + rs)
+    term = np.where(np.isfinite(term), term, 100.0)
+    return 100.0 - term
+
+
+def wilder_rsi(close, window=14):
+    """
+    Relative Strength Index with Wilder's smoothing.
+
+    The first average is the mean of the first `window` defined deltas; later
+    averages follow avg = (avg * (window - 1) + value) / window. Bars with an
+    undefined delta (a missing close) are NaN and do not advance the smoothing.
+    A window without gains or losses reads 50.
+    """
+    delta = diff(close, 1)
+    out = np.full_like(close, np.nan)
+    seen = np.zeros(close.shape[0], dtype=int)
+    avg_gain = np.zeros(close.shape[0])
+    avg_loss = np.zeros(close.shape[0])
+    for i in range(close.shape[1]):
+        d = delta[:, i]
+        valid = ~np.isnan(d)
+        gain = np.where(valid & (d > 0), d, 0.0)
+        loss = np.where(valid & (d < 0), -d, 0.0)
+        seen = seen + valid
+        seeding = valid & (seen <= window)
+        smoothing = valid & (seen > window)
+        avg_gain = np.where(seeding, avg_gain + gain / window, avg_gain)
+        avg_loss = np.where(seeding, avg_loss + loss / window, avg_loss)
+        avg_gain = np.where(smoothing, (avg_gain * (window - 1) + gain) / window, avg_gain)
+        avg_loss = np.where(smoothing, (avg_loss * (window - 1) + loss) / window, avg_loss)
+        out[:, i] = np.where(valid & (seen >= window), _rsi_from_averages(avg_gain, avg_loss), np.nan)
+    return out
+
+
+def _rsi_from_averages(avg_gain, avg_loss):
+    """RSI from average gain/loss, with 100 for no losses and 50 for a flat window."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        value = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    return np.where(avg_loss == 0, np.where(avg_gain == 0, 50.0, 100.0), value)
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    """
+    Moving Average Convergence Divergence.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: The MACD line (EMA fast - EMA slow),
+        its signal line (EMA of the MACD line) and the histogram (line - signal).
+    """
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+
+def rolling_std(x, window):
+    """Rolling sample standard deviation (pandas `rolling(window).std()`)."""
+    # Center each row on its mean so the sum of squares does not cancel catastrophically
+    offset = np.nanmean(x, axis=1, keepdims=True) if x.shape[1] else 0.0
+    centered = x - offset
+    mean = sma(centered, window)
+    mean_sq = sma(centered * centered, window)
+    var = (mean_sq - mean * mean) * window / (window - 1)
+    return np.sqrt(np.clip(var, 0.0, None))
+
+
+# --- Indicator registry ---
+
+class IndicatorContext:
+    """
+    Price arrays plus a memo of intermediate results for one computation pass.
+
+    Indicators request their building blocks through the context (`sma`, `ema`,
+    `delta`, ...), so a block shared by several indicators, such as the close
+    EMAs used by both MACD and a standalone EMA, or the SMA behind both a
+    moving-average line and the Bollinger mid band, is computed only once.
+    """
+
+    def __init__(self, close, high=None, low=None, volume=None):
+        self.arrays = {"close": as_matrix(close)}
+        for name, values in (("high", high), ("low", low), ("volume", volume)):
+            if values is not None:
+                self.arrays[name] = as_matrix(values)
+        self._memo = {}
+
+    def _cached(self, key, compute):
+        if key not in self._memo:
+            self._memo[key] = compute()
+        return self._memo[key]
+
+    def series(self, field):
+        if field not in self.arrays:
+            raise ValueError(f"Indicator requires '{field}' prices")
+        return self.arrays[field]
+
+    def delta(self, field="close", n=1):
+        return self._cached(("delta", field, n), lambda: diff(self.series(field), n))
+
+    def sma(self, field, window):
+        return self._cached(("sma", field, window), lambda: sma(self.series(field), window))
+
+    def ema(self, field, span):
+        return self._cached(("ema", field, span), lambda: ema(self.series(field), span))
+
+    def rolling_std(self, field, window):
+        return self._cached(("std", field, window), lambda: rolling_std(self.series(field), window))
+
+    def rolling_max(self, field, window):
+        return self._cached(("max", field, window), lambda: rolling_max(self.series(field), window))
+
+    def rolling_min(self, field, window):
+        return self._cached(("min", field, window), lambda: rolling_min(self.series(field), window))
+
+    def true_range(self):
+        def compute():
+            prev_close = shift(self.series("close"), 1)
+            high, low = self.series("high"), self.series("low")
+            true_range = np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)))
+            # Bars without a previous close (first bar, after a gap) fall back to their high-low range
+            return np.where(np.isnan(prev_close), high - low, true_range)
+        return self._cached(("true_range",), compute)
+
+
+INDICATORS = {}
+
+
+def register(name, **defaults):
+    """
+    Registers an indicator under `name` with its default parameters.
+
+    The decorated function receives an IndicatorContext and the parameters
+    and returns a dict of output name -> (tickers, bars) array.
+    """
+    def decorator(fn):
+        INDICATORS[name] = (fn, defaults)
+        return fn
+    return decorator
+
+
+def _suffix(params, defaults):
+    """Output-name suffix: empty for default parameters, otherwise '_p1_p2'."""
+    if params == defaults:
+        return ""
+    return "_" + "_".join(f"{v:g}" if isinstance(v, float) else str(v) for v in params.values())
+
+
+@register("SMA", window=20)
+def _sma_indicator(ctx, window):
+    return {f"SMA_{window}": ctx.sma("close", window)}
+
+
+@register("EMA", span=12)
+def _ema_indicator(ctx, span):
+    return {f"EMA_{span}": ctx.ema("close", span)}
+
+
+@register("MTM", window=10)
+def _mtm_indicator(ctx, window):
+    return {f"MTM_{window}": ctx.delta("close", window)}
+
+
+@register("RSI", window=14)
+def _rsi_indicator(ctx, window):
+    return {f"RSI_{window}": _rsi_from_delta(ctx.delta("close", 1), window)}
+
+
+@register("MACD", fast=12, slow=26, signal=9)
+def _macd_indicator(ctx, fast, slow, signal):
+    line = ctx.ema("close", fast) - ctx.ema("close", slow)
+    signal_line = ema(line, signal)
+    suffix = _suffix({"fast": fast, "slow": slow, "signal": signal}, INDICATORS["MACD"][1])
+    return {f"MACD{suffix}": line, f"MACD_SIGNAL{suffix}": signal_line, f"MACD_HIST{suffix}": line - signal_line}
+
+
+@register("BBANDS", window=20, k=2.0)
+def _bbands_indicator(ctx, window, k):
+    mid = ctx.sma("close", window)
+    width = k * ctx.rolling_std("close", window)
+    suffix = _suffix({"window": window, "k": k}, INDICATORS["BBANDS"][1])
+    return {f"BB_UPPER{suffix}": mid + width, f"BB_MID{suffix}": mid, f"BB_LOWER{suffix}": mid - width}
+
+
+@register("STOCH", k=14, d=3)
+def _stoch_indicator(ctx, k, d):
+    highest = ctx.rolling_max("high", k)
+    lowest = ctx.rolling_min("low", k)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        percent_k = 100.0 * (ctx.series("close") - lowest) / (highest - lowest)
+    percent_k = np.where(highest == lowest, 50.0, percent_k)
+    percent_k = np.where(np.isnan(highest) | np.isnan(lowest), np.nan, percent_k)
+    suffix = _suffix({"k": k, "d": d}, INDICATORS["STOCH"][1])
+    return {f"STOCH_K{suffix}": percent_k, f"STOCH_D{suffix}": sma(percent_k, d)}
+
+
+@register("ATR", window=14)
+def _atr_indicator(ctx, window):
+    # Wilder smoothing is an EMA with alpha = 1 / window, i.e. span = 2 * window - 1
+    return {f"ATR_{window}": ema(ctx.true_range(), 2 * window - 1)}
+
+
+def parse_spec(spec):
+    """
+    Parses an indicator spec into (name, params).
+
+    Accepts 'RSI', 'RSI(14)', 'MACD(12,26,9)', a (name, params) tuple or a
+    {'name': ..., **params} dict; omitted parameters take the registered defaults.
+    """
+    if isinstance(spec, dict):
+        spec = dict(spec)
+        name, given = spec.pop("name"), spec
+    elif isinstance(spec, tuple):
+        name, given = spec[0], dict(spec[1]) if len(spec) > 1 else {}
+    else:
+        text = spec.strip()
+        name, _, args = text.partition("(")
+        given = {}
+        values = [a.strip() for a in args.rstrip(")").split(",") if a.strip()]
+        if name.upper() in INDICATORS:
+            keys = list(INDICATORS[name.upper()][1])
+            if len(values) > len(keys):
+                raise ValueError(f"Too many parameters for {name}: {spec}")
+            given = {key: float(v) if "." in v else int(v) for key, v in zip(keys, values)}
+    name = name.strip().upper()
+    if name not in INDICATORS:
+        raise ValueError(f"Unknown indicator: {name}")
+    params = dict(INDICATORS[name][1])
+    params.update(given)
+    return name, params
+
+
+def compute_indicators(specs, close, high=None, low=None, volume=None):
+    """
+    Computes a set of indicators for every ticker in one shared pass.
+
+    Args:
+        specs (Iterable): Indicator specs, e.g. ['SMA(20)', 'RSI(14)', 'MACD(12,26,9)'].
+        close, high, low, volume (np.ndarray): Price matrices shaped (tickers, bars) or (bars,).
+
+    Returns:
+        Dict[str, np.ndarray]: Output name -> (tickers, bars) array, in spec order.
+    """
+    ctx = IndicatorContext(close, high, low, volume)
+    results = {}
+    for spec in specs:
+        name, params = parse_spec(spec)
+        fn, _ = INDICATORS[name]
+        results.update(fn(ctx, **params))
+    return results
+
+
+DEFAULT_SPECS = ["SMA(20)", "SMA(50)", "RSI(14)", "MTM(10)"]
+
+
+def compute_default_indicators(close):
+    """
+    Computes the core indicator set (SMA_20, SMA_50, RSI_14, MTM_10) for every ticker at once.
+
+    Args:
+        close (np.ndarray): Close prices shaped (tickers, bars) or (bars,).
+
+    Returns:
+        Dict[str, np.ndarray]: Each indicator shaped (tickers, bars).
+    """
+    return compute_indicators(DEFAULT_SPECS, close)
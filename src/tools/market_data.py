@@ -0,0 +1,553 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from .ohlcv_store import OHLCVStore, STORED_INTERVALS, period_start
+from .fundamentals_store import FundamentalsStore
+from ..deadline import call_without_budget, remaining, tool_timeout
+
+
+class _InFlight:
+    """A pending fetch that concurrent callers for the same key can wait on."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class MarketDataCache:
+    """
+    Process-wide bounded LRU cache with TTL and single-flight deduplication.
+
+    Entries are keyed by (ticker, dataset, period, interval). When several
+    callers ask for the same key while it is being fetched, only the first
+    caller hits the network; the others block until that fetch completes and
+    share its result. Failed fetches are never cached.
+
+    The shared fetch runs outside any caller's deadline budget; each caller
+    only waits for it until its own budget runs out, so a request with a tight
+    deadline never fails the same fetch for the others.
+
+    Args:
+        maxsize (int): Maximum number of entries kept before evicting the least recently used.
+        ttl (float): Default time-to-live of an entry, in seconds.
+    """
+
+    def __init__(self, maxsize=256, ttl=900.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "errors": 0,
+        }
+
+    def get_or_fetch(self, key, fetch, ttl=None):
+        """
+        Returns the cached value for `key`, calling `fetch()` at most once on a miss.
+
+        Args:
+            key (tuple): The cache key, conventionally (ticker, dataset, period, interval).
+            fetch (Callable[[], Any]): Zero-argument function performing the actual download.
+            ttl (float, optional): Overrides the default time-to-live for this entry.
+
+        Returns:
+            Any: The cached or freshly fetched value.
+
+        Raises:
+            TimeoutError: The fetch did not complete within the calling node's remaining budget.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._counters["hits"] += 1
+                    return value
+                del self._entries[key]
+                self._counters["expirations"] += 1
+
+            pending = self._inflight.get(key)
+            if pending is None:
+                # This caller becomes the leader and performs the fetch
+                pending = _InFlight()
+                self._inflight[key] = pending
+                self._counters["misses"] += 1
+                leader = True
+            else:
+                self._counters["coalesced"] += 1
+                leader = False
+
+        timeout = remaining()
+        if leader:
+            if timeout is None:
+                self._lead(key, pending, fetch, ttl)
+            else:
+                # The fetch outlives this caller's budget and still completes for the waiters
+                worker = threading.Thread(
+                    target=copy_context().run, args=(call_without_budget, self._lead, key, pending, fetch, ttl), daemon=True
+                )
+                worker.start()
+
+        if not pending.event.wait(timeout):
+            raise TimeoutError(f"Fetch of {key} did not complete within the remaining {timeout:.1f}s budget")
+        if pending.error is not None:
+            raise pending.error
+        return pending.value
+
+    def _lead(self, key, pending, fetch, ttl):
+        """Performs the fetch of a pending key and wakes its waiters with the result or the error."""
+        try:
+            pending.value = fetch()
+        except Exception as e:
+            pending.error = e
+            with self._lock:
+                self._counters["errors"] += 1
+        else:
+            with self._lock:
+                self._store(key, pending.value, self.ttl if ttl is None else ttl)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            pending.event.set()
+
+    def _store(self, key, value, ttl):
+        """Inserts an entry and evicts the least recently used ones beyond `maxsize`. Caller holds the lock."""
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def put(self, key, value, ttl=None):
+        """Seeds the cache with a value fetched elsewhere (e.g. by a batched download)."""
+        with self._lock:
+            self._store(key, value, self.ttl if ttl is None else ttl)
+
+    def stats(self):
+        """
+        Returns a snapshot of the cache counters.
+
+        `network_fetches` counts actual downloads; every hit or coalesced wait
+        is a round-trip that was saved.
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats["size"] = len(self._entries)
+            stats["in_flight"] = len(self._inflight)
+        stats["network_fetches"] = stats["misses"]
+        stats["saved_round_trips"] = stats["hits"] + stats["coalesced"]
+        lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_rate"] = round(stats["saved_round_trips"] / lookups, 4) if lookups else 0.0
+        return stats
+
+    def clear(self):
+        """Drops all cached entries and resets the counters."""
+        with self._lock:
+            self._entries.clear()
+            for name in self._counters:
+                self._counters[name] = 0
+
+
+# Shared instance used by every tool, the API and the Streamlit app
+market_data_cache = MarketDataCache(
+    maxsize=int(os.getenv("MARKET_DATA_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("MARKET_DATA_CACHE_TTL", "900")),
+)
+
+_tickers = {}
+_tickers_lock = threading.Lock()
+
+# Snapshot prefetched into AgentState["market_data"]; activated per node with `use_snapshot`
+_active_snapshot = ContextVar("market_data_snapshot", default=None)
+
+# Price histories downloaded in batch by the prefetch stage, as (period, interval)
+PREFETCH_HISTORY = [("6mo", "1d"), ("5y", "1mo")]
+
+# Subset of `Ticker.info` the tools actually read, kept in the state snapshot
+INFO_FIELDS = [
+    "marketCap", "trailingPE", "forwardPE", "pegRatio", "priceToBook", "dividendYield",
+    "returnOnEquity", "operatingMargins", "targetMeanPrice", "targetHighPrice",
+    "recommendationKey", "numberOfAnalystOpinions", "currentPrice", "regularMarketPrice",
+    "previousClose", "currency",
+]
+
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+# Seconds yfinance waits for a price download (its default)
+YF_TIMEOUT = 10
+
+
+def _download_history(ticker, interval, period=None, start=None):
+    """Downloads bars for one ticker, either for a lookback `period` or from a `start` date."""
+    stock = get_ticker(ticker)
+    # yfinance's own default timeout, capped at the calling node's deadline budget
+    timeout = tool_timeout(YF_TIMEOUT)
+    if start is not None:
+        return stock.history(start=start, interval=interval, timeout=timeout)
+    return stock.history(period=period, interval=interval, timeout=timeout)
+
+
+# Persistent OHLCV store shared by API workers and the Streamlit app (set OHLCV_STORE=0 to disable)
+ohlcv_store = OHLCVStore(
+    os.getenv("OHLCV_STORE_DIR", os.path.join(os.path.dirname(__file__), "..", "..", ".cache", "ohlcv")),
+    fetcher=_download_history,
+    max_age=float(os.getenv("OHLCV_STORE_MAX_AGE", "900")),
+)
+
+
+def _use_store(period, interval):
+    """Whether a history request is served by the persistent store (daily and longer bars only)."""
+    if os.getenv("OHLCV_STORE", "1") == "0" or interval not in STORED_INTERVALS:
+        return False
+    try:
+        period_start(period)
+    except ValueError:
+        return False
+    return True
+
+
+def _fetch_history(symbol, period, interval):
+    """Cache-miss path of `get_history`: the persistent store when possible, otherwise yfinance."""
+    if _use_store(period, interval):
+        return ohlcv_store.load(symbol, period, interval)
+    return _download_history(symbol, interval, period=period)
+
+
+def _next_earnings_date(stock):
+    """Best-effort next earnings date from `Ticker.calendar`, as an ISO date string."""
+    try:
+        dates = stock.calendar.get("Earnings Date") or []
+        return pd.Timestamp(dates[0]).date().isoformat() if dates else None
+    except Exception:
+        return None
+
+
+def latest_fiscal_period(statement):
+    """Most recent fiscal period end in a statement table, as an ISO date string."""
+    if statement is None or statement.empty:
+        return None
+    periods = pd.to_datetime(statement.columns, errors="coerce").dropna()
+    return periods.max().date().isoformat() if len(periods) else None
+
+
+def _download_fundamentals(ticker):
+    """Downloads the annual statements and the earnings calendar for one ticker."""
+    stock = get_ticker(ticker)
+    financials = stock.financials
+    balance_sheet = stock.balance_sheet
+    return {
+        "fiscal_period": latest_fiscal_period(financials),
+        "earnings_date": _next_earnings_date(stock),
+        "datasets": {
+            "financials": frame_to_compact(financials),
+            "balance_sheet": frame_to_compact(balance_sheet),
+        },
+    }
+
+
+# Persistent statement store, revalidated after earnings dates (set FUNDAMENTALS_STORE=0 to disable)
+fundamentals_store = FundamentalsStore(
+    os.getenv("FUNDAMENTALS_STORE_DIR", os.path.join(os.path.dirname(__file__), "..", "..", ".cache", "fundamentals")),
+    fetcher=_download_fundamentals,
+    max_age=float(os.getenv("FUNDAMENTALS_MAX_AGE", str(30 * 24 * 3600))),
+)
+
+
+def _fetch_statement(symbol, dataset):
+    """Cache-miss path of `get_financials` / `get_balance_sheet`: the fundamentals store unless disabled."""
+    if os.getenv("FUNDAMENTALS_STORE", "1") == "0":
+        return getattr(get_ticker(symbol), dataset)
+    return frame_from_compact(fundamentals_store.load(symbol)["datasets"][dataset])
+
+
+def normalize_ticker(ticker):
+    """Normalizes a ticker symbol so that 'tsm ' and 'TSM' share cache entries."""
+    return ticker.strip().upper()
+
+
+def get_ticker(ticker):
+    """Returns a shared `yf.Ticker` instance for the symbol instead of building a new one per call."""
+    symbol = normalize_ticker(ticker)
+    with _tickers_lock:
+        stock = _tickers.get(symbol)
+        if stock is None:
+            stock = yf.Ticker(symbol)
+            _tickers[symbol] = stock
+        return stock
+
+
+def get_history(ticker, period="6mo", interval="1d"):
+    """
+    Retrieves OHLCV price history through the shared cache.
+
+    Args:
+        ticker (str): The stock ticker symbol.
+        period (str): The yfinance lookback period (e.g., '6mo', '5y').
+        interval (str): The yfinance bar interval (e.g., '1d', '1mo').
+
+    Returns:
+        pd.DataFrame: The price history. Shared between callers, so do not mutate it in place.
+    """
+    symbol = normalize_ticker(ticker)
+    compact = _from_snapshot(symbol, "history", f"{period}|{interval}")
+    if compact is not None:
+        return history_from_compact(compact)
+    return market_data_cache.get_or_fetch(
+        (symbol, "history", period, interval),
+        lambda: _fetch_history(symbol, period, interval),
+    )
+
+
+def get_info(ticker):
+    """Retrieves the `info` snapshot (valuation, estimates, quote) through the shared cache."""
+    symbol = normalize_ticker(ticker)
+    compact = _from_snapshot(symbol, "info")
+    if compact is not None:
+        return compact
+    return market_data_cache.get_or_fetch(
+        (symbol, "info", None, None),
+        # No timeout parameter: the cache stops waiting when the node's deadline budget runs out
+        lambda: get_ticker(symbol).info,
+    )
+
+
+def get_financials(ticker):
+    """Retrieves the annual income statement through the shared cache and the fundamentals store."""
+    symbol = normalize_ticker(ticker)
+    compact = _from_snapshot(symbol, "financials")
+    if compact is not None:
+        return frame_from_compact(compact)
+    return market_data_cache.get_or_fetch(
+        (symbol, "financials", None, None),
+        lambda: _fetch_statement(symbol, "financials"),
+    )
+
+
+def get_balance_sheet(ticker):
+    """Retrieves the annual balance sheet through the shared cache and the fundamentals store."""
+    symbol = normalize_ticker(ticker)
+    compact = _from_snapshot(symbol, "balance_sheet")
+    if compact is not None:
+        return frame_from_compact(compact)
+    return market_data_cache.get_or_fetch(
+        (symbol, "balance_sheet", None, None),
+        lambda: _fetch_statement(symbol, "balance_sheet"),
+    )
+
+
+def get_news(ticker):
+    """Retrieves recent Yahoo Finance news items through the shared cache."""
+    symbol = normalize_ticker(ticker)
+    return market_data_cache.get_or_fetch(
+        (symbol, "news", None, None),
+        lambda: get_ticker(symbol).news,
+    )
+
+
+def get_cache_stats():
+    """Returns hit/miss/eviction counters of the shared market-data cache."""
+    return market_data_cache.stats()
+
+
+# --- Compact snapshot encoding (JSON-safe column arrays stored in AgentState) ---
+
+def _clean(values):
+    """Converts a numeric array into a list of floats with NaN mapped to None."""
+    arr = np.asarray(values, dtype=float)
+    return [None if np.isnan(v) else round(float(v), 6) for v in arr]
+
+
+def history_to_compact(history):
+    """Encodes an OHLCV DataFrame as column arrays keyed by lowercase column name."""
+    tz = history.index.tz if isinstance(history.index, pd.DatetimeIndex) else None
+    compact = {
+        "tz": str(tz) if tz is not None else None,
+        "index": [ts.isoformat() for ts in history.index],
+    }
+    for col in OHLCV_COLUMNS:
+        if col in history.columns:
+            compact[col.lower()] = _clean(history[col].to_numpy())
+    return compact
+
+
+def history_from_compact(compact):
+    """Rebuilds the OHLCV DataFrame encoded by `history_to_compact`."""
+    if compact.get("tz"):
+        # Offsets vary across DST changes, so parse as UTC and convert back to the exchange zone
+        index = pd.DatetimeIndex(pd.to_datetime(compact["index"], utc=True)).tz_convert(compact["tz"])
+    else:
+        index = pd.DatetimeIndex(pd.to_datetime(compact["index"]))
+    data = {col: compact[col.lower()] for col in OHLCV_COLUMNS if col.lower() in compact}
+    return pd.DataFrame(data, index=index, dtype=float)
+
+
+def frame_to_compact(frame):
+    """Encodes a financial statement table (line items x fiscal periods) as nested lists."""
+    if frame is None or frame.empty:
+        return {"index": [], "columns": [], "data": []}
+    return {
+        "index": [str(i) for i in frame.index],
+        "columns": [c.isoformat() if hasattr(c, "isoformat") else str(c) for c in frame.columns],
+        "data": [_clean(pd.to_numeric(row, errors="coerce")) for row in frame.to_numpy()],
+    }
+
+
+def frame_from_compact(compact):
+    """Rebuilds the statement DataFrame encoded by `frame_to_compact`."""
+    columns = pd.to_datetime(compact["columns"], errors="coerce") if compact["columns"] else []
+    return pd.DataFrame(compact["data"], index=compact["index"], columns=columns, dtype=float)
+
+
+def _from_snapshot(symbol, dataset, variant=None):
+    """Looks up a dataset in the active state snapshot; returns None when it was not prefetched."""
+    snapshot = _active_snapshot.get()
+    if not snapshot:
+        return None
+    entry = snapshot.get(symbol, {}).get(dataset)
+    if entry is not None and variant is not None:
+        entry = entry.get(variant)
+    return entry
+
+
+@contextmanager
+def use_snapshot(snapshot):
+    """
+    Makes the prefetched `AgentState["market_data"]` the first source for data tools.
+
+    Tools invoked inside the block (including those run by an agent's ToolNode,
+    which copies the current context into its worker threads) read from the
+    snapshot and only fall back to the shared cache for datasets it lacks.
+    """
+    token = _active_snapshot.set(snapshot)
+    try:
+        yield
+    finally:
+        _active_snapshot.reset(token)
+
+
+# --- Batched prefetch ---
+
+def _batched_download(symbols, **kwargs):
+    """Runs one `yf.download` for many symbols and splits the result per ticker."""
+    data = yf.download(symbols, group_by="ticker", auto_adjust=True, threads=True, progress=False,
+                       timeout=tool_timeout(YF_TIMEOUT), **kwargs)
+    frames = {}
+    for symbol in symbols:
+        if data is None or data.empty or symbol not in data.columns.get_level_values(0):
+            continue
+        frame = data[symbol].dropna(how="all")
+        if not frame.empty:
+            frames[symbol] = frame
+    return frames
+
+
+def _download_batch(symbols, period, interval):
+    """
+    Downloads OHLCV for all symbols in batched requests and seeds the cache per ticker.
+
+    With the persistent store enabled, symbols whose stored series is fresh are
+    not downloaded at all, and stale ones share one incremental request that
+    starts at the earliest overlap anchor among them.
+    """
+    if not _use_store(period, interval):
+        histories = _batched_download(symbols, period=period, interval=interval)
+    else:
+        full, incremental = [], {}
+        for symbol in symbols:
+            kind, kwargs = ohlcv_store.plan(symbol, period, interval)
+            if kind == "full":
+                full.append(symbol)
+            elif kind == "incremental":
+                incremental[symbol] = kwargs["start"]
+
+        if full:
+            for symbol, frame in _batched_download(full, period=period, interval=interval).items():
+                ohlcv_store.ingest(symbol, interval, frame, coverage=period_start(period))
+        if incremental:
+            start = min(incremental.values())
+            for symbol, frame in _batched_download(list(incremental), start=start, interval=interval).items():
+                ohlcv_store.ingest(symbol, interval, frame)
+
+        histories = {}
+        for symbol in symbols:
+            frame = ohlcv_store.read(symbol, interval, start=period_start(period))
+            if frame is not None and not frame.empty:
+                histories[symbol] = frame
+
+    for symbol, history in histories.items():
+        market_data_cache.put((symbol, "history", period, interval), history)
+    return histories
+
+
+def prefetch_market_data(tickers, max_workers=8, fundamentals=True):
+    """
+    Fetches everything the analysts need for `tickers` in one parallel burst.
+
+    Daily and monthly OHLCV are downloaded for all tickers in one batched
+    request per (period, interval); `info` and annual statements are fetched
+    concurrently per ticker. Every result also seeds the shared cache.
+
+    Args:
+        tickers (List[str]): The ticker symbols extracted by the router.
+        max_workers (int): Upper bound on concurrent yfinance requests.
+        fundamentals (bool): Whether to fetch `info` and annual statements as well as prices.
+
+    Returns:
+        dict: Compact, JSON-safe snapshot keyed by ticker, suitable for `AgentState["market_data"]`.
+    """
+    symbols = list(dict.fromkeys(normalize_ticker(t) for t in tickers if t and t.strip()))
+    if not symbols:
+        return {}
+
+    snapshot = {symbol: {"history": {}} for symbol in symbols}
+    per_ticker = {"info": get_info, "financials": get_financials, "balance_sheet": get_balance_sheet} if fundamentals else {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        # Workers run in a copy of the caller's context so downloads see its deadline budget
+        batch_jobs = {
+            pool.submit(copy_context().run, _download_batch, symbols, period, interval): f"{period}|{interval}"
+            for period, interval in PREFETCH_HISTORY
+        }
+        ticker_jobs = {
+            pool.submit(copy_context().run, fetch, symbol): (symbol, dataset)
+            for symbol in symbols
+            for dataset, fetch in per_ticker.items()
+        }
+
+        for job, variant in batch_jobs.items():
+            try:
+                for symbol, history in job.result().items():
+                    snapshot[symbol]["history"][variant] = history_to_compact(history)
+            except Exception as e:
+                # Tools fall back to per-ticker fetches for whatever is missing
+                print(f"DEBUG: Batched download failed for {variant}: {e}")
+
+        for job, (symbol, dataset) in ticker_jobs.items():
+            try:
+                value = job.result()
+            except Exception as e:
+                print(f"DEBUG: Prefetch of {dataset} failed for {symbol}: {e}")
+                continue
+            if dataset == "info":
+                snapshot[symbol]["info"] = {k: value.get(k) for k in INFO_FIELDS if k in value}
+            else:
+                snapshot[symbol][dataset] = frame_to_compact(value)
+
+    return snapshot
@@ -0,0 +1,346 @@
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+# One fixed-width record per bar; each field is a strided column view of the memory map
+RECORD = np.dtype([
+    ("ts", "<i8"),  # Bar open time, UTC nanoseconds
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8"),
+])
+PRICE_FIELDS = ["open", "high", "low", "close"]
+COLUMN_NAMES = {"open": "Open", "high": "High", "low": "Low", "close": "Close", "volume": "Volume"}
+
+# Header: magic, coverage start (ns), last refresh (ns), exchange timezone name
+MAGIC = b"OHLCV01\0"
+HEADER = struct.Struct("<8sqq40s")
+HEADER_SIZE = 64
+FULL_HISTORY = np.iinfo(np.int64).min
+
+# Intervals persisted by the store; intraday bars are fetched live
+STORED_INTERVALS = {"1d", "5d", "1wk", "1mo", "3mo"}
+
+# Number of already stored bars re-fetched on refresh to detect revisions and adjustments
+OVERLAP_BARS = 5
+
+_PERIOD_OFFSETS = {
+    "1d": pd.DateOffset(days=1), "5d": pd.DateOffset(days=5),
+    "1mo": pd.DateOffset(months=1), "3mo": pd.DateOffset(months=3), "6mo": pd.DateOffset(months=6),
+    "1y": pd.DateOffset(years=1), "2y": pd.DateOffset(years=2), "5y": pd.DateOffset(years=5),
+    "10y": pd.DateOffset(years=10),
+}
+
+
+def period_start(period, now=None):
+    """
+    Converts a yfinance period string into the earliest bar timestamp it covers.
+
+    Returns:
+        int: UTC nanoseconds, or FULL_HISTORY for 'max'.
+    """
+    now = now or pd.Timestamp.now(tz="UTC")
+    if period == "max":
+        return FULL_HISTORY
+    if period == "ytd":
+        return pd.Timestamp(year=now.year, month=1, day=1, tz="UTC").value
+    if period not in _PERIOD_OFFSETS:
+        raise ValueError(f"Unsupported period: {period}")
+    return (now - _PERIOD_OFFSETS[period]).normalize().value
+
+
+class OHLCVStore:
+    """
+    Persistent on-disk OHLCV store with incremental, append-mostly refresh.
+
+    Each (ticker, interval) is one memory-mappable file: a 64-byte header
+    followed by fixed-width bar records. A refresh only downloads the bars
+    after the last stored timestamp plus a short overlap window, which is
+    compared with the stored tail:
+
+    - overlap unchanged: new bars are appended;
+    - a later overlap bar differs (e.g. the still-forming bar was revised):
+      the file is truncated at the first differing bar and the tail rewritten;
+    - every overlap bar is uniformly rescaled (a split or dividend adjustment
+      was applied upstream): older bars are rescaled in place, without
+      re-downloading them, and the tail is rewritten.
+
+    Files are shared between processes (API workers, Streamlit) through
+    advisory locks on a sidecar `<file>.lock`.
+
+    Args:
+        root (str | Path): Directory holding the store files.
+        fetcher (Callable): `fetcher(ticker, interval, period=None, start=None)` returning a yfinance-style DataFrame.
+        max_age (float): Seconds after which a stored series is considered stale and refreshed.
+    """
+
+    def __init__(self, root, fetcher, max_age=900.0):
+        self.root = Path(root)
+        self.fetcher = fetcher
+        self.max_age = max_age
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    # --- Files and locking ---
+
+    def path(self, ticker, interval):
+        """Returns the file path for a (ticker, interval) series."""
+        safe = ticker.replace("/", "_").replace("^", "_")
+        return self.root / f"{safe}_{interval}.ohlcv"
+
+    @contextmanager
+    def _locked(self, path, exclusive):
+        """
+        Holds the in-process lock for `path` plus a shared/exclusive advisory
+        lock on its sidecar `.lock` file.
+
+        The data file itself is not locked: full rewrites swap in a new inode
+        with `os.replace`, and a lock on the old inode would not exclude
+        processes that open the new one.
+        """
+        with self._locks_guard:
+            lock = self._locks.setdefault(path, threading.Lock())
+        with lock:
+            if fcntl is None:
+                yield
+                return
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path.with_name(path.name + ".lock"), "a+b") as handle:
+                fcntl.flock(handle, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _read_header(path):
+        with open(path, "rb") as f:
+            magic, coverage, refreshed, tz = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"Not an OHLCV store file: {path}")
+        return coverage, refreshed, tz.rstrip(b"\0").decode()
+
+    @staticmethod
+    def _write_header(f, coverage, refreshed, tz):
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, coverage, refreshed, tz.encode()[:40]).ljust(HEADER_SIZE, b"\0"))
+
+    @staticmethod
+    def _records(path, mode="r"):
+        """Memory-maps the records of a store file (None when it has no bars)."""
+        count = (os.path.getsize(path) - HEADER_SIZE) // RECORD.itemsize
+        if count <= 0:
+            return None
+        return np.memmap(path, dtype=RECORD, mode=mode, offset=HEADER_SIZE, shape=(count,))
+
+    # --- Conversion ---
+
+    @staticmethod
+    def to_records(history):
+        """Converts a yfinance OHLCV DataFrame into store records."""
+        index = pd.DatetimeIndex(history.index)
+        if index.tz is None:
+            index = index.tz_localize("UTC")
+        records = np.empty(len(history), dtype=RECORD)
+        records["ts"] = index.as_unit("ns").asi8
+        for field, column in COLUMN_NAMES.items():
+            records[field] = history[column].to_numpy(dtype=float) if column in history.columns else np.nan
+        return records
+
+    @staticmethod
+    def to_frame(records, tz):
+        """Converts store records back into a yfinance-style OHLCV DataFrame."""
+        index = pd.to_datetime(records["ts"], unit="ns", utc=True)
+        if tz:
+            index = index.tz_convert(tz)
+        data = {column: np.array(records[field]) for field, column in COLUMN_NAMES.items()}
+        return pd.DataFrame(data, index=pd.DatetimeIndex(index))
+
+    # --- Refresh ---
+
+    def plan(self, ticker, period, interval):
+        """
+        Decides what has to be downloaded to serve `period` of `interval` bars.
+
+        Returns:
+            Tuple[str, dict]: ('fresh', {}) when nothing is needed, otherwise
+            ('full', fetch kwargs) or ('incremental', fetch kwargs).
+        """
+        path = self.path(ticker, interval)
+        wanted = period_start(period)
+        if not path.exists():
+            return "full", {"period": period}
+        coverage, refreshed, _ = self._read_header(path)
+        if wanted < coverage:
+            # Older bars than we hold are requested: backfill by refetching the whole range
+            return "full", {"period": period}
+        if time.time_ns() - refreshed < self.max_age * 1e9:
+            return "fresh", {}
+        records = self._records(path)
+        if records is None:
+            return "full", {"period": period}
+        anchor = records["ts"][max(len(records) - OVERLAP_BARS, 0)]
+        return "incremental", {"start": pd.Timestamp(anchor, unit="ns", tz="UTC").strftime("%Y-%m-%d")}
+
+    def ingest(self, ticker, interval, history, coverage=None):
+        """
+        Merges freshly downloaded bars into the stored series.
+
+        Args:
+            ticker (str): The ticker symbol.
+            interval (str): The bar interval.
+            history (pd.DataFrame): Downloaded bars, oldest first.
+            coverage (int, optional): Earliest timestamp the download is complete from (full fetches only).
+
+        Returns:
+            str: What happened: 'created', 'appended', 'tail_rewritten', 'rescaled' or 'unchanged'.
+        """
+        path = self.path(ticker, interval)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fresh = self.to_records(history.dropna(subset=["Close"]))
+        tz = str(history.index.tz) if getattr(history.index, "tz", None) is not None else ""
+        now = time.time_ns()
+
+        with self._locked(path, exclusive=True):
+            stored = self._records(path) if path.exists() else None
+            if stored is None or len(fresh) == 0 or fresh["ts"][0] <= stored["ts"][0]:
+                if len(fresh) == 0 and stored is not None:
+                    return "unchanged"
+                del stored
+                # Nothing to reconcile with: (re)write the whole series atomically
+                start = coverage if coverage is not None else (fresh["ts"][0] if len(fresh) else now)
+                tmp = path.with_suffix(f".tmp{os.getpid()}")
+                with open(tmp, "wb") as f:
+                    self._write_header(f, start, now, tz)
+                    f.write(fresh.tobytes())
+                os.replace(tmp, path)
+                return "created"
+
+            old_coverage, _, old_tz = self._read_header(path)
+            if coverage is not None:
+                old_coverage = min(old_coverage, coverage)
+            keep, outcome, factors = self._reconcile(stored, fresh)
+            del stored  # Release the read-only map before rewriting the file
+
+            tail = fresh[fresh["ts"] > self._last_ts(path, keep)]
+            if outcome == "rescaled":
+                self._rescale(path, keep, *factors)
+            with open(path, "r+b") as f:
+                f.truncate(HEADER_SIZE + keep * RECORD.itemsize)
+                f.seek(0, os.SEEK_END)
+                f.write(tail.tobytes())
+                self._write_header(f, old_coverage, now, tz or old_tz)
+            if outcome == "appended" and len(tail) == 0:
+                return "unchanged"
+            return outcome
+
+    def _reconcile(self, stored, fresh):
+        """
+        Compares the overlap between stored and fresh bars.
+
+        Returns:
+            Tuple[int, str, tuple]: Number of stored records to keep, the outcome
+            label and, for 'rescaled', the (price, volume) factors to apply.
+        """
+        first = int(np.searchsorted(stored["ts"], fresh["ts"][0]))
+        overlap = stored[first:]
+        _, in_stored, in_fresh = np.intersect1d(overlap["ts"], fresh["ts"], return_indices=True)
+        if len(in_stored) != len(overlap):
+            # Stored bars vanished upstream: rewrite from the overlap start
+            return first, "tail_rewritten", ()
+
+        old = np.column_stack([overlap[f] for f in PRICE_FIELDS])
+        new = np.column_stack([fresh[f][in_fresh] for f in PRICE_FIELDS])
+        same = np.isclose(old, new, rtol=1e-6, equal_nan=True).all(axis=1)
+        if same.all():
+            return len(stored), "appended", ()
+
+        mismatch = int(np.argmin(same))
+        if mismatch > 0:
+            return first + mismatch, "tail_rewritten", ()
+
+        # The anchor itself changed: check for a uniform upstream rescale of older bars
+        ratios = new[0] / old[0]
+        factor = ratios[0]
+        if np.all(np.isfinite(ratios)) and np.allclose(ratios, factor, rtol=1e-4):
+            old_vol, new_vol = overlap["volume"][0], fresh["volume"][in_fresh[0]]
+            volume_factor = new_vol / old_vol if old_vol > 0 and new_vol > 0 else 1.0
+            return first, "rescaled", (float(factor), float(volume_factor))
+        return first, "tail_rewritten", ()
+
+    @staticmethod
+    def _last_ts(path, keep):
+        """Returns the timestamp of the last record that is kept (or the minimum when none is)."""
+        if keep == 0:
+            return FULL_HISTORY
+        with open(path, "rb") as f:
+            f.seek(HEADER_SIZE + (keep - 1) * RECORD.itemsize)
+            return int(np.frombuffer(f.read(RECORD.itemsize), dtype=RECORD)["ts"][0])
+
+    def _rescale(self, path, count, factor, volume_factor):
+        """Applies a split/dividend adjustment in place to the first `count` stored bars."""
+        if count == 0:
+            return
+        records = np.memmap(path, dtype=RECORD, mode="r+", offset=HEADER_SIZE, shape=(count,))
+        for field in PRICE_FIELDS:
+            records[field] *= factor
+        records["volume"] *= volume_factor
+        records.flush()
+        del records
+
+    # --- Reads ---
+
+    def read(self, ticker, interval, start=FULL_HISTORY):
+        """
+        Reads stored bars from `start` onwards without touching the network.
+
+        Returns:
+            pd.DataFrame | None: The bars, or None when the series is not stored.
+        """
+        path = self.path(ticker, interval)
+        if not path.exists():
+            return None
+        with self._locked(path, exclusive=False):
+            _, _, tz = self._read_header(path)
+            records = self._records(path)
+            if records is None:
+                return None
+            first = int(np.searchsorted(records["ts"], start))
+            frame = self.to_frame(records[first:], tz)
+            del records
+        return frame
+
+    def load(self, ticker, period, interval):
+        """
+        Returns `period` of `interval` bars, downloading only what is missing.
+
+        Falls back to the stored (possibly stale) bars when the download fails.
+        """
+        kind, kwargs = self.plan(ticker, period, interval)
+        if kind != "fresh":
+            try:
+                history = self.fetcher(ticker, interval, **kwargs)
+                if history is not None and not history.empty:
+                    coverage = period_start(period) if kind == "full" else None
+                    self.ingest(ticker, interval, history, coverage=coverage)
+            except Exception as e:
+                if not self.path(ticker, interval).exists():
+                    raise
+                print(f"DEBUG: OHLCV refresh failed for {ticker} {interval}, serving stored bars: {e}")
+        frame = self.read(ticker, interval, start=period_start(period))
+        if frame is None:
+            return pd.DataFrame(columns=list(COLUMN_NAMES.values()), index=pd.DatetimeIndex([]))
+        return frame
@@ -0,0 +1,258 @@
+from langchain_core.tools import tool
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from .market_data import get_history
+from .indicators import compute_indicators
+from .encoding import Section, encode_kv, encode_sections, token_budget
+
+# Algorithmic chart-pattern detection.
+#
+# Peaks and troughs are extracted with a vectorized sliding-window test, merged
+# into an alternating pivot sequence, and the classical patterns (double tops and
+# bottoms, head-and-shoulders, triangles, boxes and channels) are matched on the
+# last few pivots. Price tolerances scale with ATR so that "equal highs" means
+# the same thing for a quiet utility and a volatile semiconductor name.
+
+PIVOT_ORDER = 5          # Bars on each side a pivot must dominate
+TOLERANCE_ATR = 1.5      # Two prices are "equal" when within this many ATRs
+FLAT_SLOPE_ATR = 0.02    # A trendline is flat when it moves less than this many ATRs per bar
+TRENDLINE_PIVOTS = 4     # Most recent peaks / troughs used for trendline fits
+
+
+def find_pivots(high, low, order=PIVOT_ORDER):
+    """
+    Finds local peaks (on highs) and troughs (on lows).
+
+    A bar is a peak when its high is the maximum of the `2 * order + 1` bars
+    centred on it, and a trough when its low is the minimum.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Bar indices of peaks and of troughs.
+    """
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    span = 2 * order + 1
+    if len(high) < span:
+        return np.array([], dtype=int), np.array([], dtype=int)
+    centre = np.arange(order, len(high) - order)
+    peaks = centre[high[centre] == np.nanmax(sliding_window_view(high, span), axis=1)]
+    troughs = centre[low[centre] == np.nanmin(sliding_window_view(low, span), axis=1)]
+    return peaks, troughs
+
+
+def pivot_sequence(high, low, order=PIVOT_ORDER):
+    """
+    Merges peaks and troughs into an alternating sequence.
+
+    Consecutive pivots of the same kind keep only the most extreme one, so the
+    sequence always alternates H, L, H, ... (or L, H, L, ...).
+
+    Returns:
+        List[Tuple[str, int, float]]: (kind 'H'/'L', bar index, price) in time order.
+    """
+    peaks, troughs = find_pivots(high, low, order)
+    events = sorted([("H", int(i), float(high[i])) for i in peaks] + [("L", int(i), float(low[i])) for i in troughs],
+                    key=lambda p: p[1])
+    pivots = []
+    for kind, idx, price in events:
+        if pivots and pivots[-1][0] == kind:
+            prev = pivots[-1]
+            more_extreme = price > prev[2] if kind == "H" else price < prev[2]
+            if more_extreme:
+                pivots[-1] = (kind, idx, price)
+            continue
+        pivots.append((kind, idx, price))
+    return pivots
+
+
+def fit_line(x, y):
+    """
+    Least-squares trendline through pivot points.
+
+    Returns:
+        Tuple[float, float, float]: slope, intercept and R^2 (1.0 for two points).
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    slope, intercept = np.polyfit(x, y, 1)
+    residual = y - (slope * x + intercept)
+    total = np.sum((y - y.mean()) ** 2)
+    r2 = 1.0 - np.sum(residual ** 2) / total if total > 0 else 1.0
+    return float(slope), float(intercept), float(r2)
+
+
+def _pattern(name, direction, start, end, confidence, levels, status="forming"):
+    return {
+        "pattern": name,
+        "direction": direction,
+        "start": start,
+        "end": end,
+        "status": status,
+        "confidence": round(float(np.clip(confidence, 0.0, 1.0)), 2),
+        "levels": {k: round(float(v), 2) for k, v in levels.items()},
+    }
+
+
+def _detect_double(pivots, close, tol):
+    """Double top (H L H) or double bottom (L H L) on the last three pivots."""
+    if len(pivots) < 3:
+        return []
+    (k1, i1, p1), (_, i2, p2), (k3, i3, p3) = pivots[-3:]
+    depth = abs(p2 - (p1 + p3) / 2)
+    # The two extremes must match and the middle swing must be meaningful
+    if abs(p1 - p3) > tol or depth < tol:
+        return []
+    similarity = 1.0 - abs(p1 - p3) / tol
+    confidence = 0.5 * similarity + 0.5 * min(1.0, depth / (3 * tol))
+    last = close[-1]
+    if k1 == "H":
+        status = "confirmed" if last < p2 else "forming"
+        return [_pattern("Double Top", "bearish", i1, i3, confidence,
+                         {"peak_1": p1, "peak_2": p3, "neckline": p2, "target": p2 - depth}, status)]
+    status = "confirmed" if last > p2 else "forming"
+    return [_pattern("Double Bottom", "bullish", i1, i3, confidence,
+                     {"trough_1": p1, "trough_2": p3, "neckline": p2, "target": p2 + depth}, status)]
+
+
+def _detect_head_and_shoulders(pivots, close, tol):
+    """Head-and-shoulders top (H L H L H) or inverse (L H L H L) on the last five pivots."""
+    if len(pivots) < 5:
+        return []
+    (k1, i1, ls), (_, j1, n1), (_, i2, head), (_, j2, n2), (_, i3, rs) = pivots[-5:]
+    top = k1 == "H"
+    # The head must stand out from both shoulders, which must roughly match
+    prominence = head - max(ls, rs) if top else min(ls, rs) - head
+    if prominence < tol or abs(ls - rs) > tol:
+        return []
+    slope = (n2 - n1) / (j2 - j1)
+    neckline = n2 + slope * (len(close) - 1 - j2)
+    height = abs(head - (n1 + slope * (i2 - j1)))
+    confidence = 0.5 * (1.0 - abs(ls - rs) / tol) + 0.5 * min(1.0, height / (4 * tol))
+    last = close[-1]
+    if top:
+        status = "confirmed" if last < neckline else "forming"
+        return [_pattern("Head and Shoulders Top", "bearish", i1, i3, confidence,
+                         {"head": head, "neckline": neckline, "target": neckline - height}, status)]
+    status = "confirmed" if last > neckline else "forming"
+    return [_pattern("Inverse Head and Shoulders", "bullish", i1, i3, confidence,
+                     {"head": head, "neckline": neckline, "target": neckline + height}, status)]
+
+
+def _detect_trendlines(pivots, close, tol, flat):
+    """Triangles, boxes and channels from trendlines through recent peaks and troughs."""
+    peaks = [(i, p) for k, i, p in pivots if k == "H"][-TRENDLINE_PIVOTS:]
+    troughs = [(i, p) for k, i, p in pivots if k == "L"][-TRENDLINE_PIVOTS:]
+    if len(peaks) < 2 or len(troughs) < 2:
+        return []
+    up_slope, up_icpt, up_r2 = fit_line(*zip(*peaks))
+    lo_slope, lo_icpt, lo_r2 = fit_line(*zip(*troughs))
+    end = len(close) - 1
+    upper = up_slope * end + up_icpt
+    lower = lo_slope * end + lo_icpt
+    if upper <= lower:
+        return []
+
+    up_dir = 0 if abs(up_slope) < flat else int(np.sign(up_slope))
+    lo_dir = 0 if abs(lo_slope) < flat else int(np.sign(lo_slope))
+    shapes = {
+        (-1, 1): ("Symmetrical Triangle", "neutral"),
+        (0, 1): ("Ascending Triangle", "bullish"),
+        (-1, 0): ("Descending Triangle", "bearish"),
+        (0, 0): ("Box Consolidation", "neutral"),
+        (1, 1): ("Rising Channel", "bullish"),
+        (-1, -1): ("Falling Channel", "bearish"),
+    }
+    if (up_dir, lo_dir) not in shapes:
+        return []
+    name, direction = shapes[(up_dir, lo_dir)]
+    # Channels need roughly parallel lines, otherwise they are wedges we do not classify
+    if up_dir == lo_dir != 0 and abs(up_slope - lo_slope) > flat:
+        return []
+
+    start = min(peaks[0][0], troughs[0][0])
+    touches = min(len(peaks), len(troughs))
+    confidence = 0.6 * (up_r2 + lo_r2) / 2 + 0.4 * min(1.0, (touches - 1) / (TRENDLINE_PIVOTS - 1))
+    last = close[-1]
+    status = "breakout" if last > upper + tol / 2 else "breakdown" if last < lower - tol / 2 else "forming"
+    return [_pattern(name, direction, start, end, confidence,
+                     {"resistance": upper, "support": lower, "height": upper - lower}, status)]
+
+
+def detect_patterns(high, low, close, order=PIVOT_ORDER):
+    """
+    Runs every pattern detector over one price history.
+
+    Args:
+        high, low, close (np.ndarray): Daily bars, oldest first.
+        order (int): Pivot half-window in bars.
+
+    Returns:
+        Tuple[List[dict], List[Tuple[str, int, float]]]: Detected patterns sorted
+        by confidence, and the pivot sequence they were matched on.
+    """
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    close = np.asarray(close, dtype=float)
+    pivots = pivot_sequence(high, low, order)
+    if not pivots:
+        return [], pivots
+
+    atr = compute_indicators(["ATR(14)"], close, high=high, low=low)["ATR_14"][0]
+    scale = atr[~np.isnan(atr)][-1] if np.any(~np.isnan(atr)) else np.nanstd(close)
+    tol = TOLERANCE_ATR * scale
+    flat = FLAT_SLOPE_ATR * scale
+
+    patterns = (
+        _detect_head_and_shoulders(pivots, close, tol)
+        + _detect_double(pivots, close, tol)
+        + _detect_trendlines(pivots, close, tol, flat)
+    )
+    return sorted(patterns, key=lambda p: -p["confidence"]), pivots
+
+
+@tool
+def detect_chart_patterns(ticker: str) -> str:
+    """
+    Detects classical chart patterns algorithmically for a given stock ticker.
+
+    Scans the last 6 months of daily bars for Head and Shoulders (top/inverse),
+    Double Top/Bottom, Triangles, Box Consolidation and Channels, and reports
+    each with its key levels (neckline, support/resistance, target), status
+    and a 0-1 confidence score.
+
+    Args:
+        ticker (str): The stock ticker symbol (e.g., 'TSM', 'NVDA').
+
+    Returns:
+        str: A compact list of detected patterns (one key=value line each) for agent consumption.
+    """
+    try:
+        history = get_history(ticker, period="6mo", interval="1d")
+
+        if history.empty:
+            return f"No historical price data found for {ticker} for pattern detection."
+
+        patterns, pivots = detect_patterns(history['High'], history['Low'], history['Close'])
+        dates = history.index.strftime('%Y-%m-%d')
+
+        # One line per pattern, most confident first; lower-confidence patterns are trimmed first
+        sections = [
+            Section(
+                p["pattern"],
+                encode_kv({"dir": p["direction"], "status": p["status"], "conf": p["confidence"],
+                           "from": dates[p["start"]], "to": dates[p["end"]], **p["levels"]}),
+                priority=10 - rank,
+            )
+            for rank, p in enumerate(patterns)
+        ]
+        if not sections:
+            sections.append(Section("none", "no clear pattern detected", priority=10))
+
+        # Recent swing points give the model context without sending raw prices
+        recent = ";".join(f"{k}={price:.2f}@{dates[i]}" for k, i, price in pivots[-6:])
+        sections.append(Section("pivots", recent, priority=0))
+        title = f"PATTERNS {ticker} 6mo/1d last_close={history['Close'].iloc[-1]:.2f}"
+        return encode_sections(title, sections, budget=token_budget("detect_chart_patterns"))
+    except Exception as e:
+        # Error handling for network issues or invalid tickers
+        return f"Error detecting chart patterns for {ticker}: {str(e)}"
@@ -9,6 +9,9 @@ except ImportError:
 
 from langchain_core.tools import tool
 from langchain_community.tools import DuckDuckGoSearchResults
+from .market_data import get_news
+from .encoding import Section, encode_sections, token_budget
+from ..deadline import call_within_budget
 
 @tool
 def search_news(query: str) -> str:
@@ -19,20 +22,18 @@ def search_news(query: str) -> str:
         query (str): A stock ticker symbol (e.g., 'TSM', 'NVDA', 'AAPL').
         
     Returns:
-        str: A string containing titles, links, and summaries of recent news.
+        str: Recent news items (title, link and summary), trimmed to the tool's token budget.
     """
     # Set User-Agent to prevent 403 Forbidden errors when scraping Yahoo Finance
     import os
-    import yfinance as yf
     os.environ["USER_AGENT"] = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
     
     try:
         print(f"DEBUG: Searching Yahoo Finance for '{query}'")
-        ticker = yf.Ticker(query)
-        news = ticker.news
+        news = get_news(query)
         
-        # Format news data for the LLM Analyst agents
-        formatted_results = ""
+        # Format news data for the LLM Analyst agents; later items are trimmed first when over budget
+        sections = []
         if news:
             for item in news:
                 if not item:
@@ -62,7 +63,10 @@ def search_news(query: str) -> str:
                     
                 summary = content.get('summary', 'No Summary')
                 
-                formatted_results += f"Title: {title}\nLink: {link}\nSummary: {summary}\n---\n"
+                sections.append(Section(str(len(sections) + 1), f"{title}\n{link}\n{summary}", priority=-len(sections)))
+        
+        if sections:
+            formatted_results = encode_sections(f"NEWS {query}", sections, budget=token_budget("search_news"))
         else:
             formatted_results = "No news found."
             
@@ -90,7 +94,8 @@ def web_search(query: str) -> str:
         print(f"DEBUG: Performing web search for '{query}'")
         # Utilize the 'news' backend to ensure high relevancy for investment analysis
         search = DuckDuckGoSearchResults(backend="news")
-        results = search.run(query)
+        # DuckDuckGo has no overall timeout; give up when the node's deadline budget runs out
+        results = call_within_budget(search.run, query)
         return results
     except Exception as e:
         print(f"DEBUG: Error in web_search: {e}")
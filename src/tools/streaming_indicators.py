@@ -0,0 +1,319 @@
+import math
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from .indicators import _rsi_from_averages
+
+# Stateful indicators that consume one bar at a time in O(1).
+#
+# Each indicator reproduces its batch counterpart (technical_tools.calculate_rsi /
+# calculate_mtm and the engine in indicators.py) bar for bar, holds at most a
+# fixed-size ring buffer, and can be serialized with `to_dict()` and rebuilt
+# with `restore()`, e.g. to keep intraday state between refreshes. This is a
+# library module: the dashboard's intraday view plots prices only, and its
+# daily technical charts use the batch engine in indicators.py.
+
+
+def _encode(value):
+    """Maps NaN to None so that serialized state is valid JSON."""
+    return None if isinstance(value, float) and math.isnan(value) else value
+
+
+def _decode(value):
+    """Inverse of `_encode`."""
+    return math.nan if value is None else value
+
+
+class RingBuffer:
+    """
+    Fixed-capacity FIFO of floats backed by a NumPy array.
+
+    Args:
+        capacity (int): Number of values retained.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.values = np.full(capacity, np.nan)
+        self.head = 0
+        self.count = 0
+
+    def push(self, value):
+        """
+        Appends a value, overwriting the oldest one once full.
+
+        Returns:
+            Tuple[bool, float]: Whether a value was evicted, and that value.
+        """
+        evicted = self.count == self.capacity
+        old = float(self.values[self.head])
+        self.values[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        return evicted, old
+
+    def to_dict(self):
+        return {
+            "capacity": self.capacity,
+            "values": [_encode(float(v)) for v in self.values],
+            "head": self.head,
+            "count": self.count,
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        buffer = cls(state["capacity"])
+        buffer.values = np.array([_decode(v) for v in state["values"]], dtype=float)
+        buffer.head = state["head"]
+        buffer.count = state["count"]
+        return buffer
+
+
+class StreamingIndicator(ABC):
+    """Base class: `update(value)` consumes one bar and returns the indicator value for that bar."""
+
+    kind = None
+    value = math.nan
+
+    @abstractmethod
+    def update(self, value):
+        """Consumes one bar and returns the indicator value for that bar."""
+
+    def to_dict(self):
+        """Serializes the full state into a JSON-safe dict."""
+        state = {"kind": self.kind}
+        for name, attr in vars(self).items():
+            if isinstance(attr, (RingBuffer, StreamingIndicator)):
+                state[name] = attr.to_dict()
+            else:
+                state[name] = _encode(attr)
+        return state
+
+    @classmethod
+    def from_dict(cls, state):
+        """Rebuilds an indicator serialized with `to_dict()`."""
+        indicator = cls.__new__(cls)
+        for name, attr in state.items():
+            if name == "kind":
+                continue
+            if isinstance(attr, dict) and "capacity" in attr:
+                attr = RingBuffer.from_dict(attr)
+            elif isinstance(attr, dict) and "kind" in attr:
+                attr = restore(attr)
+            else:
+                attr = _decode(attr)
+            setattr(indicator, name, attr)
+        return indicator
+
+
+class StreamingSMA(StreamingIndicator):
+    """
+    Simple moving average with `min_periods=window`; NaN while any bar in the window is NaN.
+
+    The running sum uses Kahan compensation so that it does not drift away from
+    the batch result over long intraday sessions, and is reset to exactly zero
+    whenever the window holds only zeros (e.g. RSI gains in a falling market).
+    """
+
+    kind = "sma"
+
+    def __init__(self, window):
+        self.window = window
+        self.buffer = RingBuffer(window)
+        self.total = 0.0
+        self.compensation = 0.0
+        self.missing = 0
+        self.nonzero = 0
+        self.value = math.nan
+
+    def _add(self, x):
+        y = x - self.compensation
+        t = self.total + y
+        self.compensation = (t - self.total) - y
+        self.total = t
+
+    def update(self, value):
+        value = float(value)
+        evicted, old = self.buffer.push(value)
+        if math.isnan(value):
+            self.missing += 1
+        else:
+            self._add(value)
+            self.nonzero += value != 0
+        if evicted:
+            if math.isnan(old):
+                self.missing -= 1
+            else:
+                self._add(-old)
+                self.nonzero -= old != 0
+        if not self.nonzero:
+            self.total = self.compensation = 0.0
+        full = self.buffer.count == self.window
+        self.value = self.total / self.window if full and not self.missing else math.nan
+        return self.value
+
+
+class StreamingMTM(StreamingIndicator):
+    """Momentum: Close(t) - Close(t - window), from a ring buffer of the last `window` closes."""
+
+    kind = "mtm"
+
+    def __init__(self, window=10):
+        self.window = window
+        self.buffer = RingBuffer(window)
+        self.value = math.nan
+
+    def update(self, value):
+        evicted, old = self.buffer.push(float(value))
+        self.value = float(value) - old if evicted else math.nan
+        return self.value
+
+
+class StreamingEMA(StreamingIndicator):
+    """Exponential moving average (`ewm(span, adjust=False, ignore_na=True)`), matching `indicators.ema`."""
+
+    kind = "ema"
+
+    def __init__(self, span):
+        self.span = span
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = math.nan
+
+    def update(self, value):
+        value = float(value)
+        if math.isnan(self.value):
+            self.value = value
+        elif not math.isnan(value):
+            self.value = self.alpha * value + (1 - self.alpha) * self.value
+        return self.value
+
+
+class StreamingRSI(StreamingIndicator):
+    """
+    Relative Strength Index updated one close at a time.
+
+    Args:
+        window (int): Lookback period.
+        method (str): 'sma' reproduces `technical_tools.calculate_rsi` (simple
+            rolling averages); 'wilder' reproduces `indicators.wilder_rsi`.
+    """
+
+    kind = "rsi"
+
+    def __init__(self, window=14, method="sma"):
+        if method not in ("sma", "wilder"):
+            raise ValueError(f"Unsupported RSI method: {method}")
+        self.window = window
+        self.method = method
+        self.prev_close = math.nan
+        self.value = math.nan
+        if method == "sma":
+            self.gains = StreamingSMA(window)
+            self.losses = StreamingSMA(window)
+        else:
+            self.seen = 0
+            self.avg_gain = 0.0
+            self.avg_loss = 0.0
+
+    def update(self, value):
+        value = float(value)
+        delta = value - self.prev_close
+        self.prev_close = value
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+
+        if self.method == "sma":
+            avg_gain = self.gains.update(gain)
+            avg_loss = self.losses.update(loss)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                term = 100.0 / (1.0 + np.float64(avg_gain) / np.float64(avg_loss))
+            self.value = 100.0 - (float(term) if np.isfinite(term) else 100.0)
+            return self.value
+
+        if math.isnan(delta):
+            self.value = math.nan
+            return self.value
+        self.seen += 1
+        w = self.window
+        if self.seen <= w:
+            self.avg_gain = self.avg_gain + gain / w
+            self.avg_loss = self.avg_loss + loss / w
+        else:
+            self.avg_gain = (self.avg_gain * (w - 1) + gain) / w
+            self.avg_loss = (self.avg_loss * (w - 1) + loss) / w
+        if self.seen < w:
+            self.value = math.nan
+        else:
+            self.value = float(_rsi_from_averages(np.float64(self.avg_gain), np.float64(self.avg_loss)))
+        return self.value
+
+
+class StreamingMACD(StreamingIndicator):
+    """MACD line, signal line and histogram, matching `indicators.macd`; `value` is the histogram."""
+
+    kind = "macd"
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = StreamingEMA(fast)
+        self.slow = StreamingEMA(slow)
+        self.signal = StreamingEMA(signal)
+        self.line = math.nan
+        self.signal_line = math.nan
+        self.value = math.nan
+
+    def update(self, value):
+        self.line = self.fast.update(value) - self.slow.update(value)
+        self.signal_line = self.signal.update(self.line)
+        self.value = self.line - self.signal_line
+        return self.value
+
+
+_KINDS = {cls.kind: cls for cls in (StreamingSMA, StreamingMTM, StreamingEMA, StreamingRSI, StreamingMACD)}
+
+
+def restore(state):
+    """Rebuilds any streaming indicator from the dict produced by its `to_dict()`."""
+    return _KINDS[state["kind"]].from_dict(state)
+
+
+class StreamingIndicatorSet:
+    """
+    A named group of streaming indicators fed from the same bar series.
+
+    Bars at or before the last consumed timestamp are ignored, so a refresh can
+    pass the whole intraday frame and only the new bars cost any work.
+
+    Args:
+        indicators (Dict[str, StreamingIndicator]): Indicators keyed by output name (e.g. 'RSI_14').
+    """
+
+    def __init__(self, indicators):
+        self.indicators = indicators
+        self.last_ts = None
+
+    def update(self, ts, close):
+        """Consumes one bar; returns the latest values, or None if the bar was already seen."""
+        if self.last_ts is not None and ts <= self.last_ts:
+            return None
+        self.last_ts = ts
+        return {name: ind.update(close) for name, ind in self.indicators.items()}
+
+    def update_frame(self, history):
+        """Consumes the unseen rows of an OHLCV DataFrame; returns the latest values."""
+        for ts, close in zip(history.index.as_unit("ns").asi8, history["Close"].to_numpy(dtype=float)):
+            self.update(int(ts), close)
+        return self.values()
+
+    def values(self):
+        """Current value of every indicator."""
+        return {name: ind.value for name, ind in self.indicators.items()}
+
+    def to_dict(self):
+        return {"last_ts": self.last_ts, "indicators": {n: ind.to_dict() for n, ind in self.indicators.items()}}
+
+    @classmethod
+    def from_dict(cls, state):
+        indicator_set = cls({n: restore(s) for n, s in state["indicators"].items()})
+        indicator_set.last_ts = state["last_ts"]
+        return indicator_set
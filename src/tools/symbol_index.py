@@ -0,0 +1,167 @@
+import os
+import re
+
+# Local ticker / company-name index used by the router's fast path.
+#
+# Tickers, English company names and Chinese names are loaded from a compact
+# bundled file. Names go into a trie keyed by the case-folded name, and a single
+# left-to-right scan of the query takes the longest match at each position, so
+# "美超微" wins over "超微". Chinese names need no word boundaries, while Latin
+# names must stand alone. Names that are also ordinary words are marked with
+# EXACT_PREFIX in the file ('=Visa') and go into a second, case-sensitive trie,
+# so "visa" or "meta" in a sentence is not a mention. Symbols are matched as
+# standalone uppercase tokens.
+
+SYMBOLS_FILE = os.path.join(os.path.dirname(__file__), "symbols.tsv")
+
+# Uppercase words that are finance jargon rather than tickers (matched only as '$WORD')
+STOPWORDS = {
+    "A", "I", "AI", "US", "USA", "UK", "EU", "CEO", "CFO", "CTO", "IPO", "ETF", "ADR", "EPS", "PE", "PB", "PEG",
+    "ROE", "ROA", "ROI", "EV", "EBIT", "EBITDA", "FCF", "TTM", "YOY", "QOQ", "YTD", "ATH", "GDP", "CPI", "PPI",
+    "FED", "FOMC", "RSI", "MACD", "KD", "MA", "SMA", "EMA", "ATR", "MTM", "OBV", "VWAP", "BB", "Q1", "Q2", "Q3",
+    "Q4", "H1", "H2", "FY", "OK", "VS", "AND", "OR", "THE", "IS", "IT", "ON", "ALL", "NOW", "ARE", "BUY",
+    "SELL", "HOLD", "API", "GPU", "CPU", "HBM", "DRAM", "NAND", "EUV", "HPC", "COWOS", "TW", "TWSE",
+}
+
+# Marks a name matched case-sensitively only
+EXACT_PREFIX = "="
+
+_END = "\0"
+_LATIN = re.compile(r"[A-Za-z0-9]")
+# Uppercase tokens that look like tickers ('$' forces a symbol lookup)
+_SYMBOL_TOKEN = re.compile(r"(?<![A-Za-z0-9$])(\$?)([A-Z][A-Z0-9]{0,5}(?:[.-][A-Z]{1,2})?)(?![A-Za-z0-9])")
+
+
+class _Trie:
+    """Prefix tree mapping strings to sets of tickers."""
+
+    def __init__(self):
+        self.root = {}
+
+    def insert(self, key, ticker):
+        node = self.root
+        for char in key:
+            node = node.setdefault(char, {})
+        node.setdefault(_END, set()).add(ticker)
+
+    def longest_match(self, text, start, boundary):
+        """
+        Longest key starting at `start` whose end satisfies `boundary(end, key_end_char)`.
+
+        Returns:
+            Tuple[int, Set[str]] | None: End offset and tickers of the match.
+        """
+        node = self.root
+        best = None
+        for end in range(start, len(text)):
+            node = node.get(text[end])
+            if node is None:
+                break
+            if _END in node and boundary(end + 1, text[end]):
+                best = (end + 1, node[_END])
+        return best
+
+
+class SymbolIndex:
+    """
+    Resolves tickers mentioned in a query by symbol, English name or Chinese name.
+
+    Args:
+        entries (Iterable[Tuple[str, List[str]]]): (ticker, names) pairs; names
+            starting with EXACT_PREFIX are matched case-sensitively.
+    """
+
+    def __init__(self, entries):
+        self.names = _Trie()
+        self.exact_names = _Trie()
+        self.tickers = set()
+        for ticker, names in entries:
+            self.tickers.add(ticker)
+            for name in names:
+                if name.startswith(EXACT_PREFIX):
+                    self.exact_names.insert(name[len(EXACT_PREFIX):], ticker)
+                else:
+                    self.names.insert(name.casefold(), ticker)
+
+    @classmethod
+    def load(cls, path=SYMBOLS_FILE):
+        """Builds the index from a 'ticker<TAB>name|name|...' file ('#' starts a comment)."""
+        entries = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                ticker, _, names = line.partition("\t")
+                entries.append((ticker.strip(), [n.strip() for n in names.split("|") if n.strip()]))
+        return cls(entries)
+
+    def resolve(self, query):
+        """
+        Finds every ticker mentioned in a query.
+
+        Returns:
+            Tuple[List[str], List[str]]: Tickers in order of first mention, and
+            unresolved mentions (names matching several tickers, or ticker-like
+            uppercase words missing from the index).
+        """
+        folded = query.casefold()
+        # casefold can change lengths (e.g. 'ß'); offsets are only safe when it does not
+        if len(folded) != len(query):
+            folded = query
+
+        def latin_boundary(end, last_char):
+            # Latin keys must end on a word boundary; CJK keys may run into the next word
+            return not _LATIN.match(last_char) or end == len(query) or not _LATIN.match(query[end])
+
+        hits = []
+        unresolved = []
+        covered = set()
+        i = 0
+        while i < len(query):
+            # Latin names only start at a word boundary
+            if _LATIN.match(query[i]) and i > 0 and _LATIN.match(query[i - 1]):
+                i += 1
+                continue
+            matches = [
+                match for match in (
+                    self.names.longest_match(folded, i, latin_boundary),
+                    self.exact_names.longest_match(query, i, latin_boundary),
+                ) if match is not None
+            ]
+            if not matches:
+                i += 1
+                continue
+            end, tickers = max(matches, key=lambda match: match[0])
+            if len(tickers) == 1:
+                hits.append((i, next(iter(tickers))))
+            else:
+                unresolved.append(query[i:end])
+            covered.update(range(i, end))
+            i = end
+
+        for m in _SYMBOL_TOKEN.finditer(query):
+            if m.start(2) in covered:
+                continue
+            forced, token = m.group(1), m.group(2)
+            if token in self.tickers and (forced or (len(token) > 1 and token not in STOPWORDS)):
+                hits.append((m.start(2), token))
+            elif forced or (len(token) > 1 and token not in STOPWORDS and token.isalpha()):
+                unresolved.append(token)
+
+        tickers = []
+        for _, ticker in sorted(hits):
+            if ticker not in tickers:
+                tickers.append(ticker)
+        return tickers, unresolved
+
+
+_index = None
+
+
+def get_symbol_index():
+    """Returns the process-wide index loaded from the bundled symbols file."""
+    global _index
+    if _index is None:
+        _index = SymbolIndex.load()
+    return _index
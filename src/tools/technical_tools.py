@@ -1,7 +1,15 @@
 from langchain_core.tools import tool
-import yfinance as yf
 import pandas as pd
 import numpy as np
+from .market_data import get_history
+from .indicators import compute_indicators
+from .encoding import Section, encode_kv, encode_sections, encode_table, token_budget
+
+# Indicators reported by `get_technical_data`, computed together in one registry pass
+TECHNICAL_REPORT_SPECS = [
+    "SMA(20)", "SMA(50)", "RSI(14)", "MTM(10)",
+    "MACD(12,26,9)", "BBANDS(20,2)", "STOCH(14,3)", "ATR(14)",
+]
 
 def calculate_rsi(df, window=14):
     """
@@ -37,32 +45,31 @@ def get_technical_data(ticker: str) -> str:
     """
     Retrieves and calculates technical indicators for a given stock ticker.
     
-    Includes SMA_20, SMA_50, RSI_14, MTM_10, and key support/resistance 
-    levels for the last 6 months.
+    Includes SMA_20, SMA_50, RSI_14, MTM_10, MACD (12,26,9), Bollinger Bands (20,2),
+    Stochastic (14,3), ATR_14, and key support/resistance levels for the last 6 months.
     
     Args:
         ticker (str): The stock ticker symbol (e.g., 'TSM', 'NVDA').
         
     Returns:
-        str: A formatted technical report string for agent consumption.
+        str: A compact technical report (key=value lines and a CSV price tail) for agent consumption.
     """
     try:
-        # Fetch 6 months of daily historical data
-        stock = yf.Ticker(ticker)
-        history = stock.history(period="6mo", interval="1d")
+        # Fetch 6 months of daily historical data (shared across the trend, pattern and indicator analysts)
+        history = get_history(ticker, period="6mo", interval="1d")
         
         if history.empty:
             return f"No historical price data found for {ticker} for technical analysis."
             
         df = history.copy()
         
-        # Calculate Moving Averages
-        df['SMA_20'] = df['Close'].rolling(window=20).mean()
-        df['SMA_50'] = df['Close'].rolling(window=50).mean()
-        
-        # Calculate Oscillators and Momentum indicators
-        df['RSI_14'] = calculate_rsi(df, window=14)
-        df['MTM_10'] = calculate_mtm(df, window=10)
+        # Calculate Moving Averages, Oscillators, Momentum and Volatility in one registry pass
+        results = compute_indicators(
+            TECHNICAL_REPORT_SPECS,
+            df['Close'].to_numpy(), high=df['High'].to_numpy(), low=df['Low'].to_numpy(),
+        )
+        for name, values in results.items():
+            df[name] = values[0]
         
         # Identify Key Price Levels based on a 90-day lookback period
         recent_data = df['Close'].tail(90)
@@ -72,24 +79,14 @@ def get_technical_data(ticker: str) -> str:
         # Get the most recent data point for the report
         latest = df.iloc[-1]
         
-        # Construct the structured technical report
-        output = f"""
-        TECHNICAL DATA for {ticker}:
-        --- Latest Metrics ---
-        Close: {latest['Close']:.2f}
-        SMA_20: {latest['SMA_20']:.2f}
-        SMA_50: {latest['SMA_50']:.2f}
-        RSI_14: {latest['RSI_14']:.2f}
-        MTM_10: {latest['MTM_10']:.2f}
-        
-        --- Key Price Levels (90-Day) ---
-        Resistance: {resistance:.2f}
-        Support: {support:.2f}
-        
-        --- Price History (Last 5 Days) ---
-        {df['Close'].tail(5).to_string()}
-        """
-        return output
+        # Construct the compact technical report; the price tail is trimmed first when over budget
+        metrics = ["Close"] + list(results)
+        sections = [
+            Section("latest", encode_kv({name: latest[name] for name in metrics}), priority=5),
+            Section("levels_90d", encode_kv({"resistance": resistance, "support": support}), priority=4),
+            Section("close_5d", encode_table(df[['Close']].tail(5), "date"), priority=1),
+        ]
+        return encode_sections(f"TECHNICAL {ticker}", sections, budget=token_budget("get_technical_data"))
     except Exception as e:
         # Error handling for network issues or invalid tickers
         return f"Error fetching technical data for {ticker}: {str(e)}"
\ No newline at end of file
@@ -1,15 +1,23 @@
 import streamlit as st
 import requests
-import yfinance as yf
+import pandas as pd
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import re
 import numpy as np
 from plotly.subplots import make_subplots
 import os
+import sys
 import json
+import time
 import streamlit.components.v1 as components
 
+# 讓 `streamlit run src/ui/app.py` 也能 import 專案內的 src 套件
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.tools.market_data import get_info, get_history
+from src.tools import indicators
+
 # 1. 設定 & 樣式
 st.set_page_config(
     page_title="AI Investment Analyst",
@@ -247,6 +255,102 @@ def get_mock_data():
         st.error(f"找不到檔案：{MOCK_FILE_PATH} (請確認檔案位於正確路徑)")
         return None
 
+# 3. API 串流設定
+API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
+API_CONNECT_TIMEOUT = 10                                         # 建立連線的逾時 (秒)
+API_READ_TIMEOUT = float(os.getenv("API_READ_TIMEOUT", "300"))   # 兩個事件之間允許的最長空檔 (秒)
+API_TOTAL_TIMEOUT = float(os.getenv("API_TOTAL_TIMEOUT", "900")) # 整體分析的最長時間 (秒)
+
+# 節點 -> (進度文字, State 欄位, 段落標題)
+STREAM_SECTIONS = {
+    "router": ("研究主管已完成任務分派", None, None),
+    "research_cache": ("研究快取已查詢", None, None),
+    "prefetch": ("市場數據已預先載入", None, None),
+    "data_analyst": ("數據分析完成", "data_analysis", "📊 數據分析 (Numbers)"),
+    "news_analyst": ("新聞分析完成", "news_analysis", "📰 新聞摘要 (Narrative)"),
+    "trend_analyst": ("趨勢分析完成", "trend_analysis", "▶️ 趨勢分析 (Trend Analysis)"),
+    "pattern_analyst": ("型態觀察完成", "pattern_analysis", "▶️ 型態觀察 (Chart Patterns)"),
+    "indicator_analyst": ("動能指標分析完成", "indicator_analysis", "▶️ 動能指標 (Momentum Indicators)"),
+    "technical_strategist": ("技術策略總結完成", "technical_strategy", "📈 技術策略總結"),
+    "technical_analyst": ("技術分析完成 (趨勢、型態、動能與策略)", None, None),
+    "risk_manager": ("風險官評估報告已生成", "risk_assessment", "⚠️ 風險評估"),
+    "editor": ("最終投資報告已生成", "final_report", None),
+}
+
+# 合併節點一次產出多個段落，依序以原節點的標題顯示
+COMBINED_SECTIONS = {
+    "research_cache": ("data_analyst", "news_analyst", "trend_analyst", "pattern_analyst", "indicator_analyst", "technical_strategist"),
+    "technical_analyst": ("trend_analyst", "pattern_analyst", "indicator_analyst", "technical_strategist"),
+}
+
+def stream_research(payload):
+    """呼叫 /research/stream，逐一產生 (event, data)；超過讀取或整體時限會拋出例外。"""
+    deadline = time.monotonic() + API_TOTAL_TIMEOUT
+    with requests.post(
+        f"{API_BASE_URL}/research/stream", json=payload, stream=True,
+        timeout=(API_CONNECT_TIMEOUT, API_READ_TIMEOUT),
+    ) as response:
+        response.raise_for_status()
+        event = "message"
+        # SSE 固定為 UTF-8，自行解碼以免中文被當成 ISO-8859-1
+        for raw in response.iter_lines():
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"分析超過 {API_TOTAL_TIMEOUT:.0f} 秒仍未完成")
+            line = raw.decode("utf-8")
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                yield event, json.loads(line[len("data:"):].strip())
+                event = "message"
+
+def render_research_stream(payload, status, live_area):
+    """
+    消費串流事件並漸進式渲染：
+    - 每個節點完成即更新進度，並在 live_area 顯示該段分析
+    - 編輯的報告逐字顯示
+    回傳最終結果 (與 /research 相同格式)。
+    """
+    report_box = None
+    report_text = ""
+    for event, data in stream_research(payload):
+        if event == "node":
+            node = data["node"]; update = data.get("update") or {}
+            label, key, title = STREAM_SECTIONS.get(node, (node, None, None))
+            status.write(f"✅ {label}")
+            status.update(label=f"{label}，其他代理人仍在分析中...")
+            if node == "router" and update.get("tickers"):
+                status.write(f"🎯 分析標的: {', '.join(update['tickers'])}")
+            if node == "research_cache" and update.get("evidence_cached"):
+                status.write("♻️ 沿用同一問題今日的研究證據，僅依投資風格重新評估風險與撰寫報告")
+            for section in COMBINED_SECTIONS.get(node, ()):
+                _, section_key, section_title = STREAM_SECTIONS[section]
+                if update.get(section_key):
+                    with live_area.expander(section_title, expanded=False):
+                        render_sections_markdown(update[section_key])
+            if title and update.get(key):
+                with live_area.expander(title, expanded=False):
+                    render_sections_markdown(update[key])
+            elif node == "editor" and update.get(key):
+                if report_box is None:
+                    live_area.markdown("### 💡 最終投資建議")
+                    report_box = live_area.empty()
+                report_box.markdown(extract_text_from_content(update[key]))
+        elif event == "token":
+            if report_box is None:
+                live_area.markdown("### 💡 最終投資建議")
+                report_box = live_area.empty()
+            report_text += data["text"]
+            report_box.markdown(report_text)
+        elif event == "error":
+            detail = data.get("detail", "未知錯誤")
+            if data.get("run_id"):
+                # Completed nodes are checkpointed; the run can be continued from the API
+                detail += f"（run_id: {data['run_id']}，可透過 POST /research/{data['run_id']}/resume 續跑）"
+            raise RuntimeError(detail)
+        elif event == "done":
+            return data
+    return None
+
 # ---------------------------------------------------------
 # Helper: 內容抽取 + 標題偵測 + Markdown 渲染
 # ---------------------------------------------------------
@@ -363,8 +467,7 @@ def render_sections_markdown(raw_text: str, heading_level: int = 3):
 @st.cache_data(ttl=3600)
 def get_stock_data(ticker, period="1d"):
     try:
-        stock = yf.Ticker(ticker)
-        info = stock.info
+        info = get_info(ticker)
         
         interval = "1d"
         if period == "1d":
@@ -374,9 +477,9 @@ def get_stock_data(ticker, period="1d"):
         elif period in ["1mo", "3mo"]:
             interval = "1h"
             
-        history = stock.history(period=period, interval=interval)
+        history = get_history(ticker, period=period, interval=interval)
         if history.empty and period == "1d":
-            history = stock.history(period="1d", interval="15m")
+            history = get_history(ticker, period="1d", interval="15m")
         return info, history
     except Exception:
         return None, None
@@ -385,22 +488,23 @@ def get_stock_data(ticker, period="1d"):
 def get_ta_base_data(ticker):
     """Fetch 2 years (or max) of daily data for technical analysis to ensure sufficient lookback."""
     # Fetch 2 years for sufficient lookback (e.g., MA200)
+    # Empty frame with the usual OHLCV columns, built locally instead of via a network call
+    empty = pd.DataFrame(columns=["Open", "High", "Low", "Close", "Volume"], index=pd.DatetimeIndex([]))
     try:
-        stock = yf.Ticker(ticker)
-        history = stock.history(period="2y", interval="1d") 
+        history = get_history(ticker, period="2y", interval="1d")
         
         # If 2 years of data is unavailable, fall back to max available data
         if history.empty or len(history) < 200: 
-            history = stock.history(period="max", interval="1d")
+            history = get_history(ticker, period="max", interval="1d")
             
         # Return an empty DataFrame structure if fetching still fails
         if history.empty:
-            return yf.Ticker("AAPL").history(period="1d").head(0)
+            return empty
             
         return history
     except Exception:
         # Return an empty DataFrame structure for safety
-        return yf.Ticker("AAPL").history(period="1d").head(0)
+        return empty
 
 def plot_stock_chart(history, ticker, chart_type='line'):
     if history.empty:
@@ -561,25 +665,15 @@ def format_large_number(num):
         return f"{num/1_000_000:.2f}百萬"
     return f"{num:,.2f}"
 
-def calculate_sma(history, window):
-    """Calculates Simple Moving Average on the Close price."""
-    return history['Close'].rolling(window=window).mean()
-
-def calculate_rsi(df, window=14):
-    """Calculate Relative Strength Index (RSI)"""
-    delta = df['Close'].diff()
-    gain = (delta.where(delta > 0, 0)).fillna(0)
-    loss = (-delta.where(delta < 0, 0)).fillna(0)
-    avg_gain = gain.rolling(window=window, min_periods=window).mean()
-    avg_loss = loss.rolling(window=window, min_periods=window).mean()
-    rs = avg_gain / avg_loss
-    # 使用 .replace 處理除以零導致的 inf 值
-    rsi = 100 - (100 / (1 + rs)).replace([np.inf, -np.inf], np.nan).fillna(100) 
-    return rsi
-
-def calculate_mtm(df, window=10):
-    """Calculates Momentum Index (MTM)"""
-    return df['Close'].diff(window)
+# Indicators charted in the technical section, computed together in one registry pass
+CHART_INDICATOR_SPECS = ["SMA(20)", "SMA(50)", "RSI(14)", "MTM(10)", "MACD(12,26,9)"]
+
+def calculate_indicators(history, specs=CHART_INDICATOR_SPECS):
+    """Computes the requested indicator specs (e.g. 'SMA(20)', 'RSI(14)') as Series aligned to the history."""
+    results = indicators.compute_indicators(
+        specs, history['Close'], high=history['High'], low=history['Low'], volume=history['Volume']
+    )
+    return {name: pd.Series(values[0], index=history.index) for name, values in results.items()}
 
 def plot_technical_analysis(history, ticker, price_lines=None, indicator_list=None, title="技術分析"):
     """
@@ -674,8 +768,8 @@ def plot_technical_analysis(history, ticker, price_lines=None, indicator_list=No
             fig.add_hline(y=30, line_dash="dash", line_color="#81c995", opacity=0.8, row=row_index, col=1, annotation_text="超賣 (30)", annotation_position="bottom left", annotation_font_color="#81c995")
             fig.update_yaxes(range=[0, 100], row=row_index, col=1) # Standard RSI range
 
-        # Add horizontal line for MTM zero axis
-        elif indicator_data.get("type") == "MTM":
+        # Add horizontal line for the MTM / MACD zero axis
+        elif indicator_data.get("type") in ("MTM", "MACD"):
             fig.add_hline(y=0, line_dash="dash", line_color="#9aa0a6", opacity=0.8, row=row_index, col=1)
             
         # Set Y-axis title dynamically
@@ -843,6 +937,10 @@ with c_hint:
         unsafe_allow_html=True
     )
 
+with c_space:
+    quick_technical = st.toggle("⚡ 快速技術分析", help="以單一代理人一次完成趨勢、型態、動能與策略分析，縮短等待時間")
+    per_ticker = st.toggle("🔀 逐檔平行分析", help="多檔股票時，每位分析師為每檔股票各自平行分析，比較多檔股票時等待時間接近單檔")
+
 with c_btn:
     start_analysis = st.button("🚀 開始分析", type="primary", use_container_width=True)
 
@@ -853,35 +951,40 @@ if start_analysis:
     if not query:
         st.warning("請輸入問題")
     else:
-        with st.status("代理人團隊正在啟動...", expanded=True) as status:
+        status = st.status("代理人團隊正在啟動...", expanded=True)
+        # 各代理人的分析結果在完成當下即顯示於此
+        live_area = st.container()
+        with status:
             st.write("🔍 正在檢索市場數據與相關新聞...")
             
             payload = {"query": query, "style": selected_style}
+            if quick_technical:
+                payload["technical_mode"] = "consolidated"
+            if per_ticker:
+                payload["fanout"] = "per_ticker"
             response_json = None
-            status_code = 500
+            error_msg = "無法讀取數據"
 
             try:
                 if USE_MOCK_DATA:
-                    import time; time.sleep(1) 
+                    time.sleep(1) 
                     st.write("🤖 正在調用大型語言模型進行推論...")
                     time.sleep(1)
-                    mock_data = get_mock_data()
-                    if mock_data:
-                        response_json = mock_data; status_code = 200
+                    response_json = get_mock_data()
+                    if response_json:
+                        st.write("✅ 數據檢索與清洗完成")
+                        st.write("✅ 技術指標運算完畢 (RSI, MACD, MA)")
+                        st.write("✅ 風險官評估報告已生成")
                 else:
                     st.write("⏳ 正在進行深度多面向分析 (技術面/基本面/風險)...")
                     try:
-                        response = requests.post("http://localhost:8000/research", json=payload)
-                        status_code = response.status_code
-                        if status_code == 200: response_json = response.json()
+                        response_json = render_research_stream(payload, status, live_area)
+                    except requests.exceptions.Timeout:
+                        error_msg = f"API 回應逾時 (超過 {API_READ_TIMEOUT:.0f} 秒沒有新進度)"
                     except Exception as e_req:
-                        st.error(f"API 連線失敗: {str(e_req)}")
+                        error_msg = f"API 連線失敗: {str(e_req)}"
 
-                if status_code == 200 and response_json:
-                    st.write("✅ 數據檢索與清洗完成")
-                    st.write("✅ 技術指標運算完畢 (RSI, MACD, MA)")
-                    st.write("✅ 風險官評估報告已生成")
-                    
+                if response_json:
                     st.session_state.research_result = response_json
                     status.update(label="分析完成！報告已生成", state="complete", expanded=False)
                     
@@ -891,7 +994,6 @@ if start_analysis:
                     st.rerun()
                     
                 else:
-                    error_msg = response.text if not USE_MOCK_DATA and 'response' in locals() else "無法讀取數據"
                     st.error(f"分析過程發生錯誤: {error_msg}")
                     status.update(label="分析失敗", state="error", expanded=True)
                     
@@ -908,8 +1010,7 @@ if 'research_result' in st.session_state:
     
     stock_info = {}; history_1mo = None
     if selected_ticker:
-        stock = yf.Ticker(selected_ticker)
-        stock_info = stock.info
+        stock_info = get_info(selected_ticker)
 
     st.markdown("---")
     
@@ -993,24 +1094,32 @@ if 'research_result' in st.session_state:
     # =========================================================
     with st.expander(f"📝 AI 投資報告 - {selected_ticker if selected_ticker else ''}", expanded=True):
         
+        # 超過時限的代理人回傳標記為 [TIMEOUT] 的部分結果
+        if result.get("timeouts"):
+            st.warning(f"⏱️ 以下分析未在時限內完成，報告僅根據已完成的部分撰寫: {', '.join(result['timeouts'])}")
+        # 同一問題換投資風格時，沿用快取的研究證據
+        if result.get("evidence_cached"):
+            st.info("♻️ 本報告沿用同一問題今日的研究證據，僅依所選投資風格重新評估風險與撰寫報告")
+        
         if report_section == "📊 總覽 (Summary)":
             st.markdown("### 💡 最終投資建議")
             render_sections_markdown(result.get("final_report", ""))
             st.markdown("---")
             st.markdown("### ⚠️ 風險評估")
-            raw_risk = extract_text_from_content(result.get("risk_assessment", "無風險評估內容"))
+            raw_risk = extract_text_from_content((result.get("risk_assessment") or "無風險評估內容"))
             garbage = ["作為首席風險官，我的職責是扮演「魔鬼代言人」，專注於識別潛在的下行風險，特別是那些可能被市場普遍樂觀情緒所忽略的方面。針對您「最近微軟可以買嗎」的提問，我的評估如下：", "作為首席風險官，", "身為風險評估員，", "以下是我的風險評估："]
             for p in garbage: raw_risk = raw_risk.replace(p, "")
             render_sections_markdown(raw_risk.strip())
 
         elif report_section == "📈 技術面 (Technical)":
-            st.info(extract_text_from_content(result.get("technical_strategy", "暫無技術策略總結")))
+            st.info(extract_text_from_content((result.get("technical_strategy") or "暫無技術策略總結")))
             if selected_ticker:
                 history_full = get_ta_base_data(selected_ticker)
                 has_data = not history_full.empty
+                chart_ind = calculate_indicators(history_full) if has_data else {}
                 with st.expander("▶️ 趨勢分析 (Trend Analysis)", expanded=False):
                     if has_data:
-                        ma20 = calculate_sma(history_full, 20); ma50 = calculate_sma(history_full, 50)
+                        ma20 = chart_ind["SMA_20"]; ma50 = chart_ind["SMA_50"]
                         one_year_ago = datetime.now() - timedelta(days=365)
                         hist_plot = history_full[history_full.index >= one_year_ago.strftime('%Y-%m-%d')]; 
                         if hist_plot.empty: hist_plot = history_full
@@ -1018,21 +1127,21 @@ if 'research_result' in st.session_state:
                     render_sections_markdown(result.get("trend_analysis", ""))
                 with st.expander("▶️ 型態觀察 (Chart Patterns)", expanded=False):
                     if has_data:
-                        ma50 = calculate_sma(history_full, 50)
+                        ma50 = chart_ind["SMA_50"]
                         st.plotly_chart(plot_technical_analysis(hist_plot, selected_ticker, price_lines=[(ma50, "MA50", "#FF5722")], title="型態觀察"), use_container_width=True, config={'displayModeBar': False})
                     render_sections_markdown(result.get("pattern_analysis", ""))
                 with st.expander("▶️ 動能指標 (Momentum Indicators)", expanded=False):
                     if has_data:
-                        rsi14 = calculate_rsi(history_full, 14); mtm10 = calculate_mtm(history_full, 10)
-                        indicator_list = [{"series": rsi14, "name": "RSI (14)", "color": "#FFC107", "type": "RSI"}, {"series": mtm10, "name": "MTM (10)", "color": "#4285F4", "type": "MTM"}]
+                        rsi14 = chart_ind["RSI_14"]; mtm10 = chart_ind["MTM_10"]; macd_hist = chart_ind["MACD_HIST"]
+                        indicator_list = [{"series": rsi14, "name": "RSI (14)", "color": "#FFC107", "type": "RSI"}, {"series": mtm10, "name": "MTM (10)", "color": "#4285F4", "type": "MTM"}, {"series": macd_hist, "name": "MACD Hist (12,26,9)", "color": "#AB47BC", "type": "MACD"}]
                         st.plotly_chart(plot_technical_analysis(hist_plot, selected_ticker, indicator_list=indicator_list, title="動能指標"), use_container_width=True, config={'displayModeBar': False})
                     render_sections_markdown(result.get("indicator_analysis", ""))
             else: st.warning("未識別股票代號。")
 
         elif report_section == "📰 基本面 (Fundamental)":
-            with st.expander("📊 數據分析 (Numbers)", expanded=False): render_sections_markdown(result.get("data_analysis", "暫無數據分析"))
+            with st.expander("📊 數據分析 (Numbers)", expanded=False): render_sections_markdown((result.get("data_analysis") or "暫無數據分析"))
             with st.expander("📰 新聞摘要 (Narrative)", expanded=True): 
-                raw_news = extract_text_from_content(result.get("news_analysis", "暫無新聞分析"))
+                raw_news = extract_text_from_content((result.get("news_analysis") or "暫無新聞分析"))
                 
                 # --- 遇到 "新聞連結 (新聞連結)" 就直接切斷後面的內容 ---
                 # 這裡設定幾個可能的標題變體以防 Markdown 格式不同
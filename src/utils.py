@@ -1,30 +1,248 @@
+import asyncio
+import json
 import os
+import threading
+from functools import lru_cache
+import httpx
 from langchain_openai import ChatOpenAI
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_groq import ChatGroq
+from .llm_cache import get_response_cache
+from .deadline import AsyncDeadlineTransport, DeadlineTransport
+from .llm_scheduler import AsyncSchedulingTransport, SchedulerRateLimiter, SchedulingTransport, scheduler_enabled
 
-def get_llm(temperature=0):
+# Default model per provider when LLM_MODEL is not set
+DEFAULT_MODELS = {
+    "google": "gemini-2.5-flash",
+    "openai": "gpt-5-mini",
+    "groq": "openai/gpt-oss-120b",
+}
+
+# Models of the smaller/faster and stronger tiers per provider ('default' is the model above)
+MODEL_TIERS = {
+    "google": {"fast": "gemini-2.5-flash-lite", "strong": "gemini-2.5-pro"},
+    "openai": {"fast": "gpt-5-nano", "strong": "gpt-5"},
+    "groq": {"fast": "openai/gpt-oss-20b", "strong": "openai/gpt-oss-120b"},
+}
+
+# Tier, completion budget (tokens) and request timeout (seconds) per graph role.
+# Extraction and single-indicator summaries run on the fast tier; the risk
+# review and the final memo, which weigh every other report, on the strong tier.
+ROLE_SETTINGS = {
+    "router": {"tier": "fast", "max_tokens": 2048, "timeout": 60},
+    "trend_analyst": {"tier": "fast", "max_tokens": 4096, "timeout": 90},
+    "pattern_analyst": {"tier": "fast", "max_tokens": 4096, "timeout": 90},
+    "indicator_analyst": {"tier": "fast", "max_tokens": 4096, "timeout": 90},
+    "data_analyst": {"tier": "default", "max_tokens": 6144, "timeout": 120},
+    "news_analyst": {"tier": "default", "max_tokens": 6144, "timeout": 120},
+    "technical_strategist": {"tier": "default", "max_tokens": 4096, "timeout": 120},
+    "technical_analyst": {"tier": "default", "max_tokens": 8192, "timeout": 150},
+    "risk_manager": {"tier": "strong", "max_tokens": 8192, "timeout": 180},
+    "editor": {"tier": "strong", "max_tokens": 8192, "timeout": 180},
+}
+
+# Default API hosts opened by `warm_up_llm` (Google's SDK manages its own transport)
+PROVIDER_BASE_URLS = {
+    "openai": "https://api.openai.com/v1",
+    "groq": "https://api.groq.com/openai/v1",
+}
+
+# Process-wide registries: one chat model per (provider, model, temperature),
+# one keep-alive HTTP connection pool per provider shared by all its models
+_llms = {}
+_http_clients = {}
+_registry_lock = threading.Lock()
+
+
+def _pool_limits():
+    """Connection pool sized for concurrent analysts across concurrent requests (LLM_POOL_SIZE)."""
+    size = int(os.getenv("LLM_POOL_SIZE", "32"))
+    return httpx.Limits(
+        max_connections=size,
+        max_keepalive_connections=size,
+        keepalive_expiry=float(os.getenv("LLM_POOL_KEEPALIVE", "120")),
+    )
+
+
+def _get_http_clients(provider):
     """
-    Returns the configured LLM based on environment variables.
-    Defaults to OpenAI if not specified.
+    Returns the shared (sync, async) httpx clients for a provider, creating them once.
+
+    Unless LLM_SCHEDULER=0, completion requests are admitted by the shared
+    LLM scheduler (concurrency, requests/tokens per minute, Retry-After).
+    Once admitted, a request's timeouts are capped at the calling node's
+    remaining deadline budget.
     """
-    provider = os.getenv("LLM_PROVIDER", "openai").lower()
-    model_name = os.getenv("LLM_MODEL")
+    clients = _http_clients.get(provider)
+    if clients is None:
+        timeout = httpx.Timeout(float(os.getenv("LLM_REQUEST_TIMEOUT", "120")), connect=10.0)
+        # Requests made within a node's deadline budget time out when the budget runs out
+        transport = DeadlineTransport(httpx.HTTPTransport(limits=_pool_limits()))
+        async_transport = AsyncDeadlineTransport(httpx.AsyncHTTPTransport(limits=_pool_limits()))
+        if scheduler_enabled():
+            transport = SchedulingTransport(transport, provider)
+            async_transport = AsyncSchedulingTransport(async_transport, provider)
+        clients = (
+            httpx.Client(transport=transport, timeout=timeout),
+            httpx.AsyncClient(transport=async_transport, timeout=timeout),
+        )
+        _http_clients[provider] = clients
+    return clients
+
+
+def _build_llm(provider, model_name, temperature, max_tokens=None, timeout=None):
+    # Persistent response cache keyed on the canonicalized messages, model and temperature
+    cache = get_response_cache(provider, model_name, temperature)
+    # Per-role limits; None keeps the provider defaults and the pool's LLM_REQUEST_TIMEOUT
+    limits = {k: v for k, v in {"max_tokens": max_tokens, "timeout": timeout}.items() if v is not None}
 
     if provider == "google":
-        if not model_name:
-            model_name = "gemini-2.5-flash"
-        return ChatGoogleGenerativeAI(model=model_name, temperature=temperature)
-    
+        # Google's SDK owns its transport, so calls are admitted through the rate_limiter hook
+        rate_limiter = SchedulerRateLimiter(provider, model_name) if scheduler_enabled() else None
+        return ChatGoogleGenerativeAI(model=model_name, temperature=temperature, cache=cache,
+                                      rate_limiter=rate_limiter, **limits)
+
     elif provider == "openai":
-        if not model_name:
-            model_name = "gpt-5-mini"
-        return ChatOpenAI(model=model_name, temperature=temperature)
-    
+        http_client, http_async_client = _get_http_clients(provider)
+        return ChatOpenAI(model=model_name, temperature=temperature, cache=cache,
+                          http_client=http_client, http_async_client=http_async_client, **limits)
+
     elif provider == "groq":
-        if not model_name:
-            model_name = "openai/gpt-oss-120b"
-        return ChatGroq(model=model_name, temperature=temperature)
-    
+        http_client, http_async_client = _get_http_clients(provider)
+        return ChatGroq(model=model_name, temperature=temperature, cache=cache,
+                        http_client=http_client, http_async_client=http_async_client, **limits)
+
     else:
         raise ValueError(f"Unsupported LLM_PROVIDER: {provider}")
+
+
+@lru_cache(maxsize=8)
+def _load_roles_file(path, mtime):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _roles_config():
+    """Contents of the LLM_ROLES_FILE JSON file ({"tiers": {...}, "roles": {...}}), or {}."""
+    path = os.getenv("LLM_ROLES_FILE")
+    if not path:
+        return {}
+    return _load_roles_file(path, os.path.getmtime(path))
+
+
+def resolve_role(role=None, provider=None):
+    """
+    Resolves the model settings of a graph role.
+
+    Precedence, per setting: LLM_MODEL_<ROLE> / LLM_MAX_TOKENS_<ROLE> /
+    LLM_TIMEOUT_<ROLE>, then the role's entry in LLM_ROLES_FILE, then
+    ROLE_SETTINGS. The tier ('fast', 'default' or 'strong') maps to a model
+    through the file's "tiers", then MODEL_TIERS; 'default' is LLM_MODEL or
+    the provider default. With LLM_TIERS=0 every role uses the default model.
+
+    Args:
+        role (str, optional): Graph role (e.g. 'router', 'editor'); None for the default model.
+        provider (str, optional): Defaults to LLM_PROVIDER.
+
+    Returns:
+        dict: 'provider', 'tier', 'model', 'max_tokens' and 'timeout' (None means provider default).
+    """
+    provider = (provider or os.getenv("LLM_PROVIDER", "openai")).lower()
+    if provider not in DEFAULT_MODELS:
+        raise ValueError(f"Unsupported LLM_PROVIDER: {provider}")
+    default_model = os.getenv("LLM_MODEL") or DEFAULT_MODELS[provider]
+    if role is None:
+        return {"provider": provider, "tier": "default", "model": default_model, "max_tokens": None, "timeout": None}
+
+    config = _roles_config()
+    settings = dict(ROLE_SETTINGS.get(role, {"tier": "default"}))
+    settings.update(config.get("roles", {}).get(role, {}))
+    if os.getenv("LLM_TIERS", "1") == "0":
+        settings["tier"] = "default"
+        settings.pop("model", None)
+
+    tier = settings.get("tier", "default")
+    tiers = {**MODEL_TIERS.get(provider, {}), **config.get("tiers", {}), "default": default_model}
+    model = os.getenv(f"LLM_MODEL_{role.upper()}") or settings.get("model") or tiers.get(tier, default_model)
+    max_tokens = os.getenv(f"LLM_MAX_TOKENS_{role.upper()}") or settings.get("max_tokens")
+    timeout = os.getenv(f"LLM_TIMEOUT_{role.upper()}") or settings.get("timeout")
+    return {
+        "provider": provider,
+        "tier": tier,
+        "model": model,
+        "max_tokens": int(max_tokens) if max_tokens else None,
+        "timeout": float(timeout) if timeout else None,
+    }
+
+
+def get_llm(temperature=0, role=None):
+    """
+    Returns the configured LLM based on environment variables.
+    Defaults to OpenAI if not specified.
+
+    With a `role` (the graph node name, e.g. 'router' or 'editor') the model,
+    completion budget and timeout come from the role's tier; see `resolve_role`.
+
+    Instances are pooled per (provider, model, temperature, limits) for the
+    lifetime of the process, and models of the same provider share one
+    keep-alive HTTP connection pool, so nodes do not rebuild clients or redo
+    TLS handshakes.
+    """
+    spec = resolve_role(role)
+    key = (spec["provider"], spec["model"], temperature, spec["max_tokens"], spec["timeout"])
+    with _registry_lock:
+        llm = _llms.get(key)
+        if llm is None:
+            llm = _build_llm(*key)
+            _llms[key] = llm
+        return llm
+
+
+def warm_up_llm():
+    """
+    Opens the provider connection ahead of the first request.
+
+    Builds the default model (and its connection pool) and issues a lightweight
+    request to the provider's API host so that DNS, TCP and TLS setup are paid
+    at startup; the connection is then kept alive in the pool. Failures are
+    reported but never raised.
+
+    Returns:
+        bool: Whether a connection was opened.
+    """
+    provider = os.getenv("LLM_PROVIDER", "openai").lower()
+    try:
+        llm = get_llm(temperature=0)
+        # Prefer a configured endpoint (e.g. OPENAI_BASE_URL) over the public API host
+        base_url = getattr(llm, "openai_api_base", None) or getattr(llm, "groq_api_base", None) \
+            or PROVIDER_BASE_URLS.get(provider)
+        if base_url is None:
+            return False
+        http_client, _ = _get_http_clients(provider)
+        # Any response (even 401) leaves an established TLS connection in the pool
+        http_client.get(f"{base_url}/models", timeout=10.0)
+        return True
+    except Exception as e:
+        print(f"DEBUG: LLM warm-up failed for {provider}: {e}")
+        return False
+
+
+def _release_clients():
+    """Empties the model registry and returns the connection pools it held."""
+    with _registry_lock:
+        clients = list(_http_clients.values())
+        _http_clients.clear()
+        _llms.clear()
+    return clients
+
+
+async def aclose_llm_clients():
+    """Closes the shared sync and async HTTP connection pools and clears the model registry."""
+    for http_client, http_async_client in _release_clients():
+        http_client.close()
+        await http_async_client.aclose()
+
+
+def close_llm_clients():
+    """Sync variant of `aclose_llm_clients` for callers without a running event loop (CLI, tests)."""
+    asyncio.run(aclose_llm_clients())
@@ -0,0 +1,20 @@
+import pytest
+from src import llm_cache, research_cache
+from src.llm_cache import ResponseStore
+
+# --- Fixtures ---
+
+@pytest.fixture(autouse=True)
+def isolated_caches(tmp_path, monkeypatch):
+    """
+    Points the process-wide cache stores at temporary SQLite files.
+
+    The stores are built at import from the developer's `.cache` directory,
+    so the environment override alone would not reach them; the store
+    objects are replaced as well, keeping every test off the real cached
+    responses.
+    """
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "llm_responses.sqlite"))
+    monkeypatch.setattr(llm_cache, "response_store", ResponseStore(tmp_path / "llm_responses.sqlite"))
+    monkeypatch.setenv("RESEARCH_CACHE_PATH", str(tmp_path / "research.sqlite"))
+    monkeypatch.setattr(research_cache, "research_store", ResponseStore(tmp_path / "research.sqlite", ttls={}))
@@ -1,10 +1,12 @@
+import asyncio
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from src.state import AgentState
-from src.agents.data_analyst import data_analyst_node
+from src.agents.data_analyst import data_analyst_node, adata_analyst_node
 from src.agents.news_analyst import news_analyst_node
 from src.agents.risk_manager import risk_manager_node
 from src.agents.editor import editor_node
+from src.agents.router import router_node
 
 # --- Fixtures ---
 
@@ -85,6 +87,114 @@ def test_data_analyst_node(mock_create_agent):
     assert "Analysis of AAPL" in result["data_analysis"]
     mock_create_agent.assert_called_once()
 
+def test_async_data_analyst_node(mock_create_agent):
+    """
+    Validates that the async Data Analyst variant awaits the agent instead of
+    calling the blocking `invoke`.
+    """
+    mock_agent_executor = MagicMock()
+    mock_agent_executor.ainvoke = AsyncMock(return_value={
+        "messages": [MagicMock(content="Analysis of AAPL: Fairly valued.")]
+    })
+    mock_create_agent.return_value = mock_agent_executor
+
+    state = {
+        "tickers": ["AAPL"],
+        "query": "Is AAPL undervalued?"
+    }
+
+    result = asyncio.run(adata_analyst_node(state))
+
+    assert "Analysis of AAPL" in result["data_analysis"]
+    mock_agent_executor.ainvoke.assert_awaited_once()
+    mock_agent_executor.invoke.assert_not_called()
+
+def test_system_prompt_is_a_stable_prefix(mock_create_agent):
+    """
+    Validates that the system prompt does not depend on the query, that every
+    style shares the invariant instructions as a byte-identical prefix, and
+    that the agent is built once per style and reused across requests.
+    """
+    from src.agents.data_analyst import PROMPT, STYLE_GUIDELINES
+
+    agents = []
+    def build(**kwargs):
+        agents.append(MagicMock(invoke=MagicMock(return_value={"messages": [MagicMock(content="ok")]})))
+        return agents[-1]
+    mock_create_agent.side_effect = build
+
+    data_analyst_node({"tickers": ["AAPL"], "query": "Is AAPL undervalued?", "investment_style": "Aggressive"})
+    data_analyst_node({"tickers": ["TSM"], "query": "TSM 的成長性？", "investment_style": "Aggressive", "data_analyst_instructions": "Check margins"})
+
+    # The second request reuses the agent, and only its human message changes
+    mock_create_agent.assert_called_once()
+    system_prompt = mock_create_agent.call_args.kwargs["system_prompt"]
+    assert system_prompt == PROMPT.system("Aggressive")
+    assert "AAPL" not in system_prompt and "{" not in system_prompt
+    assert agents[0].invoke.call_count == 2
+    assert "Check margins" in agents[0].invoke.call_args.args[0]["messages"][0][1]
+
+    # Another style builds its own agent
+    data_analyst_node({"tickers": ["AAPL"], "query": "Is AAPL undervalued?", "investment_style": "Conservative"})
+    assert mock_create_agent.call_count == 2
+
+    for style, guideline in STYLE_GUIDELINES.items():
+        # Instructions first, style segment last
+        assert PROMPT.system(style).startswith(PROMPT.instructions)
+        assert guideline in PROMPT.system(style)[len(PROMPT.instructions):]
+
+def test_evidence_prompt_is_style_neutral_when_the_evidence_is_cached(mock_create_agent):
+    """
+    Validates that in a run whose evidence is cached every style gets the
+    same neutral system prompt, which carries the guidelines of all styles.
+    """
+    from src.agents.data_analyst import PROMPT, STYLE_GUIDELINES
+    from src.agents.prompts import NEUTRAL_STYLE
+
+    mock_create_agent.return_value = MagicMock(invoke=MagicMock(return_value={"messages": [MagicMock(content="ok")]}))
+
+    for style in STYLE_GUIDELINES:
+        data_analyst_node({"tickers": ["AAPL"], "query": "Is AAPL undervalued?", "investment_style": style, "research_key": "k"})
+
+    mock_create_agent.assert_called_once()
+    system_prompt = mock_create_agent.call_args.kwargs["system_prompt"]
+    assert system_prompt == PROMPT.system(NEUTRAL_STYLE)
+    assert system_prompt.startswith(PROMPT.instructions)
+    assert all(guideline in system_prompt for guideline in STYLE_GUIDELINES.values())
+
+def test_data_analyst_single_shot_makes_one_llm_call(mock_create_agent, mock_llm, monkeypatch):
+    """
+    Validates that single-shot mode runs the tool for every ticker itself
+    (seeing the prefetched snapshot) and writes the report with one LLM call.
+    """
+    from langchain_core.tools import tool
+    from src.agents import data_analyst
+    from src.tools.market_data import _active_snapshot
+
+    @tool
+    def fake_analysis_data(ticker: str) -> str:
+        """Returns canned analysis data."""
+        return f"{ticker} data, snapshot={_active_snapshot.get()['tag']}"
+
+    monkeypatch.setattr(data_analyst, "TOOLS", [fake_analysis_data])
+    mock_llm.invoke.return_value = MagicMock(content="Single-shot report")
+
+    state = {
+        "tickers": ["AAPL", "MSFT"],
+        "query": "Compare AAPL and MSFT",
+        "analyst_mode": "single_shot",
+        "market_data": {"tag": "prefetched"},
+    }
+    result = data_analyst_node(state)
+
+    assert result == {"data_analysis": "Single-shot report"}
+    mock_create_agent.assert_not_called()
+    mock_llm.invoke.assert_called_once()
+    system, human = mock_llm.invoke.call_args.args[0]
+    assert system.content == data_analyst.PROMPT.system("Balanced")
+    assert "AAPL data, snapshot=prefetched" in human.content
+    assert "MSFT data, snapshot=prefetched" in human.content
+
 def test_news_analyst_node(mock_create_agent_news):
     """
     Validates that the News Analyst node triggers a search and returns 
@@ -138,6 +248,56 @@ def test_risk_manager_node(mock_create_agent_risk):
     assert "Risk Assessment" in result["risk_assessment"]
     mock_create_agent_risk.assert_called_once()
 
+def test_router_fast_path_skips_llm():
+    """
+    Validates that a simple query naming known tickers is routed from the local
+    symbol index without building the Research Lead agent.
+    """
+    with patch('src.agents.router.create_agent') as mock_create, \
+         patch('src.agents.router.get_llm') as mock_get_llm:
+        result = router_node({"query": "分析台積電和NVDA"})
+
+    assert result["tickers"] == ["TSM", "NVDA"]
+    assert "TSM, NVDA" in result["data_analyst_instructions"]
+    assert "分析台積電和NVDA" in result["news_analyst_instructions"]
+    mock_create.assert_not_called()
+    mock_get_llm.assert_not_called()
+
+def test_router_plans_only_the_branches_a_narrow_query_needs():
+    """
+    Validates that a chart-only question is planned as a technical-only run,
+    while broad or buy/sell questions keep every branch.
+    """
+    with patch('src.agents.router.get_llm'):
+        narrow = router_node({"query": "NVDA 現在的 RSI 是否超買?"})
+        broad = router_node({"query": "NVDA 值得買嗎?"})
+
+    assert narrow["branches"] == ["technical"]
+    assert broad["branches"] == ["fundamentals", "news", "technical"]
+
+def test_router_falls_back_to_llm_for_implicit_scope():
+    """
+    Validates that queries implying unnamed tickers (peers, sectors) are routed by the LLM.
+    """
+    tool_call = {"name": "submit_routing_instructions", "args": {
+        "tickers": ["TSM", "UMC", "INTC"],
+        "data_analyst_instructions": "Compare foundry margins.",
+        "news_analyst_instructions": "Foundry pricing news.",
+        "trend_analyst_instructions": "MA20 vs MA50.",
+        "pattern_analyst_instructions": "Look for triangles.",
+        "indicator_analyst_instructions": "RSI 14.",
+    }}
+    mock_agent_executor = MagicMock()
+    mock_agent_executor.invoke.return_value = {"messages": [MagicMock(tool_calls=[tool_call])]}
+    with patch('src.agents.router.create_agent', return_value=mock_agent_executor) as mock_create, \
+         patch('src.agents.router.get_llm'):
+        result = router_node({"query": "台積電和同業的比較"})
+
+    mock_create.assert_called_once()
+    assert result["tickers"] == ["TSM", "UMC", "INTC"]
+    # No plan from the model runs every branch
+    assert result["branches"] == ["fundamentals", "news", "technical"]
+
 def test_editor_node(mock_create_agent_editor):
     """
     Validates that the Chief Editor node compiles the final report 
@@ -164,4 +324,52 @@ def test_editor_node(mock_create_agent_editor):
     
     assert "final_report" in result
     assert "Final Report" in result["final_report"]
-    mock_create_agent_editor.assert_called_once()
\ No newline at end of file
+    mock_create_agent_editor.assert_called_once()
+
+def test_consolidated_technical_node_fills_all_technical_keys(monkeypatch):
+    """
+    Validates that the consolidated technical node computes the tool data once
+    per ticker, makes one structured LLM call and fills the four state keys the
+    split technical branch produces.
+    """
+    from langchain_core.tools import tool
+    from src.agents import technical_analyst
+    from src.graph import create_graph
+
+    @tool
+    def fake_technical_data(ticker: str) -> str:
+        """Returns canned indicator data."""
+        return f"{ticker} RSI=55"
+
+    report = technical_analyst.TechnicalReport(
+        trend_analysis="趨勢向上", pattern_analysis="無明顯型態",
+        indicator_analysis="動能中性", technical_strategy="NEUTRAL",
+    )
+    structured = MagicMock()
+    structured.invoke.return_value = {"raw": MagicMock(), "parsed": report, "parsing_error": None}
+    llm = MagicMock()
+    llm.with_structured_output.return_value = structured
+    monkeypatch.setattr(technical_analyst, "get_llm", lambda **kwargs: llm)
+    monkeypatch.setattr(technical_analyst, "TOOLS", [fake_technical_data])
+
+    state = {"tickers": ["NVDA"], "query": "NVDA 技術面？", "trend_analyst_instructions": "Check SMA_20 vs SMA_50"}
+    result = technical_analyst.technical_analyst_node(state)
+
+    assert result == {
+        "trend_analysis": "趨勢向上", "pattern_analysis": "無明顯型態",
+        "indicator_analysis": "動能中性", "technical_strategy": "NEUTRAL",
+    }
+    structured.invoke.assert_called_once()
+    human = structured.invoke.call_args.args[0][1].content
+    assert "NVDA RSI=55" in human and "Check SMA_20 vs SMA_50" in human
+
+    # An unparsable answer marks the whole branch instead of leaving it blank
+    structured.invoke.return_value = {"raw": MagicMock(content=""), "parsed": None, "parsing_error": ValueError("bad")}
+    failed = technical_analyst.technical_analyst_node(state)
+    assert set(failed) == set(result)
+    assert all(value.startswith(technical_analyst.UNAVAILABLE_MARKER) for value in failed.values())
+
+    # The consolidated variant replaces the four technical agents with the one node
+    nodes = set(create_graph("consolidated").get_graph().nodes)
+    assert "technical_analyst" in nodes
+    assert not nodes & {"trend_analyst", "pattern_analyst", "indicator_analyst", "technical_strategist"}
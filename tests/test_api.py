@@ -0,0 +1,201 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+from langchain_core.messages import AIMessageChunk
+
+import src.api as api
+
+# Simulated duration of one full graph run (all LLM calls awaited)
+RUN_SECONDS = 0.3
+
+# --- Helpers ---
+
+class _SlowGraph:
+    """Stands in for the compiled graph: each run awaits like a chain of LLM calls."""
+
+    async def ainvoke(self, state, config=None):
+        await asyncio.sleep(RUN_SECONDS)
+        return {**state, "final_report": f"Report for {state['query']}"}
+
+    def invoke(self, state, config=None):
+        raise AssertionError("/research must not call the blocking graph.invoke")
+
+    async def astream(self, state, config=None, stream_mode=None):
+        # Scripted (mode, chunk) pairs in the order LangGraph emits them
+        yield "updates", {"router": {"tickers": ["AAPL"]}}
+        yield "updates", {"prefetch": {"market_data": {"AAPL": "internal"}}}
+        yield "updates", {"data_analyst": {"data_analysis": "Revenue is growing."}}
+        # Tokens from an analyst's own model must not leak into the report stream
+        yield "messages", (AIMessageChunk(content="thinking"), {"langgraph_node": "model"})
+        for token in ["Buy ", "AAPL."]:
+            yield "messages", (AIMessageChunk(content=token), {"langgraph_node": "editor"})
+        yield "updates", {"editor": {"final_report": "Buy AAPL."}}
+
+
+def _post_many(app, count):
+    """Posts `count` distinct queries to /research concurrently."""
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*[
+                client.post("/research", json={"query": f"Q{i}"}) for i in range(count)
+            ])
+    return asyncio.run(run())
+
+
+def _parse_sse(text):
+    """Splits a Server-Sent Events body into (event, data) pairs."""
+    events = []
+    for block in text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+# --- Fixtures ---
+
+@pytest.fixture
+def client_app(monkeypatch, tmp_path):
+    """The API app serving a `_SlowGraph`."""
+    # Keep the endpoint's JSON snapshot out of the working tree
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(api, "get_graph", lambda technical="split": _SlowGraph())
+    return api.app
+
+# --- Unit Tests ---
+
+def test_research_returns_graph_result(client_app):
+    """Validates that a single request returns the final state produced by the async graph run."""
+    (response,) = _post_many(client_app, 1)
+
+    assert response.status_code == 200
+    assert response.json()["final_report"] == "Report for Q0"
+
+
+def test_concurrent_research_requests_do_not_block_each_other(client_app):
+    """
+    Validates that N parallel requests finish in about the time of one: the
+    graph is awaited, so the event loop keeps serving other requests while a
+    run is in flight.
+    """
+    count = 5
+    start = time.perf_counter()
+    responses = _post_many(client_app, count)
+    elapsed = time.perf_counter() - start
+
+    assert [r.status_code for r in responses] == [200] * count
+    assert sorted(r.json()["final_report"] for r in responses) == [f"Report for Q{i}" for i in range(count)]
+    # Serialized execution would take count * RUN_SECONDS
+    assert elapsed < 2 * RUN_SECONDS
+
+
+def test_research_shows_neutral_evidence_in_the_clients_style(monkeypatch, tmp_path):
+    """Validates that per-style verdicts of reused evidence reach the client only for its own style."""
+    class NeutralGraph(_SlowGraph):
+        async def ainvoke(self, state, config=None):
+            report = "Margins are stable.\n- [Conservative] Verdict: AVOID\n- [Aggressive] Verdict: BUY"
+            return {**state, "data_analysis": report, "final_report": "memo"}
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(api, "get_graph", lambda technical="split": NeutralGraph())
+
+    async def run():
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/research", json={"query": "NVDA?", "style": "Conservative"})
+    response = asyncio.run(run())
+
+    assert response.json()["data_analysis"] == "Margins are stable.\n- Verdict: AVOID"
+
+
+def test_research_stream_emits_node_token_and_done_events(client_app):
+    """
+    Validates that each completed node, each editor token and the final
+    result arrive as separate events, in order.
+    """
+    async def run():
+        transport = httpx.ASGITransport(app=client_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/research/stream", json={"query": "AAPL?"})
+    response = asyncio.run(run())
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _parse_sse(response.text)
+    assert [(e, d.get("node")) for e, d in events] == [
+        ("node", "router"), ("node", "prefetch"), ("node", "data_analyst"),
+        ("token", "editor"), ("token", "editor"), ("node", "editor"), ("done", None),
+    ]
+    assert events[2][1]["update"] == {"data_analysis": "Revenue is growing."}
+    assert "".join(d["text"] for e, d in events if e == "token") == "Buy AAPL."
+    # Internal working state stays server-side
+    assert events[1][1]["update"] == {}
+    done = events[-1][1]
+    assert done["final_report"] == "Buy AAPL." and done["tickers"] == ["AAPL"]
+    assert "market_data" not in done
+
+
+def test_failed_run_resumes_from_its_last_checkpoint(monkeypatch, tmp_path):
+    """
+    Validates that after an editor failure, resuming the run executes only
+    the editor; finished nodes are not run again.
+    """
+    import src.graph as graph_module
+
+    runs = []
+    failures = {"editor": 1}
+
+    def stub(name, update):
+        def node(state):
+            runs.append(name)
+            if failures.get(name):
+                failures[name] -= 1
+                raise TimeoutError(f"{name} timed out")
+            return update
+        return node
+
+    updates = {
+        "router": {"tickers": ["NVDA"]},
+        "prefetch": {"market_data": {}},
+        "data_analyst": {"data_analysis": "data"},
+        "news_analyst": {"news_analysis": "news"},
+        "trend_analyst": {"trend_analysis": "trend"},
+        "pattern_analyst": {"pattern_analysis": "pattern"},
+        "indicator_analyst": {"indicator_analysis": "indicator"},
+        "technical_strategist": {"technical_strategy": "strategy"},
+        "risk_manager": {"risk_assessment": "risk"},
+        "editor": {"final_report": "memo"},
+    }
+    for name, update in updates.items():
+        monkeypatch.setattr(graph_module, f"{name}_node", stub(name, update))
+        monkeypatch.setattr(graph_module, f"a{name}_node", None)
+    monkeypatch.setattr(graph_module, "_graphs", {})
+    monkeypatch.setenv("CHECKPOINT_PATH", str(tmp_path / "checkpoints.sqlite"))
+    monkeypatch.setenv("LLM_WARMUP", "0")
+    monkeypatch.setenv("RESEARCH_CACHE", "0")
+    monkeypatch.chdir(tmp_path)
+
+    async def run():
+        async with api.app.router.lifespan_context(api.app):
+            transport = httpx.ASGITransport(app=api.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                failed = await client.post("/research", json={"query": "NVDA?"})
+                run_id = failed.headers["X-Run-Id"]
+                resumed = await client.post(f"/research/{run_id}/resume")
+                again = await client.post(f"/research/{run_id}/resume")
+                metrics = await client.get("/metrics")
+        return failed, resumed, again, metrics
+    failed, resumed, again, metrics = asyncio.run(run())
+
+    assert failed.status_code == 500
+    assert resumed.status_code == 200
+    assert resumed.json()["final_report"] == "memo"
+    assert resumed.json()["run_id"] == failed.headers["X-Run-Id"]
+    # Every node ran once, except the editor that failed the first time
+    assert runs.count("editor") == 2
+    assert all(runs.count(name) == 1 for name in updates if name != "editor")
+    # Completed runs are dropped
+    assert again.status_code == 404
+    assert metrics.json()["checkpoints"]["by_node"]["editor"]["writes"] >= 2
@@ -0,0 +1,68 @@
+import time
+
+import httpx
+import pytest
+
+from src.deadline import (
+    STAGES, DeadlineTransport, call_with_timeout, node_budget, run_with_budget, _node_deadline,
+)
+
+# --- Unit Tests ---
+
+def test_budgets_split_the_time_left_over_the_remaining_stages():
+    """
+    Validates that the first stage gets its share of the whole deadline and
+    the last one all the time left.
+    """
+    now = 1000.0
+    total = sum(share for _, _, share in STAGES)
+
+    assert node_budget("router", now + 100, now) == pytest.approx(100 * STAGES[0][2] / total)
+    assert node_budget("editor", now + 40, now) == pytest.approx(40)
+    # Parallel analysts share one stage budget
+    assert node_budget("news_analyst", now + 60, now) == node_budget("trend_analyst", now + 60, now)
+    assert node_budget("editor", now - 5, now) == 0
+
+
+def test_transport_caps_request_timeouts_at_the_node_budget():
+    """
+    Validates that requests made inside a node time out with its budget, and
+    that they are not sent once it is spent.
+    """
+    seen = []
+    transport = DeadlineTransport(httpx.MockTransport(lambda request: seen.append(request.extensions["timeout"]) or httpx.Response(200)))
+    client = httpx.Client(transport=transport, timeout=120)
+
+    token = _node_deadline.set(time.time() + 5)
+    try:
+        client.get("http://test/")
+    finally:
+        _node_deadline.reset(token)
+    assert 4 < seen[0]["read"] <= 5
+
+    token = _node_deadline.set(time.time() - 1)
+    try:
+        with pytest.raises(httpx.TimeoutException):
+            client.get("http://test/")
+    finally:
+        _node_deadline.reset(token)
+    assert len(seen) == 1
+
+
+def test_overrunning_node_returns_its_fallback_in_time():
+    """
+    Validates that a hung node is abandoned at the end of its budget and its
+    marked fallback is returned.
+    """
+    def hung(state):
+        time.sleep(5)
+        return {"news_analysis": "late"}
+
+    config = {"configurable": {"deadline": time.time() + 0.5}}
+    start = time.perf_counter()
+    update = run_with_budget("editor", hung, {}, config, lambda state, budget: {"news_analysis": "[TIMEOUT]"})
+
+    assert update == {"news_analysis": "[TIMEOUT]"}
+    assert time.perf_counter() - start < 1.0
+    with pytest.raises(ValueError):
+        call_with_timeout(lambda: int("x"), 1.0)
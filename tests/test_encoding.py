@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+from unittest.mock import patch
+from src.tools import finance_tools
+from src.tools.encoding import Section, encode_kv, encode_sections, encode_table, estimate_tokens, format_numbers, token_budget
+
+# --- Unit Tests ---
+
+def test_format_numbers_applies_suffixes_vectorized():
+    """
+    Validates T/B/M suffixes, negative values and empty cells for missing values.
+    """
+    values = np.array([[2.5e12, -3.2e9, 4.5e6], [12.345, np.nan, None]], dtype=object)
+    result = format_numbers(values)
+
+    assert result.tolist() == [["2.50T", "-3.20B", "4.50M"], ["12.35", "", ""]]
+
+def test_encode_kv_and_table_are_compact():
+    """
+    Validates key=value encoding (skipping missing values) and CSV tables with
+    dates shortened and no padding whitespace.
+    """
+    assert encode_kv({"pe": 25.312, "peg": None, "rating": "buy", "analysts": 30}) == "pe=25.31;rating=buy;analysts=30"
+
+    frame = pd.DataFrame({"Close": [101.5, 102.25]}, index=pd.date_range("2025-01-02", periods=2, tz="America/New_York"))
+    assert encode_table(frame, "date") == "date,Close\n2025-01-02,101.50\n2025-01-03,102.25"
+    assert encode_table(None) == "n/a"
+
+def test_encode_sections_trims_lowest_priority_first():
+    """
+    Validates that sections are dropped lowest priority first, keeping output
+    order, and that the dropped sections are listed.
+    """
+    sections = [
+        Section("core", "x" * 100, priority=5),
+        Section("history", "y" * 400, priority=1),
+        Section("extra", "z" * 100, priority=3),
+    ]
+    full = encode_sections("T", sections)
+    trimmed = encode_sections("T", sections, budget=80)
+
+    assert "[history]" in full
+    assert trimmed.splitlines()[1] == "[core]"
+    assert "[history]" not in trimmed and "[extra]" in trimmed
+    assert trimmed.endswith("trimmed=history")
+    assert estimate_tokens(trimmed) <= 80
+
+def test_token_budget_env_override(monkeypatch):
+    """
+    Validates per-tool budgets and their environment override.
+    """
+    monkeypatch.setenv("TOOL_TOKEN_BUDGET_GET_TECHNICAL_DATA", "123")
+    assert token_budget("get_technical_data") == 123
+
+def test_stock_analysis_report_is_compact():
+    """
+    Validates the data analyst tool output: short keys, CSV statement tables and
+    no Python dict reprs or padded columns.
+    """
+    index = pd.date_range("2021-01-01", periods=60, freq="MS", tz="America/New_York")
+    history = pd.DataFrame({"Open": 100.0, "High": 110.0, "Low": 90.0, "Close": np.linspace(100, 200, 60), "Volume": 2e7}, index=index)
+    statement = pd.DataFrame([[2.1e12, 1.9e12]], index=["Total Revenue"], columns=pd.to_datetime(["2024-12-31", "2023-12-31"]))
+
+    with patch.object(finance_tools, "get_info", return_value={"marketCap": 8e11, "trailingPE": 25.3}), \
+         patch.object(finance_tools, "get_history", return_value=history), \
+         patch.object(finance_tools, "get_financials", return_value=statement), \
+         patch.object(finance_tools, "get_balance_sheet", return_value=statement):
+        report = finance_tools.get_stock_analysis_data.invoke({"ticker": "TSM"})
+
+    assert "mcap=800.00B;pe_ttm=25.30" in report
+    assert "item,2024,2023\nTotal Revenue,2.10T,1.90T" in report
+    assert "{" not in report and "  " not in report
+    assert estimate_tokens(report) <= token_budget("get_stock_analysis_data")
@@ -0,0 +1,164 @@
+import time
+import pandas as pd
+import pytest
+from unittest.mock import MagicMock, patch
+from src.tools import market_data
+from src.tools.fundamentals_store import FundamentalsStore, EARNINGS_GRACE
+
+# --- Helpers ---
+
+class FakeFetcher:
+    """Serves canned fundamentals and records how often the store downloads."""
+
+    def __init__(self, fiscal_period="2024-12-31", earnings_date=None):
+        self.fiscal_period = fiscal_period
+        self.earnings_date = earnings_date
+        self.calls = 0
+        self.fail = False
+
+    def __call__(self, ticker):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("rate limited")
+        return {
+            "fiscal_period": self.fiscal_period,
+            "earnings_date": self.earnings_date,
+            "datasets": {"financials": {"index": ["Total Revenue"], "columns": [self.fiscal_period], "data": [[1e9]]}},
+        }
+
+def iso_date(offset_days):
+    return (pd.Timestamp.now(tz="UTC") + pd.Timedelta(days=offset_days)).date().isoformat()
+
+# --- Unit Tests ---
+
+def test_record_is_served_from_disk_until_earnings(tmp_path):
+    """
+    Validates that statements are fetched once and then served from disk,
+    including by a second store instance (another worker process).
+    """
+    fetcher = FakeFetcher(earnings_date=iso_date(30))
+    store = FundamentalsStore(tmp_path, fetcher, max_age=90 * 86400)
+
+    first = store.load("TSM")
+    second = FundamentalsStore(tmp_path, fetcher, max_age=90 * 86400).load("TSM")
+
+    assert fetcher.calls == 1
+    assert second["datasets"] == first["datasets"]
+    assert second["fiscal_period"] == "2024-12-31"
+    # Revalidation is scheduled just after the announced earnings date
+    expected = pd.Timestamp(iso_date(30), tz="UTC").timestamp() + EARNINGS_GRACE
+    assert first["revalidate_at"] == pytest.approx(expected)
+
+def test_record_revalidates_after_earnings_date(tmp_path):
+    """
+    Validates that a record becomes stale once its earnings date has passed,
+    and that the new fiscal period replaces the stored one.
+    """
+    fetcher = FakeFetcher(earnings_date=iso_date(30))
+    store = FundamentalsStore(tmp_path, fetcher)
+    store.load("TSM")
+
+    with patch("src.tools.fundamentals_store.time.time", return_value=time.time() + 40 * 86400):
+        fetcher.fiscal_period, fetcher.earnings_date = "2025-12-31", iso_date(120)
+        record = store.load("TSM")
+
+    assert fetcher.calls == 2
+    assert record["fiscal_period"] == "2025-12-31"
+
+def test_unchanged_period_after_earnings_retries_soon(tmp_path):
+    """
+    Validates that when earnings were announced but the statements still show
+    the old fiscal period, the store retries after `retry_after` rather than `max_age`.
+    """
+    fetcher = FakeFetcher(earnings_date=iso_date(-2))
+    store = FundamentalsStore(tmp_path, fetcher, max_age=30 * 86400, retry_after=3600)
+    store.load("TSM")
+
+    now = time.time()
+    assert store.revalidate_at(now, iso_date(-2), period_advanced=False) == pytest.approx(now + 3600)
+    assert store.revalidate_at(now, iso_date(-2), period_advanced=True) == pytest.approx(now + 30 * 86400)
+
+def test_retries_continue_after_the_calendar_moves_to_the_next_date(tmp_path):
+    """
+    Validates that once an earnings date has passed, the store keeps retrying
+    after `retry_after` even when the calendar already shows the next date,
+    until the fiscal period advances.
+    """
+    fetcher = FakeFetcher(earnings_date=iso_date(30))
+    store = FundamentalsStore(tmp_path, fetcher, max_age=90 * 86400, retry_after=3600)
+    store.load("TSM")
+
+    later = time.time() + 40 * 86400
+    with patch("src.tools.fundamentals_store.time.time", return_value=later):
+        # Earnings passed, the filing is not out, and the calendar moved on
+        fetcher.earnings_date = iso_date(120)
+        record = store.load("TSM")
+    assert record["pending_earnings"] == iso_date(30)
+    assert record["revalidate_at"] == pytest.approx(later + 3600)
+
+    with patch("src.tools.fundamentals_store.time.time", return_value=later + 7200):
+        record = store.load("TSM")
+    assert fetcher.calls == 3
+    assert record["revalidate_at"] == pytest.approx(later + 7200 + 3600)
+
+    with patch("src.tools.fundamentals_store.time.time", return_value=later + 14400):
+        fetcher.fiscal_period = "2025-12-31"
+        record = store.load("TSM")
+    assert record["pending_earnings"] is None
+    assert record["revalidate_at"] == pytest.approx(pd.Timestamp(iso_date(120), tz="UTC").timestamp() + EARNINGS_GRACE)
+
+def test_quarterly_earnings_do_not_trigger_retries(tmp_path):
+    """
+    Validates that a quarterly earnings date passing without a new annual
+    period schedules the next earnings date, not daily retries, whether the
+    calendar already moved on or still lists the passed date.
+    """
+    fetcher = FakeFetcher(fiscal_period=iso_date(-100), earnings_date=iso_date(30))
+    store = FundamentalsStore(tmp_path, fetcher, max_age=90 * 86400, retry_after=3600)
+    store.load("TSM")
+
+    later = time.time() + 40 * 86400
+    with patch("src.tools.fundamentals_store.time.time", return_value=later):
+        fetcher.earnings_date = iso_date(120)
+        record = store.load("TSM")
+    assert record["pending_earnings"] is None
+    assert record["revalidate_at"] == pytest.approx(pd.Timestamp(iso_date(120), tz="UTC").timestamp() + EARNINGS_GRACE)
+
+    now = time.time()
+    assert store.revalidate_at(now, iso_date(-2), False, fiscal_period=iso_date(-100)) == pytest.approx(now + 90 * 86400)
+
+def test_failed_refresh_serves_stored_record(tmp_path):
+    """
+    Validates that a stale record is still served when the refresh fails,
+    and that the error propagates when nothing is stored.
+    """
+    fetcher = FakeFetcher()
+    store = FundamentalsStore(tmp_path, fetcher, max_age=0)
+    stored = store.load("TSM")
+
+    fetcher.fail = True
+    assert store.load("TSM")["datasets"] == stored["datasets"]
+    with pytest.raises(ConnectionError):
+        store.load("NVDA")
+
+def test_get_financials_reads_through_store(tmp_path, monkeypatch):
+    """
+    Validates that `get_financials` and `get_balance_sheet` share one download
+    of the statements, and that a cleared memory cache is refilled from disk.
+    """
+    monkeypatch.setattr(market_data.fundamentals_store, "root", tmp_path)
+    statement = pd.DataFrame([[2e9, 1e9]], index=["Total Revenue"], columns=pd.to_datetime(["2024-12-31", "2023-12-31"]))
+    stock = MagicMock(financials=statement, balance_sheet=statement, calendar={"Earnings Date": [pd.Timestamp(iso_date(30)).date()]})
+
+    market_data.market_data_cache.clear()
+    with patch("src.tools.market_data.get_ticker", return_value=stock) as mock_ticker:
+        financials = market_data.get_financials("TSM")
+        market_data.get_balance_sheet("TSM")
+        market_data.market_data_cache.clear()
+        market_data.get_financials("TSM")
+
+    assert mock_ticker.call_count == 1
+    assert financials.loc["Total Revenue"].tolist() == [2e9, 1e9]
+    record = market_data.fundamentals_store.read("TSM")
+    assert record["fiscal_period"] == "2024-12-31"
+    assert record["earnings_date"] == iso_date(30)
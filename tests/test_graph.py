@@ -0,0 +1,195 @@
+import asyncio
+import time
+
+import pytest
+
+import src.graph as graph_module
+
+TECHNICAL_NODES = ("trend_analyst", "pattern_analyst", "indicator_analyst", "technical_strategist")
+
+# --- Fixtures ---
+
+@pytest.fixture
+def recorded_graph(monkeypatch):
+    """Compiles the real graph topology with stub nodes that record their runs."""
+    # Every run researches its evidence; reuse is covered below
+    monkeypatch.setenv("RESEARCH_CACHE", "0")
+    runs = []
+    plan = {"branches": None, "tickers": ["NVDA"], "fanout": None}
+
+    def stub(name, update):
+        def node(state):
+            runs.append(name)
+            time.sleep(plan.get("delays", {}).get(name, 0))
+            return update(state) if callable(update) else update
+        return node
+
+    def route(state):
+        return {"tickers": plan["tickers"], "branches": plan["branches"], "fanout": plan["fanout"]}
+
+    stubs = {
+        "router": route,
+        "prefetch": {"market_data": {}},
+        "data_analyst": lambda state: {"data_analysis": plan.get("data", lambda s: "data")(state)},
+        "news_analyst": {"news_analysis": "news"},
+        "trend_analyst": {"trend_analysis": "trend"},
+        "pattern_analyst": {"pattern_analysis": "pattern"},
+        "indicator_analyst": {"indicator_analysis": "indicator"},
+        "technical_strategist": {"technical_strategy": "strategy"},
+        "risk_manager": lambda state: {"risk_assessment": f"saw {state.get('data_analysis')}/{state.get('technical_strategy')}"},
+        "editor": {"final_report": "memo"},
+    }
+    for name, update in stubs.items():
+        node = stub(name, update)
+        monkeypatch.setattr(graph_module, f"{name}_node", node)
+        monkeypatch.setattr(graph_module, f"a{name}_node", None)
+    return graph_module.create_graph(), runs, plan
+
+# --- Unit Tests ---
+
+def test_planned_branches_skip_the_others(recorded_graph):
+    """
+    Validates that a technical-only plan never runs the data and news
+    analysts, and that the join still fires.
+    """
+    graph, runs, plan = recorded_graph
+    plan["branches"] = ["technical"]
+
+    result = graph.invoke({"query": "NVDA RSI?"})
+
+    assert "data_analyst" not in runs and "news_analyst" not in runs
+    assert set(TECHNICAL_NODES) <= set(runs)
+    assert result["risk_assessment"] == "saw None/strategy"
+    assert result["final_report"] == "memo"
+
+
+def test_risk_manager_joins_all_branches_once(recorded_graph):
+    """
+    Validates that without a plan every branch runs, and that the risk
+    manager runs once, after the slower technical branch.
+    """
+    graph, runs, _ = recorded_graph
+
+    result = graph.invoke({"query": "NVDA?"})
+
+    assert {"data_analyst", "news_analyst", *TECHNICAL_NODES} <= set(runs)
+    assert runs.count("risk_manager") == 1
+    assert runs.count("editor") == 1
+    assert result["risk_assessment"] == "saw data/strategy"
+
+
+def test_per_ticker_fanout_runs_concurrently_and_merges_in_ticker_order(recorded_graph):
+    """
+    Validates that each ticker gets its own concurrent Data Analyst run and
+    that the sections are merged in query order, not completion order.
+    """
+    graph, runs, plan = recorded_graph
+    plan.update(branches=["fundamentals"], tickers=["TSM", "NVDA", "AMD"], fanout="per_ticker")
+    delays = {"TSM": 0.3, "NVDA": 0.2, "AMD": 0.1}
+
+    def data(state):
+        (ticker,) = state["tickers"]
+        time.sleep(delays[ticker])
+        return f"{ticker} fundamentals"
+    plan["data"] = data
+
+    start = time.perf_counter()
+    result = graph.invoke({"query": "Compare TSM, NVDA and AMD"})
+    elapsed = time.perf_counter() - start
+
+    assert runs.count("data_analyst") == 3
+    assert runs.count("risk_manager") == 1
+    assert elapsed < sum(delays.values())
+    assert result["data_analysis"] == (
+        "## 【1】TSM\n\nTSM fundamentals\n\n## 【2】NVDA\n\nNVDA fundamentals\n\n## 【3】AMD\n\nAMD fundamentals"
+    )
+
+
+def test_batched_fanout_runs_each_analyst_once(recorded_graph):
+    """Validates that the default mode passes every ticker to a single, unlabelled run."""
+    graph, runs, plan = recorded_graph
+    plan.update(branches=["fundamentals"], tickers=["TSM", "NVDA"])
+
+    result = graph.invoke({"query": "Compare TSM and NVDA"})
+
+    assert runs.count("data_analyst") == 1
+    assert result["data_analysis"] == "data"
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_node_overrunning_its_budget_degrades_to_a_marked_report(recorded_graph, monkeypatch, use_async):
+    """
+    Validates that a hung analyst is cut off at its share of the deadline and
+    that the risk manager and editor still run in time.
+    """
+    graph, runs, plan = recorded_graph
+    plan["delays"] = {"news_analyst": 5}
+    if use_async:
+        async def hung_news(state):
+            await asyncio.sleep(5)
+            return {"news_analysis": "late"}
+        monkeypatch.setattr(graph_module, "anews_analyst_node", hung_news)
+        graph = graph_module.create_graph()
+
+    config = {"configurable": {"deadline": time.time() + 2}}
+    start = time.perf_counter()
+    if use_async:
+        result = asyncio.run(graph.ainvoke({"query": "NVDA?"}, config))
+    else:
+        result = graph.invoke({"query": "NVDA?"}, config)
+
+    assert time.perf_counter() - start < 2
+    assert result["news_analysis"].startswith("[TIMEOUT] news_analyst")
+    assert result["timeouts"] == ["news_analyst"]
+    assert result["risk_assessment"] == "saw data/strategy"
+    assert result["final_report"] == "memo"
+
+
+def test_style_switch_reuses_the_evidence_and_reruns_only_the_synthesis(recorded_graph, monkeypatch):
+    """
+    Validates that the same question in another style (and spelling) skips
+    the prefetch and the analysts, and runs only the risk manager and editor.
+    """
+    import src.research_cache as research_cache
+
+    graph, runs, _ = recorded_graph
+    monkeypatch.setenv("RESEARCH_CACHE", "1")
+
+    first = graph.invoke({"query": "Is NVDA  a buy?", "investment_style": "Balanced"})
+    first_runs = list(runs)
+    runs.clear()
+    second = graph.invoke({"query": "is nvda a buy?", "investment_style": "Conservative"})
+
+    assert {"prefetch", "data_analyst", "news_analyst", *TECHNICAL_NODES} <= set(first_runs)
+    assert first["evidence_cached"] is False
+    assert runs == ["router", "risk_manager", "editor"]
+    assert second["evidence_cached"] is True
+    assert second["research_key"] == first["research_key"]
+    assert second["risk_assessment"] == "saw data/strategy"
+    assert research_cache.get_research_cache_stats()["hits"] == 1
+
+
+def test_per_ticker_overrun_is_listed_once(recorded_graph):
+    """Validates that an analyst overrunning on every per-ticker send is reported once in `timeouts`."""
+    graph, runs, plan = recorded_graph
+    plan.update(branches=["news"], tickers=["TSM", "NVDA"], fanout="per_ticker", delays={"news_analyst": 5})
+
+    result = graph.invoke({"query": "TSM vs NVDA news?"}, {"configurable": {"deadline": time.time() + 2}})
+
+    assert runs.count("news_analyst") == 2
+    assert result["timeouts"] == ["news_analyst"]
+
+
+def test_graph_is_compiled_once_per_process(monkeypatch):
+    """
+    Validates that requests share one compiled graph per technical variant
+    instead of recompiling the workflow each time.
+    """
+    compiled = []
+    monkeypatch.setattr(graph_module, "_graphs", {})
+    monkeypatch.setattr(graph_module, "create_graph", lambda technical: compiled.append(technical) or object())
+
+    first = graph_module.get_graph()
+    assert graph_module.get_graph() is first
+    assert graph_module.get_graph("consolidated") is not first
+    assert compiled == ["split", "consolidated"]
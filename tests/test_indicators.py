@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.tools import indicators
+from src.tools.technical_tools import calculate_rsi, calculate_mtm
+
+# --- Fixtures ---
+
+@pytest.fixture
+def close_matrix():
+    """Random-walk closes for 4 tickers, with warm-up gaps, a missing bar and a flat stretch."""
+    rng = np.random.default_rng(42)
+    close = 100 + np.cumsum(rng.normal(size=(4, 200)), axis=1)
+    close[1, :7] = np.nan       # Ticker listed later than the others
+    close[2, 120] = np.nan      # Missing bar
+    close[3, 60:90] = close[3, 59]  # No price change: RSI divides 0 by 0
+    return close
+
+# --- Unit Tests ---
+
+@pytest.mark.parametrize("window", [20, 50])
+def test_sma_matches_pandas_rolling(close_matrix, window):
+    """
+    Validates that the cumulative-sum SMA equals pandas' rolling mean for every ticker.
+    """
+    result = indicators.sma(close_matrix, window)
+    for i, row in enumerate(close_matrix):
+        expected = pd.Series(row).rolling(window=window).mean().to_numpy()
+        np.testing.assert_allclose(result[i], expected, rtol=1e-9, atol=1e-9, equal_nan=True)
+
+def test_rsi_and_mtm_match_pandas_implementations(close_matrix):
+    """
+    Validates that the vectorized RSI and MTM reproduce `calculate_rsi` and
+    `calculate_mtm` from technical_tools, including their warm-up conventions.
+    """
+    rsi = indicators.rsi(close_matrix, 14)
+    mtm = indicators.mtm(close_matrix, 10)
+    for i, row in enumerate(close_matrix):
+        df = pd.DataFrame({"Close": row})
+        np.testing.assert_allclose(rsi[i], calculate_rsi(df, 14).to_numpy(), rtol=1e-9, atol=1e-7, equal_nan=True)
+        np.testing.assert_allclose(mtm[i], calculate_mtm(df, 10).to_numpy(), equal_nan=True)
+
+def test_ema_and_rolling_extremes_match_pandas(close_matrix):
+    """
+    Validates the recursive EMA and the strided-window max/min against pandas.
+    """
+    ema = indicators.ema(close_matrix, 12)
+    high = indicators.rolling_max(close_matrix, 20)
+    low = indicators.rolling_min(close_matrix, 20)
+    for i, row in enumerate(close_matrix):
+        series = pd.Series(row)
+        np.testing.assert_allclose(ema[i], series.ewm(span=12, adjust=False, ignore_na=True).mean().to_numpy(), rtol=1e-9, equal_nan=True)
+        np.testing.assert_allclose(high[i], series.rolling(20).max().to_numpy(), equal_nan=True)
+        np.testing.assert_allclose(low[i], series.rolling(20).min().to_numpy(), equal_nan=True)
+
+def test_align_histories_pads_missing_bars():
+    """
+    Validates that per-ticker histories are aligned on the union of dates with NaN padding.
+    """
+    index = pd.date_range("2024-01-01", periods=5, freq="D")
+    histories = {
+        "TSM": pd.DataFrame({"Close": [1.0, 2, 3, 4, 5]}, index=index),
+        "NVDA": pd.DataFrame({"Close": [7.0, 8, 9]}, index=index[2:]),
+    }
+    tickers, aligned_index, matrices = indicators.align_histories(histories, columns=("Close",))
+
+    assert tickers == ["TSM", "NVDA"]
+    assert len(aligned_index) == 5
+    np.testing.assert_array_equal(matrices["Close"][1], [np.nan, np.nan, 7, 8, 9])
+
+def test_registry_matches_pandas_for_macd_bollinger_stochastic_atr(close_matrix):
+    """
+    Validates MACD, Bollinger Bands, Stochastic and ATR from the registry against
+    their textbook pandas formulations, for every ticker in one call.
+    """
+    high = close_matrix + 1.0
+    low = close_matrix - 1.0
+    result = indicators.compute_indicators(
+        ["MACD(12,26,9)", "BBANDS(20,2)", "STOCH(14,3)", "ATR(14)"], close_matrix, high=high, low=low
+    )
+    for i in range(close_matrix.shape[0]):
+        c, h, l = pd.Series(close_matrix[i]), pd.Series(high[i]), pd.Series(low[i])
+        line = c.ewm(span=12, adjust=False, ignore_na=True).mean() - c.ewm(span=26, adjust=False, ignore_na=True).mean()
+        signal = line.ewm(span=9, adjust=False, ignore_na=True).mean()
+        np.testing.assert_allclose(result["MACD_HIST"][i], (line - signal).to_numpy(), rtol=1e-9, atol=1e-9, equal_nan=True)
+
+        upper = c.rolling(20).mean() + 2 * c.rolling(20).std()
+        np.testing.assert_allclose(result["BB_UPPER"][i], upper.to_numpy(), rtol=1e-9, atol=1e-7, equal_nan=True)
+
+        k = 100 * (c - l.rolling(14).min()) / (h.rolling(14).max() - l.rolling(14).min())
+        np.testing.assert_allclose(result["STOCH_K"][i], k.to_numpy(), rtol=1e-9, equal_nan=True)
+        np.testing.assert_allclose(result["STOCH_D"][i], k.rolling(3).mean().to_numpy(), rtol=1e-9, equal_nan=True)
+
+        tr = pd.concat([h - l, (h - c.shift()).abs(), (l - c.shift()).abs()], axis=1).max(axis=1, skipna=False)
+        tr = tr.where(c.shift().notna(), h - l)
+        atr = tr.ewm(alpha=1 / 14, adjust=False, ignore_na=True).mean()
+        np.testing.assert_allclose(result["ATR_14"][i], atr.to_numpy(), rtol=1e-9, equal_nan=True)
+
+def test_registry_shares_intermediates(close_matrix, monkeypatch):
+    """
+    Validates that one pass computes each shared building block once: the SMA
+    behind both SMA(20) and the Bollinger mid band, and the EMAs behind MACD.
+    """
+    calls = {"sma": 0, "ema": 0}
+    real_sma, real_ema = indicators.sma, indicators.ema
+
+    def counting(name, fn):
+        def wrapper(*args):
+            calls[name] += 1
+            return fn(*args)
+        return wrapper
+
+    monkeypatch.setattr(indicators, "sma", counting("sma", real_sma))
+    monkeypatch.setattr(indicators, "ema", counting("ema", real_ema))
+    result = indicators.compute_indicators(["SMA(20)", "BBANDS(20,2)", "EMA(12)", "MACD(12,26,9)"], close_matrix)
+
+    np.testing.assert_array_equal(result["SMA_20"], result["BB_MID"])
+    assert calls["ema"] == 3  # EMA(12) and EMA(26) of close, plus the signal line
+
+def test_parse_spec_fills_defaults_and_rejects_unknown():
+    """
+    Validates spec parsing: positional parameters, registered defaults and errors.
+    """
+    assert indicators.parse_spec("RSI") == ("RSI", {"window": 14})
+    assert indicators.parse_spec("macd(5, 35)") == ("MACD", {"fast": 5, "slow": 35, "signal": 9})
+    assert indicators.parse_spec(("BBANDS", {"k": 2.5})) == ("BBANDS", {"window": 20, "k": 2.5})
+    with pytest.raises(ValueError):
+        indicators.parse_spec("VWAP(20)")
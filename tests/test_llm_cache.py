@@ -0,0 +1,122 @@
+import time
+from typing import TypedDict
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.load import dumps
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.graph import StateGraph, END
+from src.llm_cache import ResponseCache, ResponseStore, canonicalize_prompt
+
+# --- Fixtures ---
+
+@pytest.fixture
+def store(tmp_path):
+    """A response store in a temporary SQLite file."""
+    return ResponseStore(tmp_path / "responses.sqlite", ttls={"editor": 60, "news_analyst": 0})
+
+def make_llm(store, *replies, temperature=0):
+    """A fake chat model answering `replies` in order, cached like the models from `get_llm`."""
+    return GenericFakeChatModel(
+        messages=iter([AIMessage(r) if isinstance(r, str) else r for r in replies]),
+        cache=ResponseCache(store, f"fake|model|{temperature}"),
+    )
+
+# --- Unit Tests ---
+
+def test_repeat_prompt_is_served_from_cache(store):
+    """
+    Validates that an identical prompt is answered from the cache, and that a
+    different temperature does not share the entry.
+    """
+    llm = make_llm(store, "first", "second")
+    assert llm.invoke("Analyze TSM").content == "first"
+    assert llm.invoke("Analyze TSM").content == "first"
+    assert make_llm(store, "other", temperature=0.7).invoke("Analyze TSM").content == "other"
+
+    stats = store.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["entries"] == 2
+
+def test_tool_call_ids_and_metadata_are_canonicalized(store):
+    """
+    Validates that a ReAct step replayed with different provider tool-call ids
+    and response metadata hits the cached answer.
+    """
+    llm = make_llm(store, "final answer")
+
+    def conversation(call_id, tokens):
+        call = AIMessage("", tool_calls=[{"name": "get_technical_data", "args": {"ticker": "TSM"}, "id": call_id}],
+                         response_metadata={"model_name": "m", "created": tokens})
+        return [HumanMessage("Analyze TSM"), call, ToolMessage("RSI_14=55.2", tool_call_id=call_id)]
+
+    assert llm.invoke(conversation("call_abc", 1)).content == "final answer"
+    assert llm.invoke(conversation("call_xyz", 2)).content == "final answer"
+    assert store.stats()["hits"] == 1
+
+    changed_tool_output = conversation("call_abc", 1)
+    changed_tool_output[-1] = ToolMessage("RSI_14=71.0", tool_call_id="call_abc")
+    assert canonicalize_prompt(dumps(conversation("call_abc", 1))) == canonicalize_prompt(dumps(conversation("call_xyz", 2)))
+    assert canonicalize_prompt(dumps(changed_tool_output)) != canonicalize_prompt(dumps(conversation("call_abc", 1)))
+
+def test_entries_expire_after_ttl(store):
+    """
+    Validates that an expired entry is refetched and counted as an expiration.
+    """
+    store.default_ttl = 0.05
+    llm = make_llm(store, "old", "new")
+    llm.invoke("q")
+    time.sleep(0.1)
+
+    assert llm.invoke("q").content == "new"
+    assert store.stats()["expirations"] == 1
+
+def test_size_budget_evicts_least_recently_used(store):
+    """
+    Validates that entries beyond the size budget are evicted LRU first.
+    """
+    llm = make_llm(store, "a" * 400, "b" * 400, "c" * 400, "a-refetched")
+    llm.invoke("first")
+    store.max_bytes = store.stats()["bytes"] * 2 + 100
+    llm.invoke("second")
+    llm.invoke("third")
+
+    stats = store.stats()
+    assert stats["evictions"] == 1
+    assert stats["entries"] == 2
+    assert llm.invoke("first").content == "a-refetched"
+
+def test_per_node_ttl_inside_graph(store):
+    """
+    Validates that the graph node is detected for per-node TTLs and hit rates:
+    a node with TTL 0 is never cached.
+    """
+    llm = make_llm(store, "edited", "news 1", "news 2")
+
+    class State(TypedDict):
+        out: str
+
+    def editor(state):
+        return {"out": llm.invoke("write report").content}
+
+    def news_analyst(state):
+        return {"out": llm.invoke("summarize news").content}
+
+    def build(node_name, fn):
+        workflow = StateGraph(State)
+        workflow.add_node(node_name, fn)
+        workflow.set_entry_point(node_name)
+        workflow.add_edge(node_name, END)
+        return workflow.compile()
+
+    editor_graph = build("editor", editor)
+    assert editor_graph.invoke({"out": ""})["out"] == "edited"
+    assert editor_graph.invoke({"out": ""})["out"] == "edited"
+
+    news_graph = build("news_analyst", news_analyst)
+    assert news_graph.invoke({"out": ""})["out"] == "news 1"
+    assert news_graph.invoke({"out": ""})["out"] == "news 2"
+
+    by_node = store.stats()["by_node"]
+    assert by_node["editor"] == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+    assert "news_analyst" not in by_node
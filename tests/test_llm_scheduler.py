@@ -0,0 +1,166 @@
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+
+from src.llm_scheduler import AsyncSchedulingTransport, LLMScheduler, request_scope, retry_after_seconds
+
+# A one-second window makes 'per minute' limits observable in tests
+WINDOW = 1.0
+
+# --- Fixtures ---
+
+@pytest.fixture(autouse=True)
+def no_env_limits(monkeypatch):
+    """Clears the scheduler limits set through the environment."""
+    for name in ("LLM_MAX_CONCURRENCY", "LLM_RPM", "LLM_TPM"):
+        monkeypatch.delenv(name, raising=False)
+
+# --- Helpers ---
+
+def _scheduler(concurrency=None, rpm=None, tpm=None):
+    """A scheduler for the 'openai' provider with the given per-window limits."""
+    limits = {"concurrency": concurrency, "rpm": rpm, "tpm": tpm}
+    return LLMScheduler(provider_limits={"openai": limits}, model_limits={}, window=WINDOW)
+
+
+def _wait_for_depth(scheduler, depth):
+    """Waits until the 'openai/m' queue holds `depth` calls."""
+    deadline = time.monotonic() + 2
+    while time.monotonic() < deadline:
+        models = scheduler.stats()["models"]
+        if models and models["openai/m"]["queue_depth"] == depth:
+            return
+        time.sleep(0.005)
+    raise AssertionError(f"queue never reached depth {depth}")
+
+# --- Unit Tests ---
+
+def test_concurrency_cap_holds_under_burst():
+    """
+    Validates that no more than `concurrency` calls are ever in flight,
+    however many arrive at once.
+    """
+    scheduler = _scheduler(concurrency=2)
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def call():
+        ticket = scheduler.acquire("openai", "m")
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        time.sleep(0.05)
+        with lock:
+            active.pop()
+        scheduler.release(ticket)
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert max(peak) == 2
+    stats = scheduler.stats()
+    assert stats["in_flight"]["openai"] == 0
+    assert stats["models"]["openai/m"]["admitted"] == 8
+    assert stats["models"]["openai/m"]["max_queue_depth"] >= 6
+
+
+def test_request_rate_paces_calls_beyond_the_burst():
+    """
+    Validates that a full bucket allows a burst of `rpm` calls and that the
+    next call waits for the refill.
+    """
+    scheduler = _scheduler(rpm=2)
+
+    start = time.monotonic()
+    for _ in range(3):
+        scheduler.release(scheduler.acquire("openai", "m"))
+    elapsed = time.monotonic() - start
+
+    # Refill rate is 2 per window, so the third call waits about half a window
+    assert 0.4 * WINDOW < elapsed < 1.0 * WINDOW
+
+
+def test_waiters_are_served_round_robin_across_requests():
+    """Validates that a request that queued many calls cannot starve one that queued later."""
+    scheduler = _scheduler(concurrency=1)
+    first = scheduler.acquire("openai", "m")
+    order = []
+
+    def call(scope, label):
+        with request_scope(scope):
+            ticket = scheduler.acquire("openai", "m")
+        order.append(label)
+        scheduler.release(ticket)
+
+    threads = []
+    for depth, (scope, label) in enumerate([("A", "A1"), ("A", "A2"), ("A", "A3"), ("B", "B1")], start=1):
+        t = threading.Thread(target=call, args=(scope, label))
+        t.start()
+        threads.append(t)
+        _wait_for_depth(scheduler, depth)
+
+    scheduler.release(first)
+    for t in threads:
+        t.join()
+
+    assert order == ["A1", "B1", "A2", "A3"]
+
+
+def test_retry_after_pauses_queued_calls():
+    """
+    Validates that a 429 pauses the model and that queued calls wait for the
+    Retry-After instead of retrying at once.
+    """
+    scheduler = _scheduler()
+    scheduler.throttle("openai", "m", retry_after=0.3)
+
+    start = time.monotonic()
+    scheduler.release(scheduler.acquire("openai", "m"))
+
+    assert time.monotonic() - start >= 0.25
+    assert scheduler.stats()["models"]["openai/m"]["throttled"] == 1
+
+
+def test_transport_honors_429_and_syncs_with_rate_limit_headers():
+    """
+    Validates that the async transport pauses on 429, then lowers its token
+    bucket to the provider's remaining count.
+    """
+    scheduler = _scheduler(tpm=10_000)
+    responses = [
+        httpx.Response(429, headers={"retry-after-ms": "200"}, json={"error": "rate limited"}),
+        httpx.Response(200, headers={"x-ratelimit-remaining-tokens": "1500"}, json={"ok": True}),
+    ]
+    transport = AsyncSchedulingTransport(httpx.MockTransport(lambda request: responses.pop(0)), "openai", scheduler)
+
+    async def run():
+        async with httpx.AsyncClient(transport=transport, base_url="https://api.test") as client:
+            body = {"model": "m", "messages": [], "max_tokens": 100}
+            throttled = await client.post("/chat/completions", json=body)
+            start = time.monotonic()
+            ok = await client.post("/chat/completions", json=body)
+            return throttled, ok, time.monotonic() - start
+
+    throttled, ok, waited = asyncio.run(run())
+
+    assert throttled.status_code == 429 and ok.status_code == 200
+    assert waited >= 0.15
+    limiter = scheduler._models[("openai", "m")]
+    assert limiter.tokens.level <= 1500
+    stats = scheduler.stats()
+    assert stats["in_flight"]["openai"] == 0
+    assert stats["models"]["openai/m"]["throttled"] == 1
+
+
+def test_retry_after_parsing():
+    """Validates that Retry-After is read from the millisecond and second headers."""
+    assert retry_after_seconds({"retry-after-ms": "250"}) == 0.25
+    assert retry_after_seconds({"retry-after": "3"}) == 3.0
+    assert retry_after_seconds({}) is None
@@ -0,0 +1,191 @@
+import json
+import threading
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import MagicMock, patch
+from src.tools import market_data
+from src.tools.market_data import MarketDataCache, history_to_compact, history_from_compact, use_snapshot
+
+# --- Fixtures ---
+
+@pytest.fixture(autouse=True)
+def isolated_store(tmp_path, monkeypatch):
+    """Points the persistent OHLCV and fundamentals stores at a temporary directory for every test."""
+    monkeypatch.setattr(market_data.ohlcv_store, "root", tmp_path)
+    monkeypatch.setattr(market_data.fundamentals_store, "root", tmp_path / "fundamentals")
+    yield tmp_path
+
+# --- Helpers ---
+
+def make_history(start="2024-03-01", n=30):
+    """Builds a small tz-aware OHLCV frame resembling yfinance output."""
+    index = pd.date_range(start, periods=n, freq="D", tz="America/New_York")
+    close = np.linspace(100, 130, n)
+    return pd.DataFrame(
+        {"Open": close, "High": close + 1, "Low": close - 1, "Close": close, "Volume": np.full(n, 1e6)},
+        index=index,
+    )
+
+# --- Unit Tests ---
+
+def test_cache_hit_after_miss():
+    """
+    Validates that a second lookup for the same key is served from the cache
+    without calling the fetch function again.
+    """
+    cache = MarketDataCache(maxsize=4, ttl=60)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return "history"
+
+    assert cache.get_or_fetch(("TSM", "history", "6mo", "1d"), fetch) == "history"
+    assert cache.get_or_fetch(("TSM", "history", "6mo", "1d"), fetch) == "history"
+
+    stats = cache.stats()
+    assert len(calls) == 1
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+def test_cache_evicts_least_recently_used():
+    """
+    Validates that the cache stays bounded and evicts the least recently used entry.
+    """
+    cache = MarketDataCache(maxsize=2, ttl=60)
+    cache.get_or_fetch("a", lambda: 1)
+    cache.get_or_fetch("b", lambda: 2)
+    cache.get_or_fetch("a", lambda: 1)  # Touch 'a' so that 'b' becomes the LRU entry
+    cache.get_or_fetch("c", lambda: 3)
+
+    assert cache.stats()["evictions"] == 1
+    assert cache.get_or_fetch("a", lambda: "refetched") == 1
+    assert cache.get_or_fetch("b", lambda: "refetched") == "refetched"
+
+def test_cache_expires_entries_after_ttl():
+    """
+    Validates that an entry older than its TTL is fetched again.
+    """
+    cache = MarketDataCache(maxsize=4, ttl=60)
+    cache.get_or_fetch("k", lambda: "old", ttl=0.01)
+    time.sleep(0.02)
+
+    assert cache.get_or_fetch("k", lambda: "new") == "new"
+    assert cache.stats()["expirations"] == 1
+
+def test_single_flight_deduplicates_concurrent_fetches():
+    """
+    Validates that concurrent callers for the same key share one in-flight fetch.
+    """
+    cache = MarketDataCache(maxsize=4, ttl=60)
+    calls = []
+    release = threading.Event()
+
+    def slow_fetch():
+        calls.append(1)
+        release.wait(timeout=5)
+        return "shared"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_fetch("NVDA", slow_fetch)))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    # Give the followers time to queue up behind the leader
+    time.sleep(0.1)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == ["shared"] * 8
+    assert cache.stats()["coalesced"] == 7
+
+def test_budget_timeout_of_the_leader_does_not_fail_the_waiters():
+    """
+    Validates that a leader whose deadline budget runs out stops waiting on
+    its own, while the shared fetch completes for a waiter without a deadline.
+    """
+    from src.deadline import _node_deadline
+
+    cache = MarketDataCache(maxsize=4, ttl=60)
+
+    def slow_fetch():
+        time.sleep(0.3)
+        return "shared"
+
+    outcome = {}
+
+    def leader():
+        _node_deadline.set(time.time() + 0.1)
+        try:
+            cache.get_or_fetch("NVDA", slow_fetch)
+        except TimeoutError as e:
+            outcome["leader"] = e
+
+    thread = threading.Thread(target=leader)
+    thread.start()
+    time.sleep(0.05)
+    waiter = cache.get_or_fetch("NVDA", slow_fetch)
+    thread.join()
+
+    assert isinstance(outcome["leader"], TimeoutError)
+    assert waiter == "shared"
+    assert cache.stats()["errors"] == 0
+    assert cache.get_or_fetch("NVDA", slow_fetch) == "shared"
+
+def test_failed_fetch_is_not_cached():
+    """
+    Validates that errors propagate to the caller and the next lookup retries.
+    """
+    cache = MarketDataCache(maxsize=4, ttl=60)
+
+    def failing_fetch():
+        raise ConnectionError("rate limited")
+
+    with pytest.raises(ConnectionError):
+        cache.get_or_fetch("k", failing_fetch)
+
+    assert cache.get_or_fetch("k", lambda: "ok") == "ok"
+    assert cache.stats()["errors"] == 1
+
+def test_compact_history_round_trip():
+    """
+    Validates that the JSON-safe snapshot encoding rebuilds the same price history,
+    including the exchange timezone across a DST change.
+    """
+    history = make_history()
+    history.iloc[2, 0] = np.nan
+    compact = history_to_compact(history)
+
+    json.dumps(compact, allow_nan=False)
+    pd.testing.assert_frame_equal(history_from_compact(compact), history, check_freq=False)
+
+def test_prefetch_batches_download_and_tools_read_snapshot():
+    """
+    Validates that the prefetch stage issues one batched download per history
+    spec for all tickers, and that `get_history` reads the snapshot first.
+    """
+    history = make_history(start=(pd.Timestamp.now() - pd.DateOffset(months=2)).strftime("%Y-%m-%d"))
+    batched = pd.concat({"TSM": history, "NVDA": history}, axis=1)
+    statement = pd.DataFrame([[1e9]], index=["Total Revenue"], columns=pd.to_datetime(["2024-12-31"]))
+    stock = MagicMock(info={"marketCap": 1e12, "longBusinessSummary": "..."}, financials=statement, balance_sheet=statement)
+
+    market_data.market_data_cache.clear()
+    with patch("src.tools.market_data.yf.download", return_value=batched) as mock_download, \
+         patch("src.tools.market_data.get_ticker", return_value=stock):
+        snapshot = market_data.prefetch_market_data(["tsm", "NVDA"])
+
+    assert mock_download.call_count == len(market_data.PREFETCH_HISTORY)
+    assert set(snapshot) == {"TSM", "NVDA"}
+    assert snapshot["TSM"]["info"] == {"marketCap": 1e12}
+    json.dumps(snapshot, allow_nan=False)
+
+    with patch("src.tools.market_data.get_ticker") as mock_ticker, use_snapshot(snapshot):
+        result = market_data.get_history("TSM", period="6mo", interval="1d")
+    mock_ticker.assert_not_called()
+    assert len(result) == len(history)
@@ -0,0 +1,137 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+from src.tools.ohlcv_store import OHLCVStore, fcntl
+
+# --- Helpers ---
+
+def make_bars(start, n, base=100.0):
+    """Builds daily OHLCV bars in exchange time, like `Ticker.history` returns."""
+    index = pd.date_range(start, periods=n, freq="B", tz="America/New_York")
+    close = base + np.arange(n, dtype=float)
+    return pd.DataFrame(
+        {"Open": close - 0.5, "High": close + 1, "Low": close - 1, "Close": close, "Volume": np.full(n, 1000.0)},
+        index=index,
+    )
+
+class FakeFetcher:
+    """Serves slices of an upstream series and records every request."""
+
+    def __init__(self, upstream):
+        self.upstream = upstream
+        self.calls = []
+
+    def __call__(self, ticker, interval, period=None, start=None):
+        self.calls.append({"period": period, "start": start})
+        if start is not None:
+            return self.upstream[self.upstream.index >= pd.Timestamp(start, tz="America/New_York")]
+        return self.upstream
+
+@pytest.fixture
+def recent_start():
+    """A start date well inside the default '6mo' lookback."""
+    return (pd.Timestamp.now() - pd.DateOffset(months=3)).strftime("%Y-%m-%d")
+
+# --- Unit Tests ---
+
+def test_load_creates_then_serves_from_disk(tmp_path, recent_start):
+    """
+    Validates that the first load downloads the full period and a second load
+    within `max_age` is served from the file without any network call.
+    """
+    fetcher = FakeFetcher(make_bars(recent_start, 40))
+    store = OHLCVStore(tmp_path, fetcher, max_age=3600)
+
+    first = store.load("TSM", "6mo", "1d")
+    second = store.load("TSM", "6mo", "1d")
+
+    assert len(fetcher.calls) == 1
+    assert fetcher.calls[0]["period"] == "6mo"
+    pd.testing.assert_frame_equal(first, second)
+    np.testing.assert_allclose(first["Close"].to_numpy(), fetcher.upstream["Close"].to_numpy())
+    assert str(first.index.tz) == "America/New_York"
+
+def test_refresh_appends_only_new_bars(tmp_path, recent_start):
+    """
+    Validates that a stale series is refreshed with an incremental request
+    starting near the last stored bar, and the new bars are appended.
+    """
+    upstream = make_bars(recent_start, 45)
+    fetcher = FakeFetcher(upstream.iloc[:40])
+    store = OHLCVStore(tmp_path, fetcher, max_age=0)
+    store.load("TSM", "6mo", "1d")
+
+    fetcher.upstream = upstream
+    kind, kwargs = store.plan("TSM", "6mo", "1d")
+    outcome = store.ingest("TSM", "1d", fetcher("TSM", "1d", **kwargs))
+
+    assert kind == "incremental"
+    assert outcome == "appended"
+    assert len(store.read("TSM", "1d")) == 45
+
+def test_revised_last_bar_rewrites_only_the_tail(tmp_path, recent_start):
+    """
+    Validates that when the still-forming last bar was revised upstream,
+    the store truncates at that bar and rewrites the tail.
+    """
+    upstream = make_bars(recent_start, 40)
+    store = OHLCVStore(tmp_path, FakeFetcher(upstream), max_age=0)
+    store.load("TSM", "6mo", "1d")
+
+    revised = upstream.copy()
+    revised.iloc[-1, revised.columns.get_loc("Close")] += 3.0
+    outcome = store.ingest("TSM", "1d", revised.iloc[-5:])
+
+    stored = store.read("TSM", "1d")
+    assert outcome == "tail_rewritten"
+    assert len(stored) == 40
+    assert stored["Close"].iloc[-1] == pytest.approx(revised["Close"].iloc[-1])
+
+def test_split_rescales_history_without_refetching_it(tmp_path, recent_start):
+    """
+    Validates that a 2-for-1 split applied upstream to the whole history is
+    detected from the overlap window and applied in place to older bars.
+    """
+    upstream = make_bars(recent_start, 40)
+    store = OHLCVStore(tmp_path, FakeFetcher(upstream), max_age=0)
+    store.load("TSM", "6mo", "1d")
+
+    adjusted = upstream.copy()
+    adjusted[["Open", "High", "Low", "Close"]] /= 2
+    adjusted["Volume"] *= 2
+    new_bar = make_bars(adjusted.index[-1] + pd.offsets.BDay(1), 1, base=70.0)
+    refreshed = pd.concat([adjusted.iloc[-5:], new_bar])
+    outcome = store.ingest("TSM", "1d", refreshed)
+
+    stored = store.read("TSM", "1d")
+    assert outcome == "rescaled"
+    assert len(stored) == 41
+    np.testing.assert_allclose(stored["Close"].to_numpy()[:40], adjusted["Close"].to_numpy())
+    np.testing.assert_allclose(stored["Volume"].to_numpy()[:40], adjusted["Volume"].to_numpy())
+
+@pytest.mark.skipif(fcntl is None, reason="advisory file locks need fcntl")
+def test_full_rewrite_waits_for_the_sidecar_lock(tmp_path, recent_start):
+    """
+    Validates that writers lock the sidecar `.lock` file, which survives the
+    `os.replace` of a full rewrite, so a rewrite waits for another holder.
+    """
+    upstream = make_bars(recent_start, 20)
+    store = OHLCVStore(tmp_path, FakeFetcher(upstream), max_age=0)
+    store.load("TSM", "6mo", "1d")
+    sidecar = store.path("TSM", "1d").with_name("TSM_1d.ohlcv.lock")
+    assert sidecar.exists()
+
+    done = threading.Event()
+    with open(sidecar, "a+b") as other:
+        # A separate open file description stands in for another process
+        fcntl.flock(other, fcntl.LOCK_EX)
+        writer = threading.Thread(target=lambda: (store.ingest("TSM", "1d", upstream), done.set()))
+        writer.start()
+        assert not done.wait(0.2)
+        fcntl.flock(other, fcntl.LOCK_UN)
+    writer.join(5)
+
+    assert done.is_set()
+    assert len(store.read("TSM", "1d")) == 20
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import patch
+from src.tools import pattern_tools
+from src.tools.pattern_tools import detect_patterns, pivot_sequence
+
+# --- Helpers ---
+
+def zigzag(points, bars_per_leg=10):
+    """Builds (high, low, close) arrays by linear interpolation between swing points."""
+    close = []
+    for start, end in zip(points[:-1], points[1:]):
+        close.extend(np.linspace(start, end, bars_per_leg, endpoint=False))
+    close.append(points[-1])
+    close = np.array(close)
+    return close + 0.5, close - 0.5, close
+
+def names(patterns):
+    return [p["pattern"] for p in patterns]
+
+# --- Unit Tests ---
+
+def test_pivot_sequence_alternates_peaks_and_troughs():
+    """
+    Validates that pivots alternate H/L and land on the swing points.
+    """
+    high, low, _ = zigzag([100, 120, 105, 125, 110])
+    pivots = pivot_sequence(high, low)
+
+    assert [k for k, _, _ in pivots] == ["H", "L", "H"]
+    assert [i for _, i, _ in pivots] == [10, 20, 30]
+    assert pivots[1][2] == pytest.approx(104.5)
+
+@pytest.mark.parametrize("points, expected, direction", [
+    ([100, 120, 105, 120.5, 108], "Double Top", "bearish"),
+    ([120, 100, 112, 100.3, 110], "Double Bottom", "bullish"),
+    ([100, 115, 105, 125, 105, 114.5, 103], "Head and Shoulders Top", "bearish"),
+    ([120, 100, 110, 90, 110, 100.5, 115], "Inverse Head and Shoulders", "bullish"),
+    ([100, 140, 102, 136, 106, 132, 110, 128, 114, 120], "Symmetrical Triangle", "neutral"),
+    ([150, 140, 145, 135, 140, 130, 135, 125, 130], "Falling Channel", "bearish"),
+])
+def test_detect_patterns_classifies_textbook_shapes(points, expected, direction):
+    """
+    Validates that each textbook pattern is detected as the most confident match.
+    """
+    patterns, _ = detect_patterns(*zigzag(points))
+
+    assert patterns, "no pattern detected"
+    assert patterns[0]["pattern"] == expected
+    assert patterns[0]["direction"] == direction
+    assert 0.0 <= patterns[0]["confidence"] <= 1.0
+
+def test_head_and_shoulders_reports_neckline_and_confirmation():
+    """
+    Validates the neckline level and that a close below it confirms the top.
+    """
+    patterns, _ = detect_patterns(*zigzag([100, 115, 105, 125, 105, 114.5, 103]))
+    top = patterns[0]
+
+    assert top["levels"]["neckline"] == pytest.approx(104.5)
+    assert top["status"] == "confirmed"
+    assert top["levels"]["target"] < top["levels"]["neckline"]
+
+def test_trending_series_has_no_reversal_pattern():
+    """
+    Validates that a steady uptrend without swings reports no pattern.
+    """
+    close = np.linspace(100, 150, 120)
+    patterns, _ = detect_patterns(close + 0.5, close - 0.5, close)
+
+    assert "Double Top" not in names(patterns)
+    assert "Head and Shoulders Top" not in names(patterns)
+
+def test_detect_chart_patterns_tool_output():
+    """
+    Validates that the tool reports patterns with dates, levels and recent pivots.
+    """
+    high, low, close = zigzag([100, 120, 105, 120.5, 108])
+    index = pd.date_range("2025-01-01", periods=len(close), freq="D")
+    history = pd.DataFrame({"Open": close, "High": high, "Low": low, "Close": close, "Volume": 1e6}, index=index)
+
+    with patch.object(pattern_tools, "get_history", return_value=history):
+        report = pattern_tools.detect_chart_patterns.invoke({"ticker": "TSM"})
+
+    assert "[Double Top]\ndir=bearish;status=forming" in report
+    assert "neckline=104.50" in report
+    assert "[pivots]\nH=120.50@2025-01-11" in report
@@ -0,0 +1,54 @@
+import pytest
+from src.agents.evidence import research_cache_node
+from src.agents.prompts import NEUTRAL_STYLE
+from src.research_cache import evidence_style, research_key, style_view
+
+# --- Fixtures ---
+
+@pytest.fixture(autouse=True)
+def enabled(monkeypatch):
+    """Enables the research cache (on the temporary store of conftest) and clears the mode overrides."""
+    monkeypatch.setenv("RESEARCH_CACHE", "1")
+    for name in ("ANALYST_MODE", "FANOUT_MODE"):
+        monkeypatch.delenv(name, raising=False)
+
+# --- Unit Tests ---
+
+def test_style_view_keeps_only_the_clients_verdicts():
+    """
+    Validates that a neutral report shows the shared analysis and only the
+    client's tagged lines, without the tag; untagged reports pass through.
+    """
+    report = "Shared trend.\n- [Conservative] Rating: BEARISH\n- [Aggressive] Rating: BULLISH\n[Balanced] Rating: NEUTRAL"
+
+    assert style_view(report, "Aggressive") == "Shared trend.\n- Rating: BULLISH"
+    assert style_view(report, "unknown") == "Shared trend.\nRating: NEUTRAL"
+    assert style_view("Plain report.", "Conservative") == "Plain report."
+    assert style_view(None, "Balanced") is None
+
+def test_research_key_uses_the_resolved_modes(monkeypatch):
+    """
+    Validates that the key ignores the style and spelling of the query but
+    changes with the environment's analyst and fan-out modes.
+    """
+    state = {"query": "Is NVDA a buy?", "tickers": ["NVDA"], "investment_style": "Balanced"}
+    key = research_key(state, "split")
+
+    assert research_key({**state, "query": "is  nvda a BUY?", "investment_style": "Aggressive"}, "split") == key
+    assert research_key({**state, "analyst_mode": "agent", "fanout": "batched"}, "split") == key
+    monkeypatch.setenv("ANALYST_MODE", "single_shot")
+    assert research_key(state, "split") != key
+    monkeypatch.setenv("ANALYST_MODE", "agent")
+    monkeypatch.setenv("FANOUT_MODE", "per_ticker")
+    assert research_key(state, "split") != key
+
+def test_uncached_runs_keep_their_style_prompts():
+    """
+    Validates that a run without tickers gets no research key, so its
+    analysts keep the style prompt, while a cached run uses the neutral one.
+    """
+    update = research_cache_node({"query": "How is the market?", "tickers": [], "investment_style": "Conservative"})
+
+    assert update == {"research_key": None, "evidence_cached": False}
+    assert evidence_style({"investment_style": "Conservative", **update}) == "Conservative"
+    assert evidence_style({"investment_style": "Conservative", "research_key": "k"}) == NEUTRAL_STYLE
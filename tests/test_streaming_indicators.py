@@ -0,0 +1,88 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from src.tools import indicators
+from src.tools.technical_tools import calculate_rsi
+from src.tools.streaming_indicators import (
+    StreamingSMA, StreamingMTM, StreamingEMA, StreamingRSI, StreamingMACD,
+    StreamingIndicatorSet, restore,
+)
+
+# --- Fixtures ---
+
+@pytest.fixture
+def closes():
+    """One session of minute closes with a flat stretch and missing bars."""
+    rng = np.random.default_rng(7)
+    close = 100 + np.cumsum(rng.normal(scale=0.2, size=400))
+    close[120:150] = close[119]
+    close[200] = np.nan
+    return close
+
+def batch_results(close):
+    """Batch reference values from technical_tools and the vectorized engine."""
+    matrix = close[np.newaxis, :]
+    return {
+        "sma": indicators.sma(matrix, 20)[0],
+        "mtm": indicators.mtm(matrix, 10)[0],
+        "ema": indicators.ema(matrix, 12)[0],
+        "rsi": calculate_rsi(pd.DataFrame({"Close": close}), 14).to_numpy(),
+        "wilder": indicators.wilder_rsi(matrix, 14)[0],
+        "macd": indicators.macd(matrix)[2][0],
+    }
+
+def make_streams():
+    return {
+        "sma": StreamingSMA(20),
+        "mtm": StreamingMTM(10),
+        "ema": StreamingEMA(12),
+        "rsi": StreamingRSI(14),
+        "wilder": StreamingRSI(14, method="wilder"),
+        "macd": StreamingMACD(),
+    }
+
+# --- Unit Tests ---
+
+def test_streaming_matches_batch_bar_for_bar(closes):
+    """
+    Validates that every streaming indicator reproduces its batch implementation
+    on every bar, including warm-up and missing-bar handling.
+    """
+    streams = make_streams()
+    outputs = {name: [s.update(v) for v in closes] for name, s in streams.items()}
+
+    for name, expected in batch_results(closes).items():
+        np.testing.assert_allclose(outputs[name], expected, rtol=1e-9, atol=1e-9, equal_nan=True, err_msg=name)
+
+def test_streaming_state_survives_json_round_trip(closes):
+    """
+    Validates that indicators serialized mid-session and restored continue
+    with exactly the same results as uninterrupted ones.
+    """
+    uninterrupted = make_streams()
+    restored = make_streams()
+    for v in closes[:250]:
+        for name in uninterrupted:
+            uninterrupted[name].update(v)
+            restored[name].update(v)
+
+    restored = {name: restore(json.loads(json.dumps(s.to_dict()))) for name, s in restored.items()}
+    for v in closes[250:]:
+        for name in uninterrupted:
+            assert restored[name].update(v) == pytest.approx(uninterrupted[name].update(v), nan_ok=True)
+
+def test_indicator_set_skips_already_seen_bars(closes):
+    """
+    Validates that feeding the whole intraday frame again only consumes new bars.
+    """
+    index = pd.date_range("2025-01-02 09:30", periods=len(closes), freq="min", tz="America/New_York")
+    history = pd.DataFrame({"Close": closes}, index=index)
+    indicator_set = StreamingIndicatorSet({"SMA_20": StreamingSMA(20)})
+
+    indicator_set.update_frame(history.iloc[:300])
+    latest = indicator_set.update_frame(history)
+
+    expected = indicators.sma(closes[np.newaxis, :], 20)[0, -1]
+    assert latest["SMA_20"] == pytest.approx(expected)
+    assert indicator_set.indicators["SMA_20"].buffer.count == 20
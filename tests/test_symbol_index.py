@@ -0,0 +1,72 @@
+import pytest
+
+from src.tools.symbol_index import SymbolIndex, get_symbol_index
+
+# --- Unit Tests ---
+
+@pytest.mark.parametrize("query, expected", [
+    ("分析TSM和NVDA", ["TSM", "NVDA"]),
+    ("台積電跟輝達哪個好?", ["TSM", "NVDA"]),
+    ("Apple vs Microsoft earnings", ["AAPL", "MSFT"]),
+    # Longest match wins: 美超微 (SMCI) is not read as 超微 (AMD)
+    ("美超微和超微的比較", ["SMCI", "AMD"]),
+    # Jargon that is also a ticker (MA) is not a mention
+    ("TSM 的 RSI、MACD 和 MA 如何", ["TSM"]),
+    ("Is $V a buy?", ["V"]),
+    ("聯發科 2454.TW 與 Nvidia", ["2454.TW", "NVDA"]),
+    ("NVDA NVDA 輝達", ["NVDA"]),
+])
+def test_resolves_symbols_and_names(query, expected):
+    """
+    Validates that tickers and company names (English and Chinese) resolve to
+    symbols in query order, without duplicates or indicator jargon.
+    """
+    tickers, unresolved = get_symbol_index().resolve(query)
+
+    assert tickers == expected
+    assert unresolved == []
+
+
+def test_latin_names_need_word_boundaries():
+    """Validates that Latin names match whole words only ('ford' inside 'affordable' is not Ford)."""
+    assert get_symbol_index().resolve("affordable housing stocks") == ([], [])
+
+@pytest.mark.parametrize("query", [
+    "apply for a visa before the meta analysis",
+    "arm wrestling and oracle bones",
+    "Can I ford the river with a tesla coil?",
+])
+def test_ordinary_words_are_not_company_names(query):
+    """
+    Validates that names which are also ordinary words match only in their
+    capitalized form, so lowercase words in a sentence resolve to nothing.
+    """
+    assert get_symbol_index().resolve(query) == ([], [])
+    assert get_symbol_index().resolve("Visa vs Meta vs Arm")[0] == ["V", "META", "ARM"]
+
+@pytest.mark.parametrize("query, expected", [
+    ("這走勢很奇異", []),
+    ("奇異公司的航空引擎", ["GE"]),
+    ("長榮航的載客率", ["2618.TW"]),
+    ("長榮海運和長榮航空", ["2603.TW", "2618.TW"]),
+    ("三星級飯店", []),
+])
+def test_generic_chinese_words_are_not_company_names(query, expected):
+    """
+    Validates that ordinary Chinese words are not read as short company
+    names, and that overlapping names resolve to the longer company name.
+    """
+    assert get_symbol_index().resolve(query) == (expected, [])
+
+
+def test_reports_unknown_tickers_and_ambiguous_names():
+    """
+    Validates that names shared by several tickers and unknown ticker-like
+    tokens are reported as unresolved instead of guessed.
+    """
+    index = SymbolIndex([("GOOGL", ["Alphabet", "Google"]), ("GOOG", ["Alphabet"]), ("TSM", ["台積電"])])
+
+    tickers, unresolved = index.resolve("Alphabet 和 台積電 還有 XYZQ")
+
+    assert tickers == ["TSM"]
+    assert unresolved == ["Alphabet", "XYZQ"]
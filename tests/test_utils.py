@@ -0,0 +1,117 @@
+import pytest
+from unittest.mock import patch
+from src import utils
+
+# --- Fixtures ---
+
+@pytest.fixture(autouse=True)
+def fresh_registry(monkeypatch):
+    """Isolates the process-wide LLM registry and provider settings for every test."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    for name in ("LLM_MODEL", "LLM_TIERS", "LLM_ROLES_FILE", "LLM_MODEL_EDITOR", "LLM_MAX_TOKENS_EDITOR"):
+        monkeypatch.delenv(name, raising=False)
+    utils.close_llm_clients()
+    yield
+    utils.close_llm_clients()
+
+# --- Unit Tests ---
+
+def test_get_llm_reuses_instances_per_key(monkeypatch):
+    """
+    Validates that repeated calls return the same model for the same
+    (provider, model, temperature) and a different one for another temperature.
+    """
+    monkeypatch.setenv("LLM_PROVIDER", "openai")
+
+    assert utils.get_llm(temperature=0) is utils.get_llm(temperature=0)
+    assert utils.get_llm(temperature=0) is not utils.get_llm(temperature=0.7)
+
+@pytest.mark.parametrize("provider", ["openai", "groq"])
+def test_models_share_the_provider_connection_pool(monkeypatch, provider):
+    """
+    Validates that all models of a provider use one keep-alive httpx pool.
+    """
+    monkeypatch.setenv("LLM_PROVIDER", provider)
+    cold = utils.get_llm(temperature=0)
+    warm = utils.get_llm(temperature=0.5)
+
+    assert cold.http_client is warm.http_client
+    assert cold.http_async_client is warm.http_async_client
+
+def test_unsupported_provider_raises(monkeypatch):
+    """
+    Validates that an unknown LLM_PROVIDER is rejected.
+    """
+    monkeypatch.setenv("LLM_PROVIDER", "unknown")
+    with pytest.raises(ValueError):
+        utils.get_llm()
+
+def test_warm_up_opens_connection_and_swallows_errors(monkeypatch):
+    """
+    Validates that warm-up issues one request through the shared pool and
+    reports, rather than raises, connection failures.
+    """
+    monkeypatch.setenv("LLM_PROVIDER", "openai")
+    utils.get_llm()
+    client, _ = utils._http_clients["openai"]
+
+    with patch.object(client, "get") as mock_get:
+        assert utils.warm_up_llm() is True
+    mock_get.assert_called_once()
+    assert mock_get.call_args.args[0] == "https://api.openai.com/v1/models"
+
+    with patch.object(client, "get", side_effect=ConnectionError("offline")):
+        assert utils.warm_up_llm() is False
+
+def test_close_releases_sync_and_async_pools(monkeypatch):
+    """
+    Validates that closing the clients closes both pooled httpx clients of
+    every provider and empties the registry.
+    """
+    import asyncio
+
+    monkeypatch.setenv("LLM_PROVIDER", "openai")
+    utils.get_llm()
+    client, async_client = utils._http_clients["openai"]
+
+    asyncio.run(utils.aclose_llm_clients())
+
+    assert client.is_closed and async_client.is_closed
+    assert utils._http_clients == {}
+
+def test_roles_resolve_to_their_tier(monkeypatch):
+    """
+    Validates that extraction roles run on the fast tier and the memo on the
+    strong tier, each with its own completion budget and timeout.
+    """
+    monkeypatch.setenv("LLM_PROVIDER", "openai")
+
+    router = utils.get_llm(temperature=0, role="router")
+    editor = utils.get_llm(temperature=0, role="editor")
+
+    assert router.model_name == utils.MODEL_TIERS["openai"]["fast"]
+    assert editor.model_name == utils.MODEL_TIERS["openai"]["strong"]
+    assert router.max_tokens == utils.ROLE_SETTINGS["router"]["max_tokens"]
+    assert editor.request_timeout == utils.ROLE_SETTINGS["editor"]["timeout"]
+    assert utils.get_llm(temperature=0).model_name == utils.DEFAULT_MODELS["openai"]
+
+def test_role_overrides_from_file_and_env(monkeypatch, tmp_path):
+    """
+    Validates the precedence LLM_<SETTING>_<ROLE> > LLM_ROLES_FILE > defaults,
+    and that LLM_TIERS=0 puts every role on the default model.
+    """
+    monkeypatch.setenv("LLM_PROVIDER", "groq")
+    roles_file = tmp_path / "roles.json"
+    roles_file.write_text('{"tiers": {"strong": "moonshotai/kimi-k2-instruct"}, '
+                          '"roles": {"risk_manager": {"tier": "fast"}, "editor": {"max_tokens": 3000}}}')
+    monkeypatch.setenv("LLM_ROLES_FILE", str(roles_file))
+    monkeypatch.setenv("LLM_MAX_TOKENS_EDITOR", "5000")
+
+    assert utils.resolve_role("risk_manager")["model"] == utils.MODEL_TIERS["groq"]["fast"]
+    editor = utils.resolve_role("editor")
+    assert editor["model"] == "moonshotai/kimi-k2-instruct"
+    assert editor["max_tokens"] == 5000
+
+    monkeypatch.setenv("LLM_TIERS", "0")
+    assert utils.resolve_role("editor")["model"] == utils.DEFAULT_MODELS["groq"]